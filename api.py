@@ -0,0 +1,128 @@
+import argparse
+import hashlib
+import threading
+
+import networkx as nx
+
+from history import shared_history
+from model import MODEL_VERSION, MODULES, load_model, model_fields
+from server import SERVER_HOST, SERVER_TOKEN, add_route, serve, shared_server
+
+
+def _version(history, query):
+    """Returns the model version a request names, the app's own version by default."""
+    return history.get(query.get("version", MODEL_VERSION))
+
+
+def _depth(query):
+    if "depth" not in query:
+        return None
+    try:
+        return int(query["depth"])
+    except ValueError:
+        raise ValueError("depth must be a whole number") from None
+
+
+def subgraph(G, node, depth=None):
+    """Returns a node and everything beneath it, optionally only `depth` levels down."""
+    if node not in G:
+        raise KeyError(node)
+    below = nx.single_source_shortest_path_length(G, node, cutoff=depth)
+    return G.subgraph(below)
+
+
+def metrics(model, G):
+    """Returns the summary figures of one model version."""
+    roots = [n for n in G if G.in_degree(n) == 0]
+    depths = [max(nx.single_source_shortest_path_length(G, root).values()) for root in roots]
+    fields = model_fields(model.entities, model.edges)
+    return {
+        "nodes": G.number_of_nodes(),
+        "edges": G.number_of_edges(),
+        "fields": len(fields),
+        "fields_by_module": {m: len(model_fields(model.entities, model.edges, m)) for m in MODULES},
+        "groups": G.number_of_nodes() - sum(1 for n in G if G.out_degree(n) == 0),
+        "depth": max(depths, default=0),
+        "roots": roots,
+    }
+
+
+class GraphAPI:
+    """Read-only JSON views of the published model versions.
+
+    Every response is a function of one version's content and the request,
+    so its ETag is derived from the version's model hash without building
+    the response; clients polling with If-None-Match get 304s until the
+    model changes.
+    """
+
+    def __init__(self, history):
+        self.history = history
+
+    def etag(self, path, query):
+        if path == "/versions":
+            content = "".join(f"{name}={self.history.get(name).hash};" for name in self.history.versions())
+        else:
+            content = _version(self.history, query).hash
+        request = "&".join(f"{k}={v}" for k, v in sorted(query.items()))
+        return hashlib.sha256(f"{content}|{path}?{request}".encode("utf-8")).hexdigest()[:40]
+
+    def versions(self, query):
+        return [{"version": name, "hash": self.history.get(name).hash} for name in self.history.versions()]
+
+    def graph(self, query):
+        """The whole model diagram of a version as node-link JSON."""
+        model = _version(self.history, query)
+        return nx.node_link_data(self.history.graph(model.name), edges="links")
+
+    def subgraph(self, query):
+        """One node of a version and the nodes beneath it, as node-link JSON."""
+        if "node" not in query:
+            raise ValueError("node is required")
+        model = _version(self.history, query)
+        below = subgraph(self.history.graph(model.name), query["node"], _depth(query))
+        return nx.node_link_data(below, edges="links")
+
+    def metrics(self, query):
+        model = _version(self.history, query)
+        return metrics(model, self.history.graph(model.name))
+
+    def register(self):
+        """Adds /versions, /graph, /subgraph and /metrics to the side server's routes."""
+        for path, handler in (
+            ("/versions", self.versions),
+            ("/graph", self.graph),
+            ("/subgraph", self.subgraph),
+            ("/metrics", self.metrics),
+        ):
+            add_route(path, handler, lambda query, path=path: self.etag(path, query))
+        return self
+
+
+_api = None
+_api_lock = threading.Lock()
+
+
+def shared_api():
+    """Registers the graph API on the side server; returns None when it is off (MODEL_SERVER_PORT unset)."""
+    global _api
+    if shared_server() is None:
+        return None
+    with _api_lock:
+        if _api is None:
+            _api = GraphAPI(shared_history()).register()
+        return _api
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the data model graph as JSON")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--host", default=SERVER_HOST, help=f"Interface to listen on (default: {SERVER_HOST}, from MODEL_SERVER_URL)")
+    args = parser.parse_args()
+
+    history = shared_history()
+    history.publish(MODEL_VERSION, *load_model())
+    GraphAPI(history).register()
+    print(f"Serving /versions, /graph, /subgraph and /metrics on port {args.port}")
+    print(f"Requests need ?token={SERVER_TOKEN} or an 'Authorization: Bearer' header with it")
+    serve(args.port, background=False, host=args.host)
@@ -0,0 +1,181 @@
+import collections
+import threading
+
+APPROVERS = ("MHA Approval", "CSA Approval", "SNDGO Approval")
+
+# SCA/RML approval stages, in the order a system progresses through them
+STAGES = ("Not Started", "Proposed", "IDSC Approved", "Agencies Approved", "Endorsed")
+
+APPROVAL_FIELDS = (
+    "System ID",
+    "Agency Name",
+    "Ministry Family Name",
+    "Agency Proposed RML",
+    "IDSC Approval Date",
+    *APPROVERS,
+    "Endorsed RML",
+    "RML Endorsement Date",
+)
+
+PORTFOLIO = ("portfolio",)
+
+
+def _status(value):
+    value = str(value or "").strip()
+    return value.title() if value else "Pending"
+
+
+def approval_stage(record):
+    """Returns the furthest SCA/RML approval stage a system record has reached."""
+    if record.get("Endorsed RML") and record.get("RML Endorsement Date"):
+        return "Endorsed"
+    if all(_status(record.get(approver)) == "Approved" for approver in APPROVERS):
+        return "Agencies Approved"
+    if record.get("IDSC Approval Date"):
+        return "IDSC Approved"
+    if record.get("Agency Proposed RML"):
+        return "Proposed"
+    return "Not Started"
+
+
+def _contributions(record):
+    """Returns the rollup scopes a record counts towards and the counters it increments."""
+    scopes = [PORTFOLIO]
+    if record.get("Agency Name"):
+        scopes.append(("agency", record["Agency Name"]))
+    if record.get("Ministry Family Name"):
+        scopes.append(("ministry_family", record["Ministry Family Name"]))
+    metrics = ["Total", f"Stage: {approval_stage(record)}"]
+    metrics.extend(f"{approver}: {_status(record.get(approver))}" for approver in APPROVERS)
+    return scopes, metrics
+
+
+class ApprovalRollups:
+    """Materialised approval counters by agency, ministry family and approval stage.
+
+    Each system's contribution to the counters is remembered, so a changed
+    record is applied by retracting its old contribution and adding the new
+    one; dashboard reads are then lookups instead of scans over the systems.
+    """
+
+    def __init__(self, records=()):
+        self._lock = threading.Lock()
+        self._counters = collections.defaultdict(collections.Counter)
+        self._contributions = {}
+        self._revision = None
+        for record in records:
+            self.upsert(record)
+
+    def _apply(self, contribution, sign):
+        scopes, metrics = contribution
+        for scope in scopes:
+            counter = self._counters[scope]
+            for metric in metrics:
+                counter[metric] += sign
+                if not counter[metric]:
+                    del counter[metric]
+            if not counter:
+                del self._counters[scope]
+
+    def upsert(self, record):
+        """Applies a new or changed system record to every rollup it belongs to."""
+        contribution = _contributions(record)
+        with self._lock:
+            previous = self._contributions.get(record["System ID"])
+            if previous == contribution:
+                return
+            if previous is not None:
+                self._apply(previous, -1)
+            self._apply(contribution, 1)
+            self._contributions[record["System ID"]] = contribution
+
+    def remove(self, system_id):
+        with self._lock:
+            previous = self._contributions.pop(system_id, None)
+            if previous is not None:
+                self._apply(previous, -1)
+
+    def _scope(self, agency, ministry_family):
+        if agency is not None:
+            return ("agency", agency)
+        if ministry_family is not None:
+            return ("ministry_family", ministry_family)
+        return PORTFOLIO
+
+    def count(self, metric, agency=None, ministry_family=None):
+        """Returns one counter, e.g. count("Stage: Endorsed", agency="GovTech")."""
+        with self._lock:
+            return self._counters.get(self._scope(agency, ministry_family), {}).get(metric, 0)
+
+    def summary(self, agency=None, ministry_family=None):
+        """Returns every counter of the portfolio, one agency or one ministry family."""
+        with self._lock:
+            return dict(self._counters.get(self._scope(agency, ministry_family), {}))
+
+    def stages(self, agency=None, ministry_family=None):
+        """Returns the number of systems at each approval stage, in stage order."""
+        summary = self.summary(agency, ministry_family)
+        return {stage: summary.get(f"Stage: {stage}", 0) for stage in STAGES}
+
+    def agencies(self):
+        with self._lock:
+            return sorted(scope[1] for scope in self._counters if scope[0] == "agency")
+
+    def ministry_families(self):
+        with self._lock:
+            return sorted(scope[1] for scope in self._counters if scope[0] == "ministry_family")
+
+    def _systems_changed(self, database, keys, fields):
+        """Re-reads the approval fields of the changed systems and applies them."""
+        if fields is not None and not set(fields) & set(APPROVAL_FIELDS):
+            return
+        columns = database.system_columns(APPROVAL_FIELDS, keys)
+        records = [dict(zip(columns, values)) for values in zip(*columns.values())]
+        for record in records:
+            self.upsert(record)
+        with self._lock:
+            known = set(self._contributions) if keys is None else set(keys)
+        for system_id in known - {record["System ID"] for record in records}:
+            self.remove(system_id)
+
+    def follow(self, database):
+        """Applies the changes made to the systems table through a `db.Database` in this process as they happen."""
+        def changed(table, keys, fields):
+            if table == "systems":
+                self._systems_changed(database, keys, fields)
+
+        database.subscribe(changed)
+        return self
+
+    def sync(self, database):
+        """Re-reads the systems once their revision has moved, so writes from other processes are applied too.
+
+        Only the records that changed alter the counters.
+        """
+        # Read before the data, so a write landing during the scan is picked up next time
+        revision = database.revisions("systems")
+        with self._lock:
+            if revision == self._revision:
+                return self
+            self._revision = revision
+        self._systems_changed(database, None, None)
+        return self
+
+    @classmethod
+    def from_database(cls, database):
+        """Builds the rollups from the systems table of a `db.Database` and follows its changes."""
+        return cls().follow(database).sync(database)
+
+
+_rollups = {}
+_rollups_lock = threading.Lock()
+
+
+def shared_approval_rollups(database):
+    """Returns the process-wide rollups of a database, synced with its systems table on every call."""
+    key = database.pool.path
+    with _rollups_lock:
+        if key not in _rollups:
+            _rollups[key] = ApprovalRollups.from_database(database)
+        rollups = _rollups[key]
+    return rollups.sync(database)
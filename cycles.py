@@ -0,0 +1,321 @@
+import argparse
+import json
+import threading
+
+import networkx as nx
+import numpy as np
+
+from db import DATABASE_PATH, Database
+from filters import shared_instance_view
+from graph import render_html
+from layout import NODE_SPACING, positions as layout_positions
+from static_render import render_svg
+
+CYCLE_COLOR = "#C62828"
+
+# Collapses every dependency cycle into one node when the page loads;
+# double-clicking a cycle opens it and double-clicking a member closes it again.
+CONDENSE_HTML = """
+<script>
+    (function () {
+        var cycles = %(cycles)s;
+        var cycleOf = {};
+        function collapse(cycle) {
+            network.cluster({
+                joinCondition: function (node) { return cycleOf[node.id] === cycle.id; },
+                clusterNodeProperties: {
+                    id: cycle.id, label: cycle.label, title: cycle.title,
+                    shape: "diamond", color: %(color)s, size: 25
+                }
+            });
+        }
+        cycles.forEach(function (cycle) {
+            cycle.members.forEach(function (member) { cycleOf[member] = cycle.id; });
+            collapse(cycle);
+        });
+        var byId = {};
+        cycles.forEach(function (cycle) { byId[cycle.id] = cycle; });
+        network.on("doubleClick", function (event) {
+            if (!event.nodes.length) {
+                return;
+            }
+            var id = event.nodes[0];
+            if (network.isCluster(id)) {
+                network.openCluster(id);
+            } else if (cycleOf[id] !== undefined) {
+                collapse(byId[cycleOf[id]]);
+            }
+        });
+    })();
+</script>
+"""
+
+
+def adjacency(n, src, dst):
+    """Returns the compressed sparse row form (indptr, indices) of n nodes' edges src -> dst."""
+    src = np.asarray(src, dtype=np.int64)
+    dst = np.asarray(dst, dtype=np.int64)
+    order = np.argsort(src, kind="stable")
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+    return indptr, dst[order]
+
+
+def strongly_connected_components(indptr, indices):
+    """Labels every node with its strongly connected component, numbered in topological order.
+
+    An iterative Tarjan over the CSR arrays, so graph depth is not bounded
+    by the recursion limit. Components are found sinks first, so reversing
+    their numbering puts every component after the components upstream of
+    it. Returns the labels and the number of components.
+    """
+    n = len(indptr) - 1
+    indptr = indptr.tolist()
+    indices = indices.tolist()
+    index = [-1] * n
+    low = [0] * n
+    on_stack = [False] * n
+    label = [0] * n
+    stack = []
+    count = components = 0
+    for root in range(n):
+        if index[root] >= 0:
+            continue
+        index[root] = low[root] = count
+        count += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [[root, indptr[root]]]
+        while work:
+            frame = work[-1]
+            v, i = frame
+            end = indptr[v + 1]
+            while i < end:
+                w = indices[i]
+                i += 1
+                if index[w] < 0:
+                    frame[1] = i
+                    index[w] = low[w] = count
+                    count += 1
+                    stack.append(w)
+                    on_stack[w] = True
+                    work.append([w, indptr[w]])
+                    break
+                if on_stack[w] and index[w] < low[v]:
+                    low[v] = index[w]
+            else:
+                work.pop()
+                if low[v] == index[v]:
+                    while True:
+                        w = stack.pop()
+                        on_stack[w] = False
+                        label[w] = components
+                        if w == v:
+                            break
+                    components += 1
+                if work:
+                    u = work[-1][0]
+                    if low[v] < low[u]:
+                        low[u] = low[v]
+    return components - 1 - np.array(label, dtype=np.int64), components
+
+
+def condensation(n, src, dst):
+    """Collapses the strongly connected components of n nodes' edges src -> dst.
+
+    Returns each node's component (in topological order), the number of
+    components and the distinct edges between components as two arrays.
+    """
+    component, k = strongly_connected_components(*adjacency(n, src, dst))
+    upstream = component[np.asarray(src, dtype=np.int64)]
+    downstream = component[np.asarray(dst, dtype=np.int64)]
+    between = upstream != downstream
+    keys = np.unique(upstream[between] * k + downstream[between])
+    return component, k, keys // k, keys % k
+
+
+class DependencyCycles:
+    """The circular dependencies among systems, for recovery planning.
+
+    `dependencies` is an iterable of ("Upstream System", "Dependent System")
+    pairs; systems only named by a dependency are added to `system_ids`.
+    """
+
+    def __init__(self, system_ids, dependencies):
+        self.system_ids = list(system_ids)
+        self.index = {system_id: i for i, system_id in enumerate(self.system_ids)}
+        src, dst = [], []
+        for upstream, dependent in dependencies:
+            for system_id in (upstream, dependent):
+                if system_id not in self.index:
+                    self.index[system_id] = len(self.system_ids)
+                    self.system_ids.append(system_id)
+            src.append(self.index[upstream])
+            dst.append(self.index[dependent])
+        n = len(self.system_ids)
+        self.src = np.array(src, dtype=np.int64)
+        self.dst = np.array(dst, dtype=np.int64)
+        self.indptr, self.indices = adjacency(n, self.src, self.dst)
+        self.component, self.count, self.edge_src, self.edge_dst = condensation(n, self.src, self.dst)
+
+        order = np.argsort(self.component, kind="stable")
+        bounds = np.searchsorted(self.component[order], np.arange(self.count + 1))
+        self.members = [order[bounds[c]:bounds[c + 1]] for c in range(self.count)]
+        looped = np.zeros(self.count, dtype=bool)
+        looped[self.component[self.src[self.src == self.dst]]] = True
+        inside = self.component[self.src] == self.component[self.dst]
+        self.internal_edges = np.bincount(self.component[self.src[inside]], minlength=self.count)
+        # Components with more than one system, or a system depending on itself
+        self.cycles = [c for c in range(self.count) if len(self.members[c]) > 1 or looped[c]]
+
+    def example_cycle(self, c):
+        """Returns one shortest cycle through the first system of component `c`, as System IDs."""
+        start = int(self.members[c][0])
+        parent = {start: None}
+        level = [start]
+        while level:
+            following = []
+            for v in level:
+                for w in self.indices[self.indptr[v]:self.indptr[v + 1]].tolist():
+                    if w == start:
+                        path = [start]
+                        while v is not None:
+                            path.append(v)
+                            v = parent[v]
+                        return [self.system_ids[i] for i in reversed(path)]
+                    if w not in parent and self.component[w] == c:
+                        parent[w] = v
+                        following.append(w)
+            level = following
+        return []
+
+    def report(self):
+        """Returns every dependency cycle, largest first, with its systems and an example loop."""
+        report = []
+        for c in self.cycles:
+            report.append({
+                "systems": sorted(self.system_ids[i] for i in self.members[c]),
+                "dependencies": int(self.internal_edges[c]),
+                "example": self.example_cycle(c),
+            })
+        report.sort(key=lambda cycle: (-len(cycle["systems"]), cycle["systems"]))
+        return report
+
+
+def _cycle_name(number):
+    return f"Cycle {number}"
+
+
+class CondensedView:
+    """The portfolio graph as a DAG of its dependency cycles, each collapsible to one node.
+
+    The condensed graph, where every cycle is one node, is laid out once per
+    layout mode; systems in a cycle are placed in a ring around their
+    cycle's node, so they open in place when the cycle is expanded.
+    """
+
+    def __init__(self, G):
+        self.graph = G
+        self.cycles = DependencyCycles(list(G), G.edges())
+        self.names = {}
+        self._report = [dict(entry, cycle=_cycle_name(n)) for n, entry in enumerate(self.cycles.report(), 1)]
+        for entry in self._report:
+            component = self.cycles.component[self.cycles.index[entry["systems"][0]]]
+            self.names[int(component)] = (entry["cycle"], entry)
+        self.condensed = self._condense()
+        self._lock = threading.Lock()
+        self._positions = {}
+
+    def _node(self, c):
+        if c in self.names:
+            return self.names[c][0]
+        return self.cycles.system_ids[self.cycles.members[c][0]]
+
+    def _condense(self):
+        condensed = nx.DiGraph()
+        for c in range(self.cycles.count):
+            if c in self.names:
+                name, entry = self.names[c]
+                condensed.add_node(
+                    name,
+                    label=f"{name} ({len(entry['systems'])} systems)",
+                    title=f"{name}\n" + " → ".join(entry["example"]),
+                    color=CYCLE_COLOR,
+                    shape="diamond",
+                    size=25,
+                    kind="cycle",
+                )
+            else:
+                system_id = self._node(c)
+                condensed.add_node(system_id, **self.graph.nodes[system_id])
+        condensed.add_edges_from(
+            (self._node(u), self._node(v)) for u, v in zip(self.cycles.edge_src.tolist(), self.cycles.edge_dst.tolist())
+        )
+        return nx.freeze(condensed)
+
+    def positions(self, hierarchical):
+        """Positions of the condensed graph's nodes and of every system, members ringed around their cycle."""
+        with self._lock:
+            if hierarchical not in self._positions:
+                placed = dict(layout_positions(self.condensed, hierarchical))
+                for c, (name, entry) in self.names.items():
+                    x, y = placed[name]
+                    radius = NODE_SPACING / 4 * max(len(entry["systems"]) ** 0.5, 1)
+                    members = self.cycles.members[c]
+                    for i, member in enumerate(members):
+                        angle = 2 * np.pi * i / len(members)
+                        placed[self.cycles.system_ids[member]] = (x + radius * np.cos(angle), y + radius * np.sin(angle))
+                self._positions[hierarchical] = placed
+            return self._positions[hierarchical]
+
+    def report(self):
+        """The dependency cycles, largest first, each with the name of its node under "cycle"."""
+        return self._report
+
+    def html(self, hierarchical):
+        """The whole portfolio with every cycle collapsed into a node that opens on double-click."""
+        cycles = [
+            {
+                "id": name,
+                "label": self.condensed.nodes[name]["label"],
+                "title": self.condensed.nodes[name]["title"],
+                "members": entry["systems"],
+            }
+            for name, entry in self.names.values()
+        ]
+        html = render_html(self.graph, hierarchical, self.positions(hierarchical))
+        script = CONDENSE_HTML % {"cycles": json.dumps(cycles), "color": json.dumps(CYCLE_COLOR)}
+        return html.replace("</body>", f"{script}</body>")
+
+    def svg(self, hierarchical):
+        return render_svg(self.condensed, hierarchical, self.positions(hierarchical))
+
+
+_condensed = {}
+_condensed_lock = threading.Lock()
+
+
+def shared_condensed_view(database):
+    """Returns the process-wide condensed view of a database's systems, rebuilt when their graph is."""
+    G = shared_instance_view(database).graph
+    with _condensed_lock:
+        key = database.pool.path
+        if key not in _condensed or _condensed[key].graph is not G:
+            _condensed[key] = CondensedView(G)
+        return _condensed[key]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report circular dependencies between systems")
+    parser.add_argument("--database", default=DATABASE_PATH)
+    args = parser.parse_args()
+
+    database = Database(args.database)
+    pairs = ((d["Upstream System"], d["Dependent System"]) for d in database.query("SELECT * FROM dependencies"))
+    systems = [row["System ID"] for row in database.query('SELECT "System ID" FROM systems')]
+    cycles = DependencyCycles(systems, pairs)
+    report = cycles.report()
+    print(f"{len(report)} dependency cycles among {len(cycles.system_ids)} systems ({cycles.count} components)")
+    for number, entry in enumerate(report, 1):
+        print(f"{_cycle_name(number)}: {len(entry['systems'])} systems, {entry['dependencies']} dependencies")
+        print(f"  {' -> '.join(entry['example'])}")
@@ -0,0 +1,351 @@
+"""The data model the app publishes as MODEL_VERSION.
+
+Edit it here: `model.load_model` reads the literals below without running
+this module, and the app, the prewarm, the hot-reload watcher and the CLIs
+all get the model that way, so the app script does not rebuild it on every
+rerun.
+"""
+
+# Define standardised settings
+NODE_SETTINGS = {
+    "module": {
+        "size": 50,
+        "shape": "dot"
+    },
+    "submodule": {
+        "size": 35,
+        "shape": "dot"
+    },
+    "subgroup": {
+        "size": 25,
+        "shape": "dot"
+    },
+    "field": {
+        "size": 15,
+        "shape": "dot"
+    }
+}
+
+COLOR_SCHEMES = {
+    "system_management": {
+        "module": "#1B5E20",      # Darkest green
+        "submodule": "#2E7D32",   # Dark green
+        "subgroup": "#388E3C",    # Medium green
+        "field": "#43A047"        # Light green
+    },
+    "agency_management": {
+        "module": "#1A237E",      # Darkest blue
+        "submodule": "#283593",   # Dark blue
+        "subgroup": "#303F9F",    # Medium blue
+        "field": "#3949AB"        # Light blue
+    }
+}
+
+# Complete entities dictionary with all nodes
+entities = {
+    # Root node
+    "DGP 2.0": {
+        "color": "#1A237E",  # Dark blue color
+        "size": 60,  # Larger than module size
+        "shape": NODE_SETTINGS["module"]["shape"],
+        "title": "DGP 2.0 Root"
+    },
+
+    # System Management Module and related nodes
+    "System Management": {
+        "color": COLOR_SCHEMES["system_management"]["module"],
+        "size": NODE_SETTINGS["module"]["size"],
+        "shape": NODE_SETTINGS["module"]["shape"],
+        "title": "System Management Module"
+    },
+    "System Identity & Classification": {
+        "color": COLOR_SCHEMES["system_management"]["submodule"],
+        "size": NODE_SETTINGS["submodule"]["size"],
+        "shape": NODE_SETTINGS["submodule"]["shape"],
+        "title": "System Identity & Classification Sub-Module"
+    },
+    "Criticality & Risk": {
+        "color": COLOR_SCHEMES["system_management"]["submodule"],
+        "size": NODE_SETTINGS["submodule"]["size"],
+        "shape": NODE_SETTINGS["submodule"]["shape"],
+        "title": "Criticality & Risk Sub-Module"
+    },
+    "System Resilience": {
+        "color": COLOR_SCHEMES["system_management"]["submodule"],
+        "size": NODE_SETTINGS["submodule"]["size"],
+        "shape": NODE_SETTINGS["submodule"]["shape"],
+        "title": "System Resilience Sub-Module"
+    },
+    "Hosting and System Dependencies": {
+        "color": COLOR_SCHEMES["system_management"]["submodule"],
+        "size": NODE_SETTINGS["submodule"]["size"],
+        "shape": NODE_SETTINGS["submodule"]["shape"],
+        "title": "Hosting and System Dependencies Sub-Module"
+    },
+
+        # Agency Management Module and related nodes
+    "Agency Management": {
+        "color": COLOR_SCHEMES["agency_management"]["module"],
+        "size": NODE_SETTINGS["module"]["size"],
+        "shape": NODE_SETTINGS["module"]["shape"],
+        "title": "Agency Management Module"
+    },
+    "Agency": {
+        "color": COLOR_SCHEMES["agency_management"]["submodule"],
+        "size": NODE_SETTINGS["submodule"]["size"],
+        "shape": NODE_SETTINGS["submodule"]["shape"],
+        "title": "Agency Sub-Module"
+    },
+    "Key Appointment Holder": {
+        "color": COLOR_SCHEMES["agency_management"]["submodule"],
+        "size": NODE_SETTINGS["submodule"]["size"],
+        "shape": NODE_SETTINGS["submodule"]["shape"],
+        "title": "Key Appointment Holder Sub-Module"
+    },
+
+    # System Management Subgroups
+    "Basic Information": {
+        "color": COLOR_SCHEMES["system_management"]["subgroup"],
+        "size": NODE_SETTINGS["subgroup"]["size"],
+        "shape": NODE_SETTINGS["subgroup"]["shape"],
+        "title": "Basic Information Sub-Group"
+    },
+    "Organizational Context": {
+        "color": COLOR_SCHEMES["system_management"]["subgroup"],
+        "size": NODE_SETTINGS["subgroup"]["size"],
+        "shape": NODE_SETTINGS["subgroup"]["shape"],
+        "title": "Organizational Context Sub-Group"
+    },
+    "Classification": {
+        "color": COLOR_SCHEMES["system_management"]["subgroup"],
+        "size": NODE_SETTINGS["subgroup"]["size"],
+        "shape": NODE_SETTINGS["subgroup"]["shape"],
+        "title": "Classification Sub-Group"
+    },
+    "Impact Assessment": {
+        "color": COLOR_SCHEMES["system_management"]["subgroup"],
+        "size": NODE_SETTINGS["subgroup"]["size"],
+        "shape": NODE_SETTINGS["subgroup"]["shape"],
+        "title": "Impact Assessment Sub-Group"
+    },
+    "Risk Profile": {
+        "color": COLOR_SCHEMES["system_management"]["subgroup"],
+        "size": NODE_SETTINGS["subgroup"]["size"],
+        "shape": NODE_SETTINGS["subgroup"]["shape"],
+        "title": "Risk Profile Sub-Group"
+    },
+    "SCA/RML Approval": {
+        "color": COLOR_SCHEMES["system_management"]["subgroup"],
+        "size": NODE_SETTINGS["subgroup"]["size"],
+        "shape": NODE_SETTINGS["subgroup"]["shape"],
+        "title": "SCA/RML Approval Sub-Group"
+    },
+    "Availability & Recovery": {
+        "color": COLOR_SCHEMES["system_management"]["subgroup"],
+        "size": NODE_SETTINGS["subgroup"]["size"],
+        "shape": NODE_SETTINGS["subgroup"]["shape"],
+        "title": "Availability & Recovery Sub-Group"
+    },
+    "Dependencies Management": {
+        "color": COLOR_SCHEMES["system_management"]["subgroup"],
+        "size": NODE_SETTINGS["subgroup"]["size"],
+        "shape": NODE_SETTINGS["subgroup"]["shape"],
+        "title": "Dependencies Management Sub-Group"
+    },
+
+        # Fields for both modules
+    # Agency Management Fields
+    "Agency Name": {
+        "color": COLOR_SCHEMES["agency_management"]["field"],
+        "size": NODE_SETTINGS["field"]["size"],
+        "shape": NODE_SETTINGS["field"]["shape"],
+        "title": "Agency Name field"
+    },
+    "Agency Abbreviation (Short Form)": {
+        "color": COLOR_SCHEMES["agency_management"]["field"],
+        "size": NODE_SETTINGS["field"]["size"],
+        "shape": NODE_SETTINGS["field"]["shape"],
+        "title": "Agency Abbreviation field"
+    },
+    "Agency Operational Status": {
+        "color": COLOR_SCHEMES["agency_management"]["field"],
+        "size": NODE_SETTINGS["field"]["size"],
+        "shape": NODE_SETTINGS["field"]["shape"],
+        "title": "Agency Operational Status field"
+    },
+    "Ministry Family": {
+        "color": COLOR_SCHEMES["agency_management"]["field"],
+        "size": NODE_SETTINGS["field"]["size"],
+        "shape": NODE_SETTINGS["field"]["shape"],
+        "title": "Ministry Family field"
+    },
+    "Full Name": {
+        "color": COLOR_SCHEMES["agency_management"]["field"],
+        "size": NODE_SETTINGS["field"]["size"],
+        "shape": NODE_SETTINGS["field"]["shape"],
+        "title": "Full Name field"
+    },
+    "Designation": {
+        "color": COLOR_SCHEMES["agency_management"]["field"],
+        "size": NODE_SETTINGS["field"]["size"],
+        "shape": NODE_SETTINGS["field"]["shape"],
+        "title": "Designation field"
+    },
+    "Email": {
+        "color": COLOR_SCHEMES["agency_management"]["field"],
+        "size": NODE_SETTINGS["field"]["size"],
+        "shape": NODE_SETTINGS["field"]["shape"],
+        "title": "Email field"
+    },
+
+    # System Management Fields
+    "System ID": {
+        "color": COLOR_SCHEMES["system_management"]["field"],
+        "size": NODE_SETTINGS["field"]["size"],
+        "shape": NODE_SETTINGS["field"]["shape"],
+        "title": "System ID field"
+    },
+    "System Name": {
+        "color": COLOR_SCHEMES["system_management"]["field"],
+        "size": NODE_SETTINGS["field"]["size"],
+        "shape": NODE_SETTINGS["field"]["shape"],
+        "title": "System Name field"
+    },
+    "System Description": {
+        "color": COLOR_SCHEMES["system_management"]["field"],
+        "size": NODE_SETTINGS["field"]["size"],
+        "shape": NODE_SETTINGS["field"]["shape"],
+        "title": "System Description field"
+    },
+    "System Status": {
+        "color": COLOR_SCHEMES["system_management"]["field"],
+        "size": NODE_SETTINGS["field"]["size"],
+        "shape": NODE_SETTINGS["field"]["shape"],
+        "title": "System Status field"
+    },
+    "System Classification": {
+        "color": COLOR_SCHEMES["system_management"]["field"],
+        "size": NODE_SETTINGS["field"]["size"],
+        "shape": NODE_SETTINGS["field"]["shape"],
+        "title": "System Classification field"
+    },
+    "Impact Level": {
+        "color": COLOR_SCHEMES["system_management"]["field"],
+        "size": NODE_SETTINGS["field"]["size"],
+        "shape": NODE_SETTINGS["field"]["shape"],
+        "title": "Impact Level field"
+    },
+    "Risk Level": {
+        "color": COLOR_SCHEMES["system_management"]["field"],
+        "size": NODE_SETTINGS["field"]["size"],
+        "shape": NODE_SETTINGS["field"]["shape"],
+        "title": "Risk Level field"
+    },
+    "SCA Status": {
+        "color": COLOR_SCHEMES["system_management"]["field"],
+        "size": NODE_SETTINGS["field"]["size"],
+        "shape": NODE_SETTINGS["field"]["shape"],
+        "title": "SCA Status field"
+    },
+    "RML Status": {
+        "color": COLOR_SCHEMES["system_management"]["field"],
+        "size": NODE_SETTINGS["field"]["size"],
+        "shape": NODE_SETTINGS["field"]["shape"],
+        "title": "RML Status field"
+    },
+    "System Availability": {
+        "color": COLOR_SCHEMES["system_management"]["field"],
+        "size": NODE_SETTINGS["field"]["size"],
+        "shape": NODE_SETTINGS["field"]["shape"],
+        "title": "System Availability field"
+    },
+    "Recovery Time": {
+        "color": COLOR_SCHEMES["system_management"]["field"],
+        "size": NODE_SETTINGS["field"]["size"],
+        "shape": NODE_SETTINGS["field"]["shape"],
+        "title": "Recovery Time field"
+    },
+    "Dependencies": {
+        "color": COLOR_SCHEMES["system_management"]["field"],
+        "size": NODE_SETTINGS["field"]["size"],
+        "shape": NODE_SETTINGS["field"]["shape"],
+        "title": "Dependencies field"
+    }
+}
+
+# Complete edges list
+edges = [
+    # Root node connections
+    ("DGP 2.0", "System Management", "", ""),
+    ("DGP 2.0", "Agency Management", "", ""),
+
+    # System Management Module relationships
+    ("System Management", "System Identity & Classification", "", ""),
+    ("System Management", "Criticality & Risk", "", ""),
+    ("System Management", "System Resilience", "", ""),
+    ("System Management", "Hosting and System Dependencies", "", ""),
+
+    # System Identity & Classification relationships
+    ("System Identity & Classification", "Basic Information", "", ""),
+    ("System Identity & Classification", "Organizational Context", "", ""),
+    ("System Identity & Classification", "Classification", "", ""),
+
+    # Criticality & Risk relationships
+    ("Criticality & Risk", "Impact Assessment", "", ""),
+    ("Criticality & Risk", "Risk Profile", "", ""),
+    ("Criticality & Risk", "SCA/RML Approval", "", ""),
+
+    # System Resilience relationships
+    ("System Resilience", "Availability & Recovery", "", ""),
+
+    # Hosting and System Dependencies relationships
+    ("Hosting and System Dependencies", "Dependencies Management", "", ""),
+
+    # Agency Management Module relationships
+    ("Agency Management", "Agency", "", ""),
+    ("Agency Management", "Key Appointment Holder", "", ""),
+
+    # Field relationships for Basic Information
+    ("Basic Information", "System ID", "", ""),
+    ("Basic Information", "System Name", "", ""),
+    ("Basic Information", "System Description", "", ""),
+    ("Basic Information", "System Status", "", ""),
+
+    # Field relationships for Organizational Context
+    ("Organizational Context", "Agency Name", "", ""),
+
+    # Field relationships for Classification
+    ("Classification", "System Classification", "", ""),
+
+    # Field relationships for Impact Assessment
+    ("Impact Assessment", "Impact Level", "", ""),
+
+    # Field relationships for Risk Profile
+    ("Risk Profile", "Risk Level", "", ""),
+
+    # Field relationships for SCA/RML Approval
+    ("SCA/RML Approval", "SCA Status", "", ""),
+    ("SCA/RML Approval", "RML Status", "", ""),
+
+    # Field relationships for Availability & Recovery
+    ("Availability & Recovery", "System Availability", "", ""),
+    ("Availability & Recovery", "Recovery Time", "", ""),
+
+    # Field relationships for Dependencies Management
+    ("Dependencies Management", "Dependencies", "", ""),
+
+    # Field relationships for Agency
+    ("Agency", "Agency Name", "", ""),
+    ("Agency", "Agency Abbreviation (Short Form)", "", ""),
+    ("Agency", "Agency Operational Status", "", ""),
+    ("Agency", "Ministry Family", "", ""),
+
+    # Field relationships for Key Appointment Holder
+    ("Key Appointment Holder", "Full Name", "", ""),
+    ("Key Appointment Holder", "Designation", "", ""),
+    ("Key Appointment Holder", "Email", "", ""),
+
+    # Cross-module relationships
+    #("Agency Name", "Agency", "", ""),
+    #("Dependencies", "System ID", "", "")
+]
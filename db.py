@@ -0,0 +1,493 @@
+import contextlib
+import json
+import os
+import queue
+import sqlite3
+import threading
+
+from ingest import NUMERIC_FIELDS
+from model import INSTANCE_MODEL_SOURCE, ROOT, fields_under, load_model, model_fields
+from rml import ABOVE, ALIGNMENT_LABELS, BELOW
+
+DATABASE_PATH = os.environ.get("DATA_MODEL_DB", os.path.join(ROOT, "data_model.db"))
+
+# Fields that describe one dependency between two systems rather than a system
+DEPENDENCY_FIELDS = (
+    "Dependency ID",
+    "Dependency Status",
+    "Dependency Type",
+    "Upstream System",
+    "Dependent System",
+    "Data Exchange Frequency",
+)
+
+# Secondary indexes, on top of each table's primary key
+INDEXES = {
+    "systems": (("Agency Name", "RML Alignment"), ("Ministry Family Name",), ("System Status",)),
+    "dependencies": (("Upstream System",), ("Dependent System",)),
+    "agencies": (("Ministry Family",),),
+    "key_appointment_holders": (("Agency Name",), ("Full Name",)),
+}
+
+RML_MISMATCH = (ALIGNMENT_LABELS[ABOVE], ALIGNMENT_LABELS[BELOW])
+
+_MODEL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS model_nodes (
+    version TEXT NOT NULL,
+    name TEXT NOT NULL,
+    color TEXT,
+    size INTEGER,
+    shape TEXT,
+    title TEXT,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (version, name)
+);
+CREATE TABLE IF NOT EXISTS model_edges (
+    version TEXT NOT NULL,
+    source TEXT NOT NULL,
+    target TEXT NOT NULL,
+    label TEXT,
+    arrows TEXT,
+    position INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS model_edges_source ON model_edges (version, source);
+CREATE INDEX IF NOT EXISTS model_edges_target ON model_edges (version, target);
+CREATE TABLE IF NOT EXISTS node_metadata (
+    version TEXT NOT NULL,
+    name TEXT NOT NULL,
+    metadata TEXT NOT NULL,
+    PRIMARY KEY (version, name)
+);
+CREATE TABLE IF NOT EXISTS inferred_dependencies (
+    dependency_id TEXT PRIMARY KEY,
+    exchanges INTEGER NOT NULL,
+    days INTEGER NOT NULL,
+    confidence REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS revisions (
+    name TEXT PRIMARY KEY,
+    revision INTEGER NOT NULL
+);
+"""
+
+# "Dependency Type" of the dependencies inferred from data-exchange logs
+INFERRED = "Inferred"
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def instance_tables(entities, edges):
+    """Maps each instance table to its model fields and primary key field."""
+    systems = [f for f in model_fields(entities, edges, "System Management") if f not in DEPENDENCY_FIELDS]
+    holders = fields_under(entities, edges, "Key Appointment Holder")
+    return {
+        "systems": (systems, "System ID"),
+        "dependencies": (list(DEPENDENCY_FIELDS), "Dependency ID"),
+        "agencies": (fields_under(entities, edges, "Agency"), "Agency Name"),
+        "key_appointment_holders": (["Agency Name"] + holders, "Email"),
+    }
+
+
+def schema_statements(tables):
+    """Yields the CREATE TABLE and CREATE INDEX statements of the instance tables."""
+    for table, (fields, key) in tables.items():
+        columns = ", ".join(
+            f"{_quote(field)} {'REAL' if field in NUMERIC_FIELDS else 'TEXT'}"
+            + (" PRIMARY KEY" if field == key else "")
+            for field in fields
+        )
+        yield f"CREATE TABLE IF NOT EXISTS {table} ({columns})"
+        for index in INDEXES.get(table, ()):
+            name = _quote(f"{table}_{'_'.join(index)}".lower().replace(" ", "_"))
+            yield f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(map(_quote, index))})"
+
+
+class ConnectionPool:
+    """Thread-safe pool of SQLite connections to one database file.
+
+    At most `size` connections are ever opened; callers beyond that wait for
+    one to be returned instead of opening their own.
+    """
+
+    def __init__(self, path, size=4, timeout=30.0):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def _open(self):
+        connection = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                try:
+                    return self._open()
+                except Exception:
+                    self._opened -= 1
+                    raise
+        return self._idle.get(timeout=self.timeout)
+
+    @contextlib.contextmanager
+    def connection(self):
+        """Borrows a connection for one transaction, committed unless the block raises."""
+        connection = self._acquire()
+        try:
+            yield connection
+            connection.commit()
+        except BaseException:
+            connection.rollback()
+            raise
+        finally:
+            self._idle.put(connection)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._opened -= 1
+
+
+class Database:
+    """SQLite store for data model versions and system/agency instance data.
+
+    This is the authoritative copy of the instance data: the app, derived
+    fields, dependency cycles and inference all read it, and exports are
+    loaded into it with `python ingest.py <export> --database <path>`.
+    `store.InstanceStore` keeps columnar Parquet copies of exports for
+    portfolio-wide analysis only; it is loaded from the same exports and
+    nothing here reads it.
+    """
+
+    def __init__(self, path=DATABASE_PATH, pool_size=4, model_source=INSTANCE_MODEL_SOURCE):
+        self.pool = ConnectionPool(path, pool_size)
+        self.tables = instance_tables(*load_model(model_source))
+        self.listeners = []
+        self.create_schema()
+
+    def create_schema(self):
+        with self.pool.connection() as connection:
+            connection.executescript(_MODEL_SCHEMA)
+            for statement in schema_statements(self.tables):
+                connection.execute(statement)
+
+    # Data model
+
+    def save_model(self, version, entities, edges):
+        """Stores one version of the model, replacing any previous copy of that version."""
+        with self.pool.connection() as connection:
+            connection.execute("DELETE FROM model_nodes WHERE version = ?", (version,))
+            connection.execute("DELETE FROM model_edges WHERE version = ?", (version,))
+            connection.executemany(
+                "INSERT INTO model_nodes VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (version, name, a.get("color"), a.get("size"), a.get("shape"), a.get("title"), i)
+                    for i, (name, a) in enumerate(entities.items())
+                ),
+            )
+            connection.executemany(
+                "INSERT INTO model_edges VALUES (?, ?, ?, ?, ?, ?)",
+                ((version, *edge, i) for i, edge in enumerate(edges)),
+            )
+
+    def load_model(self, version):
+        """Returns the `entities` and `edges` of a stored model version."""
+        with self.pool.connection() as connection:
+            nodes = connection.execute(
+                "SELECT * FROM model_nodes WHERE version = ? ORDER BY position", (version,)
+            ).fetchall()
+            edges = connection.execute(
+                "SELECT source, target, label, arrows FROM model_edges WHERE version = ? ORDER BY position",
+                (version,),
+            ).fetchall()
+        entities = {
+            row["name"]: {"color": row["color"], "size": row["size"], "shape": row["shape"], "title": row["title"]}
+            for row in nodes
+        }
+        return entities, [tuple(row) for row in edges]
+
+    def model_versions(self):
+        with self.pool.connection() as connection:
+            return [row[0] for row in connection.execute("SELECT DISTINCT version FROM model_nodes")]
+
+    def model_children(self, version, node):
+        with self.pool.connection() as connection:
+            rows = connection.execute(
+                "SELECT target FROM model_edges WHERE version = ? AND source = ? ORDER BY position",
+                (version, node),
+            )
+            return [row[0] for row in rows]
+
+    def model_parents(self, version, node):
+        with self.pool.connection() as connection:
+            rows = connection.execute(
+                "SELECT source FROM model_edges WHERE version = ? AND target = ? ORDER BY position",
+                (version, node),
+            )
+            return [row[0] for row in rows]
+
+    def save_metadata(self, version, metadata):
+        """Stores the tooltip metadata (a dict per node name) of one model version."""
+        with self.pool.connection() as connection:
+            connection.execute("DELETE FROM node_metadata WHERE version = ?", (version,))
+            connection.executemany(
+                "INSERT INTO node_metadata VALUES (?, ?, ?)",
+                ((version, name, json.dumps(entry)) for name, entry in metadata.items()),
+            )
+
+    def node_metadata(self, version, name):
+        """Returns the stored metadata of one node, or None."""
+        with self.pool.connection() as connection:
+            row = connection.execute(
+                "SELECT metadata FROM node_metadata WHERE version = ? AND name = ?", (version, name)
+            ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    # Instance data
+
+    def subscribe(self, listener):
+        """Calls `listener(table, keys, fields)` after every committed change to instance data.
+
+        `keys` are the primary keys of the changed records and `fields` the
+        fields changed; either is None when the change is not limited to them.
+        """
+        self.listeners.append(listener)
+
+    def _notify(self, table, keys, fields):
+        for listener in self.listeners:
+            listener(table, keys, fields)
+
+    def _bump(self, connection, name):
+        """Counts a change to `name` within the writing transaction, so every process sees it."""
+        connection.execute(
+            "INSERT INTO revisions VALUES (?, 1) ON CONFLICT (name) DO UPDATE SET revision = revision + 1", (name,)
+        )
+
+    def revisions(self, *names):
+        """Returns how many times each named part of the instance data has changed, e.g. ("systems", "dependencies").
+
+        Every instance table counts its writes from any process; values
+        written by the derived-field scheduler count under "derived".
+        Caches compare these to tell whether what they were built from has changed.
+        """
+        with self.pool.connection() as connection:
+            stored = dict(connection.execute("SELECT name, revision FROM revisions"))
+        return tuple(stored.get(name, 0) for name in names)
+
+    def upsert(self, table, records):
+        """Inserts or replaces records (dicts keyed by field name) in an instance table."""
+        fields, key = self.tables[table]
+        records = list(records)
+        if not records:
+            return
+        unknown = {name for record in records for name in record} - set(fields)
+        if unknown:
+            raise ValueError(f"Fields not in the {table} table: {', '.join(sorted(unknown))}")
+        sql = (
+            f"INSERT OR REPLACE INTO {table} ({', '.join(map(_quote, fields))}) "
+            f"VALUES ({', '.join('?' * len(fields))})"
+        )
+        with self.pool.connection() as connection:
+            connection.executemany(sql, ([record.get(f) for f in fields] for record in records))
+            self._bump(connection, table)
+        # Replaced records lose the fields they did not give, so every field has changed
+        self._notify(table, [record.get(key) for record in records], None)
+
+    def update_systems(self, records, notify=True):
+        """Sets only the fields given in each record of existing systems; records hold their "System ID".
+
+        `notify=False` is for derived values written by `derived.py`: no
+        listener is called and they count as a "derived" revision rather
+        than a "systems" one, so caches of the inputs are not rebuilt.
+        """
+        groups = {}
+        for record in records:
+            groups.setdefault(tuple(f for f in record if f != "System ID"), []).append(record)
+        fields, _ = self.tables["systems"]
+        unknown = {f for group in groups for f in group} - set(fields)
+        if unknown:
+            raise ValueError(f"Fields not in the systems table: {', '.join(sorted(unknown))}")
+        with self.pool.connection() as connection:
+            for group, rows in groups.items():
+                if not group:
+                    continue
+                connection.executemany(
+                    f"UPDATE systems SET {', '.join(f'{_quote(f)} = ?' for f in group)} WHERE \"System ID\" = ?",
+                    ([record[f] for f in group] + [record["System ID"]] for record in rows),
+                )
+            self._bump(connection, "systems" if notify else "derived")
+        if notify:
+            for group, rows in groups.items():
+                self._notify("systems", [record["System ID"] for record in rows], set(group))
+
+    def records(self, table, keys):
+        """Returns the records of an instance table with the given primary keys; missing keys are skipped."""
+        _, key = self.tables[table]
+        keys = list(keys)
+        records = []
+        for i in range(0, len(keys), 500):
+            batch = keys[i:i + 500]
+            records += self.query(
+                f"SELECT * FROM {table} WHERE {_quote(key)} IN ({', '.join('?' * len(batch))})", batch
+            )
+        return records
+
+    def system_columns(self, fields, system_ids=None):
+        """Returns fields of the given systems (every system by default) as columns, with "System ID" first."""
+        fields = ["System ID", *(f for f in fields if f != "System ID")]
+        sql = f"SELECT {', '.join(map(_quote, fields))} FROM systems"
+        columns = {field: [] for field in fields}
+        if system_ids is None:
+            batches = [None]
+        else:
+            system_ids = list(system_ids)
+            batches = [system_ids[i:i + 500] for i in range(0, len(system_ids), 500)]
+        with self.pool.connection() as connection:
+            for batch in batches:
+                rows = connection.execute(
+                    sql if batch is None else f'{sql} WHERE "System ID" IN ({", ".join("?" * len(batch))})',
+                    batch or (),
+                )
+                for row in rows:
+                    for field, value in zip(fields, row):
+                        columns[field].append(value)
+        return columns
+
+    def save_inferred_dependencies(self, inferred):
+        """Replaces the dependencies inferred from data-exchange logs.
+
+        `inferred` holds dicts with the upstream and dependent system, the
+        number of exchanges, the days they were seen on, the exchanges per
+        day (None when the logs carry no dates) and a confidence. Pairs
+        already declared get their Data Exchange Frequency updated when
+        known; the others are added as "Inferred" dependencies, and each
+        system's "Inferred Dependencies" lists its inferred upstreams.
+        """
+        upstreams = {}
+        with self.pool.connection() as connection:
+            cleared = [
+                row[0] for row in connection.execute(
+                    'SELECT "System ID" FROM systems WHERE "Inferred Dependencies" IS NOT NULL'
+                )
+            ]
+            connection.execute('DELETE FROM dependencies WHERE "Dependency Type" = ?', (INFERRED,))
+            connection.execute("DELETE FROM inferred_dependencies")
+            connection.execute('UPDATE systems SET "Inferred Dependencies" = NULL')
+            self._bump(connection, "dependencies")
+            self._bump(connection, "systems")
+            for edge in inferred:
+                updated = connection.execute(
+                    'UPDATE dependencies SET "Data Exchange Frequency" = COALESCE(?, "Data Exchange Frequency") '
+                    'WHERE "Upstream System" = ? AND "Dependent System" = ?',
+                    (edge["frequency"], edge["upstream"], edge["dependent"]),
+                ).rowcount
+                if updated:
+                    continue
+                dependency_id = f"{INFERRED}:{edge['upstream']}>{edge['dependent']}"
+                connection.execute(
+                    'INSERT OR REPLACE INTO dependencies ("Dependency ID", "Dependency Type", "Upstream System", '
+                    '"Dependent System", "Data Exchange Frequency") VALUES (?, ?, ?, ?, ?)',
+                    (dependency_id, INFERRED, edge["upstream"], edge["dependent"], edge["frequency"]),
+                )
+                connection.execute(
+                    "INSERT OR REPLACE INTO inferred_dependencies VALUES (?, ?, ?, ?)",
+                    (dependency_id, edge["exchanges"], edge["days"], edge["confidence"]),
+                )
+                upstreams.setdefault(edge["dependent"], []).append(edge["upstream"])
+            connection.executemany(
+                'UPDATE systems SET "Inferred Dependencies" = ? WHERE "System ID" = ?',
+                ((", ".join(sorted(systems)), system_id) for system_id, systems in upstreams.items()),
+            )
+        self._notify("dependencies", None, None)
+        self._notify("systems", list(dict.fromkeys([*cleared, *upstreams])), {"Inferred Dependencies"})
+
+    def dependencies(self):
+        """Returns every dependency record, with the confidence of inferred ones."""
+        return self.query(
+            "SELECT d.*, i.confidence FROM dependencies d "
+            'LEFT JOIN inferred_dependencies i ON i.dependency_id = d."Dependency ID"'
+        )
+
+    def query(self, sql, params=()):
+        """Runs a read query and returns the rows as dicts."""
+        with self.pool.connection() as connection:
+            return [dict(row) for row in connection.execute(sql, params)]
+
+    def iterate(self, sql, params=()):
+        """Runs a read query and yields the rows as dicts, one at a time."""
+        with self.pool.connection() as connection:
+            for row in connection.execute(sql, params):
+                yield dict(row)
+
+    def distinct_values(self, table, field, limit=None):
+        """Returns the distinct non-null values of one field of an instance table, sorted."""
+        sql = f"SELECT DISTINCT {_quote(field)} FROM {table} WHERE {_quote(field)} IS NOT NULL ORDER BY 1"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        with self.pool.connection() as connection:
+            return [row[0] for row in connection.execute(sql)]
+
+    def has_systems(self):
+        """Whether any instance data has been loaded."""
+        return bool(self.query("SELECT 1 FROM systems LIMIT 1"))
+
+    def systems_of_agency(self, agency, rml_mismatch=False):
+        """Returns the systems of an agency, optionally only those whose RML is not aligned."""
+        sql = 'SELECT * FROM systems WHERE "Agency Name" = ?'
+        params = [agency]
+        if rml_mismatch:
+            sql += ' AND "RML Alignment" IN (?, ?)'
+            params.extend(RML_MISMATCH)
+        return self.query(sql, params)
+
+    def upstream_of(self, system_id):
+        """Returns the dependency records whose Dependent System is `system_id`."""
+        return self.query('SELECT * FROM dependencies WHERE "Dependent System" = ?', (system_id,))
+
+    def downstream_of(self, system_id):
+        """Returns the dependency records whose Upstream System is `system_id`."""
+        return self.query('SELECT * FROM dependencies WHERE "Upstream System" = ?', (system_id,))
+
+    def sink(self, table):
+        """Returns a sink that `ingest.ingest` can stream export chunks into, upserting each chunk into `table`."""
+        return _DatabaseSink(self, table)
+
+    def close(self):
+        self.pool.close()
+
+
+class _DatabaseSink:
+    def __init__(self, database, table):
+        self.database = database
+        self.table = table
+
+    def write(self, batch):
+        self.database.upsert(self.table, batch.to_pylist())
+
+
+_databases = {}
+_databases_lock = threading.Lock()
+
+
+def shared_database(path=DATABASE_PATH):
+    """Returns the process-wide Database for `path`, so every Streamlit session shares one pool."""
+    with _databases_lock:
+        if path not in _databases:
+            _databases[path] = Database(path)
+        return _databases[path]
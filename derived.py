@@ -0,0 +1,546 @@
+import argparse
+import concurrent.futures
+import contextlib
+import datetime
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+from cycles import adjacency, condensation
+from db import DATABASE_PATH, Database
+from ingest import NUMERIC_FIELDS
+from rml import IMPACT_DIMENSIONS, INVALID_CODE, compute_rml, encode_rml, rml_alignment
+from server import add_route, shared_server
+
+logger = logging.getLogger(__name__)
+
+# Edits are applied together once none has arrived for COALESCE_SECONDS,
+# and at most MAX_DELAY_SECONDS after the first of them
+COALESCE_SECONDS = 0.5
+MAX_DELAY_SECONDS = 5.0
+# How often the database is checked for changes written by other processes, e.g. the ingest CLI
+POLL_SECONDS = 2.0
+# Reach counts for up to this many systems walk the graph from each; more are propagated as bitsets
+BFS_TARGETS = 256
+REACH_BLOCK_BYTES = 32 << 20
+RETAINED_ERRORS = 20
+# Systems named in a report of unusable inputs
+REPORTED_SYSTEMS = 10
+
+# Stands for the dependency table among the inputs of a derived field
+DEPENDENCIES = "dependencies"
+
+# Derived system fields and what each is computed from: system fields,
+# other derived fields or DEPENDENCIES
+DERIVED_FIELDS = {
+    "System Criticality": IMPACT_DIMENSIONS,
+    "Computed RML": IMPACT_DIMENSIONS,
+    "Computed RML Date": ("Computed RML",),
+    "RML Alignment": ("Computed RML", "Agency Proposed RML"),
+    "Direct Dependencies Count": (DEPENDENCIES,),
+    "Total Dependencies": (DEPENDENCIES,),
+    "Downstream Impact": (DEPENDENCIES,),
+}
+
+# Systems whose value of a field can change with an ("Upstream System", "Dependent System") pair:
+# the dependent, the dependent and everything downstream of it, or the upstream and everything it depends on
+DEPENDENCY_SCOPE = {
+    "Direct Dependencies Count": "dependent",
+    "Total Dependencies": "downstream",
+    "Downstream Impact": "upstream",
+}
+
+_DEPENDENTS = {}
+for _field, _inputs in DERIVED_FIELDS.items():
+    for _input in _inputs:
+        _DEPENDENTS.setdefault(_input, []).append(_field)
+
+
+def _walk(indptr, indices, starts):
+    """Marks every node reachable from `starts` over CSR arrays, the starts included."""
+    seen = np.zeros(len(indptr) - 1, dtype=bool)
+    frontier = np.unique(np.asarray(starts, dtype=np.int64))
+    seen[frontier] = True
+    while len(frontier):
+        begin, end = indptr[frontier], indptr[frontier + 1]
+        counts = end - begin
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        following = indices[np.repeat(begin, counts) + offsets]
+        frontier = np.unique(following[~seen[following]])
+        seen[frontier] = True
+    return seen
+
+
+def reach_counts(n, src, dst, targets):
+    """Counts the other nodes reachable from each of `targets` along n nodes' edges src -> dst.
+
+    A few targets are walked one by one. For many, reachability is
+    propagated as bitsets over the condensation, sinks first, one block of
+    components at a time so memory stays within REACH_BLOCK_BYTES.
+    """
+    targets = np.asarray(targets, dtype=np.int64)
+    if len(targets) <= BFS_TARGETS:
+        indptr, indices = adjacency(n, src, dst)
+        return np.array([_walk(indptr, indices, [t]).sum() - 1 for t in targets.tolist()], dtype=np.int64)
+
+    component, k, csrc, cdst = condensation(n, src, dst)
+    sizes = np.bincount(component, minlength=k)
+    # Components are numbered upstream first, so a pass over edges from the
+    # highest numbered source down settles every component's height above the sinks
+    height = [0] * k
+    order = np.argsort(-csrc, kind="stable")
+    for u, v in zip(csrc[order].tolist(), cdst[order].tolist()):
+        if height[v] + 1 > height[u]:
+            height[u] = height[v] + 1
+    level = np.array(height, dtype=np.int64)[csrc]
+    order = np.argsort(level, kind="stable")
+    csrc, cdst, level = csrc[order], cdst[order], level[order]
+
+    counts = np.zeros(len(targets), dtype=np.int64)
+    target_components = component[targets]
+    block = max(8, REACH_BLOCK_BYTES * 8 // max(k, 1) // 8 * 8)
+    for start in range(0, k, block):
+        width = min(block, k - start)
+        # Components only reach higher numbers, so nothing numbered past the block reaches into it
+        end = start + width
+        inside = (csrc < end) & (cdst < end)
+        src_block, dst_block, level_block = csrc[inside], cdst[inside], level[inside]
+        bounds = np.flatnonzero(np.r_[True, level_block[1:] != level_block[:-1], True])
+        # Bits are set bytewise and propagated as 64-bit words, eight times fewer elements
+        closed = np.zeros((end, (width + 63) // 64 * 8), dtype=np.uint8)
+        own = np.arange(width)
+        closed[start + own, own >> 3] = (0x80 >> (own & 7)).astype(np.uint8)
+        words = closed.view(np.uint64)
+        for a, b in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+            np.bitwise_or.at(words, src_block[a:b], words[dst_block[a:b]])
+        reached = target_components < end
+        rows = np.flatnonzero(reached)
+        for i in range(0, len(rows), 4096):
+            chunk = rows[i:i + 4096]
+            bits = np.unpackbits(closed[target_components[chunk]], axis=1, count=width)
+            counts[chunk] += bits @ sizes[start:end]
+    return counts - 1
+
+
+# Jobs run on the worker pool: each takes the derived fields wanted and the
+# columns of their inputs for the systems to recompute, and returns the new
+# columns. Systems whose inputs cannot be used are flagged in an INVALID
+# column; their values are left as they were and reported, not retried.
+INVALID = "Invalid"
+
+
+def _criticality(fields, columns):
+    results = compute_rml(columns, errors="mask")
+    return {field: results[field] for field in (*fields, INVALID)}
+
+
+def _alignment(fields, columns):
+    computed = encode_rml(columns["Computed RML"], invalid=INVALID_CODE)
+    proposed = encode_rml(columns["Agency Proposed RML"], "Agency Proposed RML", INVALID_CODE)
+    return {
+        "RML Alignment": rml_alignment(computed, proposed),
+        INVALID: (computed == INVALID_CODE) | (proposed == INVALID_CODE),
+    }
+
+
+def _stamp(fields, columns):
+    return {"Computed RML Date": [datetime.date.today().isoformat()] * len(columns["System ID"])}
+
+
+def _dependency_counts(fields, columns):
+    n, src, dst, targets = columns[DEPENDENCIES]
+    results = {}
+    if "Direct Dependencies Count" in fields:
+        distinct = np.unique(dst[src != dst] * n + src[src != dst])
+        results["Direct Dependencies Count"] = np.bincount(distinct // n, minlength=n)[targets]
+    if "Total Dependencies" in fields:
+        results["Total Dependencies"] = reach_counts(n, dst, src, targets)
+    if "Downstream Impact" in fields:
+        results["Downstream Impact"] = reach_counts(n, src, dst, targets)
+    return results
+
+
+JOBS = (
+    (("System Criticality", "Computed RML"), _criticality),
+    (("Direct Dependencies Count", "Total Dependencies", "Downstream Impact"), _dependency_counts),
+    (("RML Alignment",), _alignment),
+    (("Computed RML Date",), _stamp),
+)
+
+
+def _tiers():
+    """Groups the jobs into tiers that only use derived fields of earlier tiers."""
+    tier = {}
+    while len(tier) < len(DERIVED_FIELDS):
+        ready = {
+            field: 1 + max((tier[i] for i in inputs if i in DERIVED_FIELDS), default=-1)
+            for field, inputs in DERIVED_FIELDS.items()
+            if field not in tier and all(i in tier or i not in DERIVED_FIELDS for i in inputs)
+        }
+        if not ready:
+            raise ValueError(f"Derived fields depend on each other in a cycle: {', '.join(set(DERIVED_FIELDS) - set(tier))}")
+        tier.update(ready)
+    tiers = [[] for _ in range(max(tier.values(), default=-1) + 1)]
+    for fields, job in JOBS:
+        tiers[max(tier[field] for field in fields)].append((fields, job))
+    return tiers
+
+
+TIERS = _tiers()
+
+
+def _stored(field, value):
+    """A computed value as SQLite gives it back, so unchanged values compare equal."""
+    if value is None:
+        return None
+    return float(value) if field in NUMERIC_FIELDS else str(value)
+
+
+class _DependencyGraph:
+    """Integer-indexed dependency pairs, with CSR arrays for walking either way."""
+
+    def __init__(self, edges):
+        self.system_ids = sorted({system_id for edge in edges for system_id in edge})
+        self.index = {system_id: i for i, system_id in enumerate(self.system_ids)}
+        pairs = np.array([(self.index[u], self.index[d]) for u, d in sorted(edges)], dtype=np.int64).reshape(-1, 2)
+        self.src, self.dst = pairs[:, 0], pairs[:, 1]
+        self._csr = {}
+
+    def reachable(self, system_ids, downstream):
+        """The given systems and every system downstream (or upstream) of them."""
+        n = len(self.system_ids)
+        if downstream not in self._csr:
+            self._csr[downstream] = adjacency(n, *((self.src, self.dst) if downstream else (self.dst, self.src)))
+        starts = [self.index[s] for s in system_ids if s in self.index]
+        seen = _walk(*self._csr[downstream], starts)
+        return {self.system_ids[i] for i in np.flatnonzero(seen).tolist()} | set(system_ids)
+
+    def arrays(self, system_ids):
+        """(n, src, dst, targets) for a job, with systems outside every dependency added as isolated nodes."""
+        index = dict(self.index)
+        for system_id in system_ids:
+            index.setdefault(system_id, len(index))
+        return len(index), self.src, self.dst, np.array([index[s] for s in system_ids], dtype=np.int64)
+
+
+class DerivedFields:
+    """Keeps the derived system fields of a database current in the background.
+
+    Changes to instance data only mark dirty the derived values computed
+    from what changed: a system field dirties its dependents for that
+    system, and a dependency dirties the systems upstream or downstream of
+    it whose counts can change. A background thread waits until edits pause
+    for `delay` seconds (at most `max_delay` after the first), then
+    recomputes the dirty values in one batch, tier by tier, on a pool of
+    `workers` processes. Writes from other processes (the ingest and
+    inference CLIs) are only seen as a change in `Database.revisions`,
+    checked every `poll` seconds: changed systems mark every value dirty and
+    changed dependencies are diffed as usual. A value that comes out unchanged is not written and
+    does not dirty the fields computed from it. Systems with an unrecognised
+    rating keep their values and are listed in `errors`; the rest of the
+    batch is still written.
+    """
+
+    def __init__(self, database, workers=None, delay=COALESCE_SECONDS, max_delay=MAX_DELAY_SECONDS, poll=POLL_SECONDS):
+        self.database = database
+        self.workers = workers or os.cpu_count() or 1
+        self.delay = delay
+        self.max_delay = max_delay
+        self.poll = poll
+        self.batches = 0
+        self.recomputed = 0
+        self.updated = 0
+        self.last_batch = None
+        self.errors = []
+        self._condition = threading.Condition()
+        self._dirty = {}
+        self._dependencies = False
+        self._first = self._last = None
+        self._deferred = 0
+        self._running = False
+        self._stopped = False
+        self._thread = None
+        self._pool = None
+        self._revisions = database.revisions("systems", "dependencies")
+        self._own = [0, 0]
+        self._polled = time.monotonic()
+        self._edges = self._read_edges()
+        database.subscribe(self._changed)
+
+    def _read_edges(self):
+        rows = self.database.query('SELECT "Upstream System", "Dependent System" FROM dependencies')
+        return {(row["Upstream System"], row["Dependent System"]) for row in rows}
+
+    def _changed(self, table, keys, fields):
+        if table == "systems":
+            self.mark(keys, fields)
+        elif table == "dependencies":
+            with self._condition:
+                self._dependencies = True
+                self._touch()
+        else:
+            return
+        # Each write in this process is one revision that _poll need not act on
+        with self._condition:
+            self._own[table == "dependencies"] += 1
+
+    def _poll(self):
+        """Marks dirty what other processes have changed since the last check."""
+        if time.monotonic() - self._polled < self.poll:
+            return
+        self._polled = time.monotonic()
+        revisions = self.database.revisions("systems", "dependencies")
+        with self._condition:
+            systems, dependencies = (
+                now - before - own for now, before, own in zip(revisions, self._revisions, self._own)
+            )
+            self._revisions, self._own = revisions, [0, 0]
+            if dependencies > 0:
+                self._dependencies = True
+                self._touch()
+        if systems > 0:
+            logger.info("Systems changed in another process, marking every derived value dirty")
+            self.mark_all()
+
+    def _touch(self):
+        now = time.monotonic()
+        self._first = self._first or now
+        self._last = now
+        self._condition.notify_all()
+
+    def mark(self, system_ids, fields=None):
+        """Marks dirty the derived values computed from `fields` of some systems, or all of theirs."""
+        targets = DERIVED_FIELDS if fields is None else {d for f in fields for d in _DEPENDENTS.get(f, ())}
+        system_ids = list(system_ids)
+        if not targets or not system_ids:
+            return
+        with self._condition:
+            for field in targets:
+                self._dirty.setdefault(field, set()).update(system_ids)
+            self._touch()
+
+    def mark_all(self):
+        """Marks every derived value of every system dirty, e.g. after a bulk import."""
+        self.mark(self.database.system_columns(())["System ID"])
+
+    @contextlib.contextmanager
+    def deferred(self):
+        """Holds recomputation back while the block runs, so a bulk import is evaluated once at its end."""
+        with self._condition:
+            self._deferred += 1
+        try:
+            yield self
+        finally:
+            with self._condition:
+                self._deferred -= 1
+                self._condition.notify_all()
+
+    def _pending(self):
+        return bool(self._dirty or self._dependencies)
+
+    def busy(self):
+        """Whether derived values are dirty or being recomputed."""
+        with self._condition:
+            return self._running or self._pending()
+
+    def start(self):
+        with self._condition:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="derived-fields", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        if self._pool is not None:
+            self._pool.shutdown()
+
+    def wait(self, timeout=None):
+        """Waits until every dirty value has been recomputed; returns False on timeout."""
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._running and not self._pending(), timeout)
+
+    def _run(self):
+        while True:
+            try:
+                self._poll()
+            except Exception as e:
+                logger.exception("Checking the database for changes failed")
+                self._error(f"{type(e).__name__}: {e}")
+            with self._condition:
+                if self._stopped:
+                    return
+                wait = self.poll
+                if self._pending() and not self._deferred:
+                    wait = min(self._last + self.delay, self._first + self.max_delay) - time.monotonic()
+                if wait > 0:
+                    self._condition.wait(min(wait, self.poll))
+                    continue
+                dirty, self._dirty = self._dirty, {}
+                dependencies, self._dependencies = self._dependencies, False
+                self._first = self._last = None
+                self._running = True
+            try:
+                self._evaluate(dirty, dependencies)
+            except Exception as e:
+                logger.exception("Recomputing derived fields failed")
+                self._error(f"{type(e).__name__}: {e}")
+            finally:
+                with self._condition:
+                    self._running = False
+                    self._condition.notify_all()
+
+    def _error(self, message):
+        with self._condition:
+            self.errors = [*self.errors, message][-RETAINED_ERRORS:]
+
+    def _invalid(self, fields, system_ids):
+        system_ids = sorted(system_ids)
+        named = ", ".join(system_ids[:REPORTED_SYSTEMS]) + (", ..." if len(system_ids) > REPORTED_SYSTEMS else "")
+        logger.warning("Left %s unchanged for %d systems with unrecognised inputs: %s", ", ".join(fields), len(system_ids), named)
+        self._error(f"{', '.join(fields)}: unrecognised inputs for {len(system_ids)} systems: {named}")
+
+    def _submit(self, job, fields, columns):
+        if self.workers == 1:
+            future = concurrent.futures.Future()
+            try:
+                future.set_result(job(fields, columns))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        if self._pool is None:
+            self._pool = concurrent.futures.ProcessPoolExecutor(self.workers)
+        return self._pool.submit(job, fields, columns)
+
+    def _evaluate(self, dirty, dependencies):
+        """Recomputes one batch of dirty values, adding the values that change to the later tiers' work."""
+        started = time.perf_counter()
+        graph = None
+        if dependencies:
+            edges = self._read_edges()
+            changed = edges ^ self._edges
+            self._edges = edges
+            if changed:
+                graph = _DependencyGraph(edges)
+                dependents = {d for _, d in changed}
+                scopes = {
+                    "dependent": dependents,
+                    "downstream": graph.reachable(dependents, True),
+                    "upstream": graph.reachable({u for u, _ in changed}, False),
+                }
+                for field, scope in DEPENDENCY_SCOPE.items():
+                    dirty.setdefault(field, set()).update(scopes[scope])
+
+        recomputed = updated = 0
+        for tier in TIERS:
+            runs = []
+            for fields, job in tier:
+                wanted = [field for field in fields if dirty.get(field)]
+                if not wanted:
+                    continue
+                system_ids = sorted(set().union(*(dirty[field] for field in wanted)))
+                inputs = {i for field in wanted for i in DERIVED_FIELDS[field]}
+                columns = self.database.system_columns([*sorted(inputs - {DEPENDENCIES}), *wanted], system_ids)
+                job_columns = {f: columns[f] for f in ("System ID", *inputs) if f != DEPENDENCIES}
+                if DEPENDENCIES in inputs:
+                    graph = graph or _DependencyGraph(self._edges)
+                    job_columns[DEPENDENCIES] = graph.arrays(columns["System ID"])
+                runs.append((wanted, columns, self._submit(job, wanted, job_columns)))
+
+            updates = {}
+            for wanted, columns, future in runs:
+                try:
+                    results = future.result()
+                except Exception as e:
+                    logger.warning("Could not recompute %s: %s", ", ".join(wanted), e)
+                    self._error(f"{', '.join(wanted)}: {e}")
+                    continue
+                invalid = results.get(INVALID)
+                skipped = set() if invalid is None else {s for s, bad in zip(columns["System ID"], invalid) if bad}
+                if skipped:
+                    self._invalid(wanted, skipped)
+                recomputed += (len(columns["System ID"]) - len(skipped)) * len(wanted)
+                for field in wanted:
+                    changed = []
+                    for system_id, old, new in zip(columns["System ID"], columns[field], results[field]):
+                        new = _stored(field, new)
+                        if new != old and system_id in dirty[field] and system_id not in skipped:
+                            updates.setdefault(system_id, {})[field] = new
+                            changed.append(system_id)
+                    updated += len(changed)
+                    for dependent in _DEPENDENTS.get(field, ()):
+                        dirty.setdefault(dependent, set()).update(changed)
+            if updates:
+                self.database.update_systems(
+                    ({"System ID": system_id, **values} for system_id, values in updates.items()), notify=False
+                )
+
+        seconds = time.perf_counter() - started
+        with self._condition:
+            self.batches += 1
+            self.recomputed += recomputed
+            self.updated += updated
+            self.last_batch = {"recomputed": recomputed, "updated": updated, "seconds": round(seconds, 3)}
+        logger.info("Recomputed %d derived values (%d changed) in %.2fs", recomputed, updated, seconds)
+
+    def status(self, query=None):
+        """Dirty values waiting, whether a batch is running and the totals so far."""
+        with self._condition:
+            return {
+                "running": self._running,
+                "pending": sum(len(systems) for systems in self._dirty.values()),
+                "dependencies_changed": self._dependencies,
+                "batches": self.batches,
+                "recomputed": self.recomputed,
+                "updated": self.updated,
+                "last_batch": self.last_batch,
+                "errors": list(self.errors),
+            }
+
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def shared_derived_fields(database):
+    """Returns the process-wide, started scheduler keeping a database's derived fields current.
+
+    Its progress is served as /derived from the side server when MODEL_SERVER_PORT is set.
+    """
+    with _schedulers_lock:
+        key = database.pool.path
+        if key not in _schedulers:
+            scheduler = DerivedFields(database)
+            if shared_server() is not None:
+                add_route("/derived", scheduler.status)
+            _schedulers[key] = scheduler.start()
+        return _schedulers[key]
+
+
+def deferred_derived_fields(database):
+    """Holds back the scheduler of this process for a database while a block runs; a no-op if none runs."""
+    with _schedulers_lock:
+        scheduler = _schedulers.get(database.pool.path)
+    return scheduler.deferred() if scheduler is not None else contextlib.nullcontext()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute every derived system field, e.g. after a bulk import")
+    parser.add_argument("--database", default=DATABASE_PATH)
+    parser.add_argument("--workers", type=int, help="Processes to compute with (default: every core)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    scheduler = DerivedFields(Database(args.database), args.workers, delay=0).start()
+    scheduler.mark_all()
+    scheduler.wait()
+    scheduler.stop()
+    status = scheduler.status()
+    print(f"Recomputed {status['recomputed']} derived values, {status['updated']} changed")
+    for error in status["errors"]:
+        print(f"  {error}")
@@ -0,0 +1,252 @@
+import re
+import threading
+
+
+def _normalise(text):
+    return " ".join((text or "").casefold().split())
+
+
+def _terms(text):
+    """Returns the whole normalised text and each of its words, so prefixes of any word match."""
+    text = _normalise(text)
+    if not text:
+        return set()
+    return {text} | set(re.split(r"[\s,/()&-]+", text)) - {""}
+
+
+class _Trie:
+    """Prefix tree mapping terms to the keys of the records containing them."""
+
+    def __init__(self):
+        self.root = {}
+
+    def add(self, term, key):
+        node = self.root
+        for char in term:
+            node = node.setdefault(char, {})
+        node.setdefault(None, set()).add(key)
+
+    def discard(self, term, key):
+        path = [self.root]
+        for char in term:
+            node = path[-1].get(char)
+            if node is None:
+                return
+            path.append(node)
+        keys = path[-1].get(None)
+        if keys is None:
+            return
+        keys.discard(key)
+        if not keys:
+            del path[-1][None]
+        # Prune branches left empty
+        for char, (parent, node) in zip(reversed(term), reversed(list(zip(path, path[1:])))):
+            if node:
+                break
+            del parent[char]
+
+    def prefix(self, prefix, limit):
+        node = self.root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return []
+        found = []
+        seen = set()
+        stack = [node]
+        while stack and len(found) < limit:
+            node = stack.pop()
+            for key in node.get(None, ()):
+                if key not in seen:
+                    seen.add(key)
+                    found.append(key)
+                    if len(found) == limit:
+                        return found
+            # Visit children in reverse so shorter, alphabetically earlier terms come first
+            stack.extend(node[c] for c in sorted((c for c in node if c is not None), reverse=True))
+        return found
+
+
+class HolderDirectory:
+    """In-memory index of Key Appointment Holder records for the lookup widgets.
+
+    Holders are keyed by "Email" (case-insensitive) for exact lookups, and
+    every word of "Full Name" and "Designation" is indexed in a prefix tree.
+    A reverse index maps each holder to the agencies they hold appointments
+    in and, through each agency's systems, to the systems they are
+    accountable for. All indexes are updated per record, never rebuilt, under
+    a lock, so changes followed from the database apply while sessions read.
+    """
+
+    def __init__(self, holders=(), systems=()):
+        self._lock = threading.RLock()
+        self._holders = {}
+        self._agencies = {}
+        self._names = _Trie()
+        self._designations = _Trie()
+        self._agency_holders = {}
+        self._agency_systems = {}
+        self._system_agency = {}
+        self._revision = None
+        for record in systems:
+            self.upsert_system(record)
+        for record in holders:
+            self.upsert(record)
+
+    def __len__(self):
+        return len(self._holders)
+
+    def upsert(self, record):
+        """Adds or replaces a holder record and records the agency it belongs to."""
+        with self._lock:
+            key = _normalise(record["Email"])
+            previous = self._holders.get(key)
+            if previous == record:
+                return
+            if previous is not None:
+                for term in _terms(previous.get("Full Name")):
+                    self._names.discard(term, key)
+                for term in _terms(previous.get("Designation")):
+                    self._designations.discard(term, key)
+                # A holder has one record, so a changed Agency Name moves them
+                for agency in self._agencies.pop(key, ()):
+                    self._agency_holders.get(agency, set()).discard(key)
+
+            self._holders[key] = dict(record)
+            for term in _terms(record.get("Full Name")):
+                self._names.add(term, key)
+            for term in _terms(record.get("Designation")):
+                self._designations.add(term, key)
+
+            agency = record.get("Agency Name")
+            if agency:
+                self._agencies.setdefault(key, set()).add(agency)
+                self._agency_holders.setdefault(agency, set()).add(key)
+
+    def remove(self, email, agency=None):
+        """Removes a holder's appointment in `agency`, or the holder altogether."""
+        with self._lock:
+            key = _normalise(email)
+            if key not in self._holders:
+                return
+            agencies = self._agencies.get(key, set())
+            for name in [agency] if agency else list(agencies):
+                agencies.discard(name)
+                self._agency_holders.get(name, set()).discard(key)
+            if agencies and agency:
+                return
+
+            record = self._holders.pop(key)
+            self._agencies.pop(key, None)
+            for term in _terms(record.get("Full Name")):
+                self._names.discard(term, key)
+            for term in _terms(record.get("Designation")):
+                self._designations.discard(term, key)
+
+    def upsert_system(self, record):
+        """Adds or moves a system under the agency it belongs to."""
+        with self._lock:
+            system_id = record["System ID"]
+            self.remove_system(system_id)
+            agency = record.get("Agency Name")
+            if agency:
+                self._system_agency[system_id] = agency
+                self._agency_systems.setdefault(agency, set()).add(system_id)
+
+    def remove_system(self, system_id):
+        with self._lock:
+            agency = self._system_agency.pop(system_id, None)
+            if agency is not None:
+                self._agency_systems[agency].discard(system_id)
+
+    def by_email(self, email):
+        """Returns the holder with this email, or None."""
+        return self._holders.get(_normalise(email))
+
+    def search_name(self, prefix, limit=20):
+        """Returns holders with a word of their Full Name starting with `prefix`."""
+        with self._lock:
+            return [self._holders[k] for k in self._names.prefix(_normalise(prefix), limit)]
+
+    def search_designation(self, prefix, limit=20):
+        """Returns holders with a word of their Designation starting with `prefix`."""
+        with self._lock:
+            return [self._holders[k] for k in self._designations.prefix(_normalise(prefix), limit)]
+
+    def holders_of(self, agency):
+        with self._lock:
+            return [self._holders[k] for k in sorted(self._agency_holders.get(agency, ()))]
+
+    def accountable_for(self, email):
+        """Returns the agencies and systems a holder is accountable for."""
+        with self._lock:
+            agencies = sorted(self._agencies.get(_normalise(email), ()))
+            systems = sorted(s for agency in agencies for s in self._agency_systems.get(agency, ()))
+            return {"agencies": agencies, "systems": systems}
+
+    def _changed(self, database, table, keys, fields):
+        """Re-reads the changed holders, or the agencies of the changed systems, and applies them."""
+        if table == "key_appointment_holders":
+            records = database.records(table, keys)
+            for record in records:
+                self.upsert(record)
+            found = {_normalise(record["Email"]) for record in records}
+            for email in keys:
+                if _normalise(email) not in found:
+                    self.remove(email)
+        elif table == "systems" and (fields is None or "Agency Name" in fields):
+            columns = database.system_columns(["Agency Name"], keys)
+            for system_id, agency in zip(columns["System ID"], columns["Agency Name"]):
+                self.upsert_system({"System ID": system_id, "Agency Name": agency})
+            for system_id in set(keys) - set(columns["System ID"]):
+                self.remove_system(system_id)
+
+    def follow(self, database):
+        """Applies the changes made to the instance tables through a `db.Database` in this process as they happen."""
+        database.subscribe(lambda table, keys, fields: self._changed(database, table, keys, fields))
+        return self
+
+    def sync(self, database):
+        """Re-reads the holders or the systems' agencies once their revision has moved, so writes from other processes apply too.
+
+        Unchanged records are left as they are indexed.
+        """
+        # Read before the data, so a write landing during the scan is picked up next time
+        revision = database.revisions("key_appointment_holders", "systems")
+        with self._lock:
+            if revision == self._revision:
+                return self
+            previous, self._revision = self._revision, revision
+            holders, system_ids = set(self._holders), set(self._system_agency)
+        if previous is None or previous[1] != revision[1]:
+            systems = database.query('SELECT "System ID", "Agency Name" FROM systems')
+            for record in systems:
+                self.upsert_system(record)
+            for system_id in system_ids - {record["System ID"] for record in systems}:
+                self.remove_system(system_id)
+        if previous is None or previous[0] != revision[0]:
+            records = database.query("SELECT * FROM key_appointment_holders")
+            for record in records:
+                self.upsert(record)
+            for key in holders - {_normalise(record["Email"]) for record in records}:
+                self.remove(key)
+        return self
+
+    @classmethod
+    def from_database(cls, database):
+        """Builds the directory from the instance tables of a `db.Database` and follows their changes."""
+        return cls().follow(database).sync(database)
+
+
+_directories = {}
+_directories_lock = threading.Lock()
+
+
+def shared_holder_directory(database):
+    """Returns the process-wide directory of a database, synced with its instance tables on every call."""
+    key = database.pool.path
+    with _directories_lock:
+        if key not in _directories:
+            _directories[key] = HolderDirectory.from_database(database)
+        directory = _directories[key]
+    return directory.sync(database)
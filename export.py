@@ -0,0 +1,184 @@
+import argparse
+import json
+import sys
+from xml.sax.saxutils import escape, quoteattr
+
+from db import DATABASE_PATH, DEPENDENCY_FIELDS, Database, instance_tables, schema_statements
+from graph import edge_attributes, node_attributes
+from ingest import NUMERIC_FIELDS
+from model import INSTANCE_MODEL_SOURCE, MODEL_SOURCE, load_model
+
+FORMATS = ("graphml", "gexf", "json", "ddl")
+
+MODEL_NODE_KEYS = ("label", "color", "size", "shape", "title")
+MODEL_EDGE_KEYS = ("title", "label", "arrows")
+
+
+class GraphSource:
+    """A graph to export: its attribute names and callables returning fresh node and edge iterators.
+
+    Nodes are yielded as `(id, attributes)` and edges as `(source, target,
+    attributes)`, so writers can stream graphs that are never held in memory.
+    """
+
+    def __init__(self, node_keys, edge_keys, nodes, edges):
+        self.node_keys = node_keys
+        self.edge_keys = edge_keys
+        self.nodes = nodes
+        self.edges = edges
+
+
+def model_source(entities, edges):
+    """Exports the model diagram itself, one node per entity."""
+    return GraphSource(
+        MODEL_NODE_KEYS,
+        MODEL_EDGE_KEYS,
+        lambda: ((name, node_attributes(name, a)) for name, a in entities.items()),
+        lambda: ((source, target, edge_attributes(label, direction)) for source, target, label, direction in edges),
+    )
+
+
+def networkx_source(G):
+    """Exports an `nx.DiGraph`, such as the one built for the app by `graph.build_graph`."""
+    node_keys = list(dict.fromkeys(key for _, attributes in G.nodes(data=True) for key in attributes))
+    edge_keys = list(dict.fromkeys(key for *_, attributes in G.edges(data=True) for key in attributes))
+    return GraphSource(node_keys, edge_keys, lambda: iter(G.nodes(data=True)), lambda: iter(G.edges(data=True)))
+
+
+def instance_source(database):
+    """Exports the system dependency graph of the instance data, streamed from the database."""
+    system_fields, key = database.tables["systems"]
+    edge_fields = [f for f in DEPENDENCY_FIELDS if f not in ("Upstream System", "Dependent System")]
+
+    def nodes():
+        for record in database.iterate("SELECT * FROM systems"):
+            yield record.pop(key), record
+
+    def edges():
+        for record in database.iterate("SELECT * FROM dependencies"):
+            yield record.pop("Upstream System"), record.pop("Dependent System"), record
+
+    return GraphSource([f for f in system_fields if f != key], edge_fields, nodes, edges)
+
+
+def _value_type(key):
+    if key == "size":
+        return "int"
+    return "double" if key in NUMERIC_FIELDS else "string"
+
+
+def write_graphml(source, out):
+    out.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    out.write('<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n')
+    keys = {}
+    for kind, names in (("node", source.node_keys), ("edge", source.edge_keys)):
+        for name in names:
+            keys[(kind, name)] = f"d{len(keys)}"
+            out.write(
+                f'  <key id="{keys[(kind, name)]}" for="{kind}" attr.name={quoteattr(name)} '
+                f'attr.type="{_value_type(name)}"/>\n'
+            )
+    out.write('  <graph edgedefault="directed">\n')
+    for node, attributes in source.nodes():
+        out.write(f"    <node id={quoteattr(str(node))}>")
+        for name, value in attributes.items():
+            if value is not None and ("node", name) in keys:
+                out.write(f'<data key="{keys[("node", name)]}">{escape(str(value))}</data>')
+        out.write("</node>\n")
+    for source_node, target, attributes in source.edges():
+        out.write(f"    <edge source={quoteattr(str(source_node))} target={quoteattr(str(target))}>")
+        for name, value in attributes.items():
+            if value is not None and ("edge", name) in keys:
+                out.write(f'<data key="{keys[("edge", name)]}">{escape(str(value))}</data>')
+        out.write("</edge>\n")
+    out.write("  </graph>\n</graphml>\n")
+
+
+def _attvalues(attributes, ids):
+    values = [
+        f"<attvalue for=\"{ids[name]}\" value={quoteattr(str(value))}/>"
+        for name, value in attributes.items()
+        if value is not None and name in ids
+    ]
+    return f"<attvalues>{''.join(values)}</attvalues>" if values else ""
+
+
+def write_gexf(source, out):
+    gexf_types = {"int": "integer", "double": "double", "string": "string"}
+    out.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    out.write('<gexf xmlns="http://www.gexf.net/1.2draft" version="1.2">\n')
+    out.write('  <graph defaultedgetype="directed" mode="static">\n')
+    ids = {}
+    for kind, names in (("node", source.node_keys), ("edge", source.edge_keys)):
+        ids[kind] = {name: str(i) for i, name in enumerate(n for n in names if n != "label")}
+        out.write(f'    <attributes class="{kind}">\n')
+        for name, i in ids[kind].items():
+            out.write(f'      <attribute id="{i}" title={quoteattr(name)} type="{gexf_types[_value_type(name)]}"/>\n')
+        out.write("    </attributes>\n")
+
+    out.write("    <nodes>\n")
+    for node, attributes in source.nodes():
+        label = attributes.get("label") or node
+        out.write(f"      <node id={quoteattr(str(node))} label={quoteattr(str(label))}>")
+        out.write(f"{_attvalues(attributes, ids['node'])}</node>\n")
+    out.write("    </nodes>\n    <edges>\n")
+    for i, (source_node, target, attributes) in enumerate(source.edges()):
+        label = f" label={quoteattr(str(attributes['label']))}" if attributes.get("label") else ""
+        out.write(f'      <edge id="{i}" source={quoteattr(str(source_node))} target={quoteattr(str(target))}{label}>')
+        out.write(f"{_attvalues(attributes, ids['edge'])}</edge>\n")
+    out.write("    </edges>\n  </graph>\n</gexf>\n")
+
+
+def write_json(source, out):
+    """Writes the node-link JSON read by `networkx.node_link_graph` and d3."""
+    out.write('{"directed": true, "multigraph": false, "graph": {}, "nodes": [')
+    for i, (node, attributes) in enumerate(source.nodes()):
+        out.write(("," if i else "") + "\n  " + json.dumps({**attributes, "id": node}))
+    out.write('\n], "links": [')
+    for i, (source_node, target, attributes) in enumerate(source.edges()):
+        out.write(("," if i else "") + "\n  " + json.dumps({**attributes, "source": source_node, "target": target}))
+    out.write("\n]}\n")
+
+
+def write_ddl(tables, out):
+    """Writes the SQL DDL of the instance tables (`db.instance_tables`)."""
+    for statement in schema_statements(tables):
+        out.write(f"{statement};\n")
+
+
+WRITERS = {"graphml": write_graphml, "gexf": write_gexf, "json": write_json}
+
+
+def export(format, out, source=None, tables=None):
+    """Streams a graph source, or the DDL of `tables`, to a text file object."""
+    if format == "ddl":
+        write_ddl(tables, out)
+    else:
+        WRITERS[format](source, out)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the data model or the instance graph")
+    parser.add_argument("format", choices=FORMATS)
+    parser.add_argument("output", help="Output file, or - for standard output")
+    parser.add_argument("--model", default=MODEL_SOURCE, help="Model script to export (default: data_model.py)")
+    parser.add_argument("--version", help="Export a model version from the SQLite store instead")
+    parser.add_argument("--instances", action="store_true", help="Export the system dependency graph instead")
+    parser.add_argument("--database", default=DATABASE_PATH)
+    args = parser.parse_args()
+
+    source = tables = None
+    if args.format == "ddl":
+        tables = instance_tables(*load_model(INSTANCE_MODEL_SOURCE))
+    elif args.instances:
+        source = instance_source(Database(args.database))
+    elif args.version:
+        source = model_source(*Database(args.database).load_model(args.version))
+    else:
+        source = model_source(*load_model(args.model))
+
+    if args.output == "-":
+        export(args.format, sys.stdout, source, tables)
+    else:
+        with open(args.output, "w", encoding="utf-8") as out:
+            export(args.format, out, source, tables)
@@ -0,0 +1,187 @@
+import threading
+
+import networkx as nx
+import numpy as np
+
+from graph import render_html
+from ingest import field_category
+from layout import positions as layout_positions
+from partitions import portfolio_graph
+from static_render import render_svg
+
+MODEL_FACETS = ("Module", "Submodule", "Tier", "Field Category")
+INSTANCE_FACETS = ("Security Classification", "System Status", "Ministry Family Name")
+
+# Tiers of the model diagram, matching the NODE_SETTINGS levels below the root
+TIERS = ("Root", "Module", "Submodule", "Subgroup", "Field")
+
+BLANK = "(blank)"
+
+
+class FilterIndex:
+    """Precomputed boolean masks over a graph's nodes, one per value of each facet.
+
+    A selection maps facets to the values wanted; values of one facet are
+    ORed and facets are ANDed, all as whole-array operations. Facets left
+    empty keep every node. `companions` pairs nodes with no facet values
+    with the nodes they are shown alongside, as two lists of equal length.
+    """
+
+    def __init__(self, nodes, facets, ancestors=None, companions=None):
+        nodes = list(nodes)
+        self.nodes = np.empty(len(nodes), dtype=object)
+        self.nodes[:] = nodes
+        position = {node: i for i, node in enumerate(self.nodes)}
+        self._masks = {}
+        for facet, assignment in facets.items():
+            masks = {}
+            for node, values in assignment.items():
+                for value in ([values] if isinstance(values, str) else values):
+                    masks.setdefault(value, np.zeros(len(self.nodes), dtype=bool))[position[node]] = True
+            self._masks[facet] = dict(sorted(masks.items()))
+        self._ancestors = ancestors
+        self._companions = None
+        if companions is not None:
+            self._companions = tuple(np.array([position[n] for n in side], dtype=np.int64) for side in companions)
+
+    @property
+    def facets(self):
+        return list(self._masks)
+
+    def values(self, facet):
+        return list(self._masks[facet])
+
+    def mask(self, selections):
+        mask = np.ones(len(self.nodes), dtype=bool)
+        for facet, values in selections.items():
+            if not values:
+                continue
+            selected = np.zeros(len(self.nodes), dtype=bool)
+            for value in values:
+                if value in self._masks[facet]:
+                    selected |= self._masks[facet][value]
+            mask &= selected
+        return mask
+
+    def visible(self, selections):
+        """Returns the nodes a selection keeps, with their ancestors when the index has a hierarchy
+        and the companions of the nodes kept.
+        """
+        mask = self.mask(selections)
+        if self._ancestors is not None and not mask.all():
+            mask |= self._ancestors[mask].any(axis=0)
+        if self._companions is not None and not mask.all():
+            shown, by = self._companions
+            mask[shown[mask[by]]] = True
+        return self.nodes[mask]
+
+
+def model_index(G):
+    """Indexes the model diagram by module, submodule, tier and field category."""
+    depth = {}
+    for root in (n for n in G if G.in_degree(n) == 0):
+        for node, level in nx.single_source_shortest_path_length(G, root).items():
+            depth[node] = min(level, depth.get(node, level))
+    facets = {facet: {} for facet in MODEL_FACETS}
+    nodes = list(G)
+    position = {node: i for i, node in enumerate(nodes)}
+    ancestors = np.zeros((len(nodes), len(nodes)), dtype=bool)
+    for node in nodes:
+        above = nx.ancestors(G, node)
+        ancestors[position[node], [position[a] for a in above]] = True
+        lineage = above | {node}
+        facets["Module"][node] = [a for a in lineage if depth.get(a) == 1]
+        facets["Submodule"][node] = [a for a in lineage if depth.get(a) == 2]
+        if G.out_degree(node) == 0 and depth.get(node, 0) > 0:
+            facets["Tier"][node] = "Field"
+            facets["Field Category"][node] = field_category(node)
+        else:
+            facets["Tier"][node] = TIERS[min(depth.get(node, 0), 3)]
+    return FilterIndex(nodes, facets, ancestors)
+
+
+def instance_index(systems, G=None):
+    """Indexes system records by Security Classification, System Status and Ministry Family.
+
+    Systems of `G` without a record, only named at the far end of a
+    dependency, have no facet values; they are kept as external nodes and
+    shown alongside the systems they share a dependency with.
+    """
+    facets = {
+        facet: {record["System ID"]: record.get(facet) or BLANK for record in systems}
+        for facet in INSTANCE_FACETS
+    }
+    nodes = [record["System ID"] for record in systems]
+    companions = None
+    if G is not None:
+        known = set(nodes)
+        external = [node for node in G if node not in known]
+        nodes += external
+        pairs = [(node, other) for node in external for other in nx.all_neighbors(G, node) if other in known]
+        companions = ([node for node, _ in pairs], [other for _, other in pairs])
+    return FilterIndex(nodes, facets, companions=companions)
+
+
+class FilteredView:
+    """A shared graph with its filter index and layouts, rendered for any selection.
+
+    Layouts are computed once for the whole graph, so filtered views keep
+    every remaining node where it was and draw without vis.js physics.
+    """
+
+    def __init__(self, G, index):
+        self.graph = G
+        self.index = index
+        self._lock = threading.Lock()
+        self._cache = {}
+
+    def cached(self, key, build):
+        """Returns what `build()` makes for the whole graph, built once per key."""
+        with self._lock:
+            if key in self._cache:
+                return self._cache[key]
+        value = build()
+        with self._lock:
+            return self._cache.setdefault(key, value)
+
+    def positions(self, hierarchical):
+        return self.cached(("positions", bool(hierarchical)), lambda: layout_positions(self.graph, hierarchical))
+
+    def subgraph(self, selections, within=None):
+        """Returns the read-only subgraph view of the nodes a selection keeps, optionally only those `within` a graph."""
+        within = self.graph if within is None else within
+        return self.graph.subgraph(node for node in self.index.visible(selections) if node in within)
+
+    def html(self, selections, hierarchical, within=None):
+        return render_html(self.subgraph(selections, within), hierarchical, self.positions(hierarchical))
+
+    def svg(self, selections, hierarchical, within=None):
+        return render_svg(self.subgraph(selections, within), hierarchical, self.positions(hierarchical))
+
+
+def model_view(G):
+    return FilteredView(G, model_index(G))
+
+
+_instance_views = {}
+_instance_views_lock = threading.Lock()
+
+
+def shared_instance_view(database, refresh=False):
+    """Returns the process-wide filtered view of a database's system dependency graph.
+
+    The view is rebuilt once the systems or dependencies have changed since
+    it was built, whichever process wrote them (see `Database.revisions`).
+    """
+    key = database.pool.path
+    with _instance_views_lock:
+        # Read before the data, so a write landing during the build is picked up next time
+        revisions = database.revisions("systems", "dependencies")
+        if refresh or key not in _instance_views or _instance_views[key][0] != revisions:
+            systems = database.query(
+                'SELECT "System ID", "System Name", "System Status", "Security Classification", '
+                '"Ministry Family Name" FROM systems'
+            )
+            G = portfolio_graph(systems, database.dependencies())
+            _instance_views[key] = (revisions, FilteredView(G, instance_index(systems, G)))
+        return _instance_views[key][1]
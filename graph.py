@@ -0,0 +1,208 @@
+import json
+
+import networkx as nx
+from pyvis.network import Network
+
+# vis.js options for the hierarchical layout
+HIERARCHICAL_OPTIONS = """{
+    "layout": {
+        "hierarchical": {
+            "enabled": true,
+            "direction": "UD",
+            "sortMethod": "directed",
+            "nodeSpacing": 200,
+            "levelSeparation": 200,
+            "treeSpacing": 200,
+            "blockShifting": false,
+            "edgeMinimization": false,
+            "parentCentralization": false,
+            "shakeTowards": "roots"
+        }
+    },
+    "physics": {
+        "enabled": true,
+        "hierarchicalRepulsion": {
+            "centralGravity": 0.5,
+            "springLength": 150,
+            "springConstant": 0.3,
+            "nodeDistance": 200,
+            "damping": 0.09,
+            "avoidOverlap": 1
+        },
+        "stabilization": {
+            "enabled": true,
+            "iterations": 2000,
+            "updateInterval": 100,
+            "fit": true
+        }
+    },
+    "edges": {
+        "smooth": {
+            "type": "cubicBezier",
+            "forceDirection": "vertical",
+            "roundness": 0.5
+        },
+        "color": {
+            "inherit": false,
+            "color": "#2E7D32",
+            "opacity": 0.8
+        }
+    },
+    "nodes": {
+        "fixed": {
+            "x": false,
+            "y": true
+        },
+        "shape": "dot",
+        "size": 25,
+        "font": {
+            "size": 14
+        }
+    },
+    "interaction": {
+        "dragNodes": true,
+        "dragView": true,
+        "zoomView": true
+    },
+    "groups": {
+        "useDefaultGroups": false
+    }
+}"""
+
+# vis.js options for the free (force-directed) layout
+FREE_OPTIONS = """{
+    "layout": {
+        "hierarchical": {
+            "enabled": false
+        }
+    },
+    "physics": {
+        "enabled": true,
+        "barnesHut": {
+            "gravitationalConstant": -60000,
+            "centralGravity": 0.1,
+            "springLength": 200,
+            "springConstant": 0.08,
+            "damping": 0.12,
+            "avoidOverlap": 1
+        }
+    },
+    "edges": {
+        "smooth": {
+            "type": "curvedCW",
+            "roundness": 0.2
+        },
+        "color": {
+            "inherit": false,
+            "color": "#2E7D32",
+            "opacity": 0.8
+        }
+    }
+}"""
+
+# Full screen toggle injected into the rendered page
+FULLSCREEN_HTML = """
+<button 
+    style="
+        position: fixed;
+        top: 20px;
+        right: 20px;
+        z-index: 10000;
+        padding: 8px 16px;
+        background-color: #4CAF50;
+        color: white;
+        border: none;
+        border-radius: 4px;
+        cursor: pointer;
+        font-family: Arial, sans-serif;
+        font-size: 14px;
+    "
+    onclick="toggleFullscreen()"
+>
+    Full Screen
+</button>
+<script>
+    function toggleFullscreen() {
+        let elem = document.documentElement;
+        if (!document.fullscreenElement) {
+            if (elem.requestFullscreen) {
+                elem.requestFullscreen();
+            } else if (elem.webkitRequestFullscreen) {
+                elem.webkitRequestFullscreen();
+            } else if (elem.msRequestFullscreen) {
+                elem.msRequestFullscreen();
+            }
+        } else {
+            if (document.exitFullscreen) {
+                document.exitFullscreen();
+            } else if (document.webkitExitFullscreen) {
+                document.webkitExitFullscreen();
+            } else if (document.msExitFullscreen) {
+                document.msExitFullscreen();
+            }
+        }
+    }
+</script>
+"""
+
+
+def node_attributes(name, attributes):
+    """Returns the graph attributes of one entity of the model."""
+    return {
+        "color": attributes["color"],
+        "size": attributes["size"],
+        "shape": attributes["shape"],
+        "title": attributes["title"],
+        "label": name
+    }
+
+
+def edge_attributes(label, direction):
+    return {"title": label, "label": label, "arrows": direction}
+
+
+def build_graph(entities, edges):
+    """Builds the NetworkX graph of a model from its `entities` and `edges`."""
+    G = nx.DiGraph()
+    for node, attributes in entities.items():
+        G.add_node(node, **node_attributes(node, attributes))
+
+    # Add edges
+    for source, target, label, direction in edges:
+        G.add_edge(source, target, **edge_attributes(label, direction))
+    return G
+
+
+def precomputed_options(hierarchical):
+    """Options of a layout for pages whose node positions are computed in Python.
+
+    vis.js neither lays out nor simulates these pages, so they draw at once.
+    """
+    options = json.loads(HIERARCHICAL_OPTIONS if hierarchical else FREE_OPTIONS)
+    options["layout"]["hierarchical"]["enabled"] = False
+    options["physics"] = {"enabled": False}
+    return json.dumps(options)
+
+
+def build_network(G, hierarchical, positions=None):
+    """Builds the PyVis network for a graph with the options of the selected layout.
+
+    With `positions` (`{node: (x, y)}`, see `layout.positions`) nodes are
+    placed there and vis.js physics is turned off.
+    """
+    net = Network(height="900px", width="100%", directed=True)
+    # from_nx writes sizes and widths into the attribute dicts, so give it a copy of shared graphs
+    net.from_nx(nx.DiGraph(G))
+    if positions is None:
+        net.set_options(HIERARCHICAL_OPTIONS if hierarchical else FREE_OPTIONS)
+    else:
+        for node in net.nodes:
+            node["x"], node["y"] = positions[node["id"]]
+        net.set_options(precomputed_options(hierarchical))
+    return net
+
+
+def render_html(G, hierarchical, positions=None):
+    """Renders a graph to the standalone HTML page embedded in the app."""
+    html_content = build_network(G, hierarchical, positions).generate_html()
+    return html_content.replace('</body>', f'{FULLSCREEN_HTML}</body>')
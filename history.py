@@ -0,0 +1,257 @@
+import argparse
+import collections
+import functools
+import os
+import threading
+
+import networkx as nx
+
+from db import DATABASE_PATH, shared_database
+from filters import model_view
+from graph import build_graph, render_html
+from model import INSTANCE_MODEL_SOURCE, MODEL_SOURCE, load_model, model_hash, source_stamp
+from model_diff import ModelDiff, diff_graph
+from static_render import render_png, render_svg
+
+# Number of versions whose graph and rendered pages are kept built
+CACHED_VERSIONS = 8
+
+
+def _chunk_keys(edges):
+    """Maps every node to the submodule it belongs to, or to itself above submodule level.
+
+    Submodules are the chunks shared between versions: a version that only
+    changes one submodule stores a new chunk for that submodule alone.
+    """
+    parents = {}
+    for source, target, *_ in edges:
+        parents.setdefault(target, source)
+    keys = {}
+    for node in parents:
+        chain = [node]
+        while chain[-1] in parents and len(chain) <= len(parents):
+            chain.append(parents[chain[-1]])
+        keys[node] = chain[-3] if len(chain) >= 3 else node
+    return keys
+
+
+class ModelVersion:
+    """One published version of the model, assembled from chunks shared with other versions.
+
+    `order` holds the node names and the edges in source order, so the
+    model comes back exactly as it was published and the graph built from
+    it lays out the same way.
+    """
+
+    def __init__(self, name, chunks, order):
+        self.name = name
+        self.chunks = chunks
+        self.order = order
+
+    @property
+    def entities(self):
+        attributes = {name: attributes for chunk in self.chunks for name, attributes in chunk[0]}
+        return {name: dict(attributes[name]) for name in self.order[0]}
+
+    @property
+    def edges(self):
+        return list(self.order[1])
+
+    @functools.cached_property
+    def hash(self):
+        """Content hash of the version, see `model.model_hash`."""
+        return model_hash(self.entities, self.edges)
+
+
+class ModelHistory:
+    """Every published version of the data model, with unchanged submodules stored once.
+
+    Each version is a tuple of immutable chunks, one per submodule, holding
+    that submodule's nodes and the edges leading into them. Chunks (and the
+    attribute tuples inside them) are interned by value, so publishing a
+    version that changes one submodule adds one chunk and references the
+    rest. Graphs and rendered pages are built on first view and kept for the
+    most recently viewed versions, so switching between them is immediate.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._interned = {}
+        self._versions = {}
+        self._rendered = collections.OrderedDict()
+        self._sources = {}
+        self._source_lock = threading.Lock()
+
+    def _intern(self, value):
+        return self._interned.setdefault(value, value)
+
+    def publish(self, name, entities, edges, graph=None):
+        """Records a version; republishing identical content is a no-op.
+
+        `graph` is kept as the version's built graph, for callers that have
+        patched a copy of the previous version's graph rather than rebuilding it.
+        """
+        keys = _chunk_keys(edges)
+        nodes = collections.defaultdict(list)
+        incoming = collections.defaultdict(list)
+        for node, attributes in entities.items():
+            attributes = self._intern(tuple(sorted(attributes.items())))
+            nodes[keys.get(node, node)].append((node, attributes))
+        for edge in edges:
+            incoming[keys.get(edge[1], edge[1])].append(self._intern(tuple(edge)))
+
+        chunks = tuple(
+            self._intern((tuple(nodes.get(key, ())), tuple(incoming.get(key, ()))))
+            for key in dict.fromkeys([*nodes, *incoming])
+        )
+        # The edges are the interned tuples already held by the chunks
+        order = self._intern((tuple(entities), tuple(self._intern(tuple(edge)) for edge in edges)))
+        with self._lock:
+            previous = self._versions.get(name)
+            if previous is not None and previous.chunks == chunks and previous.order == order:
+                return previous
+            version = self._versions[name] = ModelVersion(name, chunks, order)
+            for key in [k for k in self._rendered if k[0] == name]:
+                del self._rendered[key]
+            if graph is not None:
+                self._rendered[(name, "graph")] = graph
+            return version
+
+    def publish_source(self, name, path=MODEL_SOURCE):
+        """Publishes a version from its model script, reading the script only when it has been saved since the last time.
+
+        Callers racing to publish the same script wait for one of them to read it.
+        """
+        with self._source_lock:
+            stamp = source_stamp(path)
+            with self._lock:
+                if self._sources.get(name) == (path, stamp) and name in self._versions:
+                    return self._versions[name]
+            version = self.publish(name, *load_model(path))
+            self._sources[name] = (path, stamp)
+            return version
+
+    def versions(self):
+        with self._lock:
+            return list(self._versions)
+
+    def get(self, name):
+        with self._lock:
+            return self._versions[name]
+
+    def _cached(self, key, build):
+        with self._lock:
+            if key in self._rendered:
+                self._rendered.move_to_end(key)
+                return self._rendered[key]
+        value = build()
+        with self._lock:
+            self._rendered[key] = value
+            versions = list(dict.fromkeys(k[0] for k in self._rendered))
+            for stale in versions[:-CACHED_VERSIONS]:
+                for k in [k for k in self._rendered if k[0] == stale]:
+                    del self._rendered[k]
+        return value
+
+    def graph(self, name):
+        """Returns the graph of a version, built once while it stays among the recent versions.
+
+        The graph is frozen and shared by every session; anything that needs
+        a changed graph copies it first.
+        """
+        version = self.get(name)
+        return self._cached((name, "graph"), lambda: nx.freeze(build_graph(version.entities, version.edges)))
+
+    def view_graph(self, name, focus=None):
+        """Returns the part of a version shown with `focus`: the node and everything beneath it.
+
+        Focused graphs are read-only subgraph views of the version's graph,
+        so they share its nodes and attributes instead of copying them.
+        """
+        G = self.graph(name)
+        if focus is None:
+            return G
+        return self._cached((name, "focus", focus), lambda: G.subgraph([focus, *nx.descendants(G, focus)]))
+
+    def filter_view(self, name):
+        """Returns the filter index and cached layouts of a version's graph."""
+        return self._cached((name, "filters"), lambda: model_view(self.graph(name)))
+
+    def html(self, name, hierarchical, focus=None):
+        """Returns the rendered page of a version, or of its `focus` node's subtree, in one layout."""
+        key = (name, bool(hierarchical)) if focus is None else (name, bool(hierarchical), focus)
+        return self._cached(key, lambda: render_html(self.view_graph(name, focus), hierarchical))
+
+    def svg(self, name, hierarchical, focus=None):
+        """Returns a version drawn to SVG in one layout, for viewers without JavaScript."""
+        return self._cached(
+            (name, "svg", bool(hierarchical), focus),
+            lambda: render_svg(self.view_graph(name, focus), hierarchical),
+        )
+
+    def png(self, name, hierarchical, focus=None):
+        return self._cached(
+            (name, "png", bool(hierarchical), focus),
+            lambda: render_png(self.svg(name, hierarchical, focus)),
+        )
+
+    def diff(self, name, path=INSTANCE_MODEL_SOURCE):
+        """Returns a version's `ModelDiff` against a model script and their union graph coloured by change.
+
+        The script is the extended model (test.py) by default; both are built
+        once per save of it while the version stays among the recent versions.
+        """
+        key = (name, "diff", path, source_stamp(path))
+
+        def build():
+            version = self.get(name)
+            diff = ModelDiff((version.entities, version.edges), load_model(path))
+            return diff, nx.freeze(diff_graph(diff))
+
+        return self._cached(key, build)
+
+    def diff_html(self, name, hierarchical, path=INSTANCE_MODEL_SOURCE):
+        return self._cached(
+            (name, "diff html", path, source_stamp(path), bool(hierarchical)),
+            lambda: render_html(self.diff(name, path)[1], hierarchical),
+        )
+
+    def diff_svg(self, name, hierarchical, path=INSTANCE_MODEL_SOURCE):
+        return self._cached(
+            (name, "diff svg", path, source_stamp(path), bool(hierarchical)),
+            lambda: render_svg(self.diff(name, path)[1], hierarchical),
+        )
+
+    def chunk_count(self):
+        """Number of distinct chunks stored across every version."""
+        with self._lock:
+            return len({id(chunk) for version in self._versions.values() for chunk in version.chunks})
+
+    def load_database(self, database):
+        """Publishes every model version stored in a `db.Database`."""
+        for name in database.model_versions():
+            self.publish(name, *database.load_model(name))
+
+
+_history = None
+_history_lock = threading.Lock()
+
+
+def shared_history():
+    """Returns the process-wide model history, seeded from the SQLite store when one exists."""
+    global _history
+    with _history_lock:
+        if _history is None:
+            _history = ModelHistory()
+            if os.path.exists(DATABASE_PATH):
+                _history.load_database(shared_database())
+        return _history
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Publish a version of the data model to the SQLite store")
+    parser.add_argument("version", help="Version label, e.g. V2.3")
+    parser.add_argument("source", help="Model script defining `entities` and `edges`")
+    args = parser.parse_args()
+    shared_database().save_model(args.version, *load_model(args.source))
+    print(f"Published {args.version} from {args.source}")
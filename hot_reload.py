@@ -0,0 +1,229 @@
+import collections
+import json
+import logging
+import threading
+
+import networkx as nx
+
+from graph import edge_attributes, node_attributes
+from history import shared_history
+from model import MODEL_SOURCE, MODEL_VERSION, load_model, source_stamp
+from model_diff import ModelDiff
+from server import add_route, client_url, shared_server
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 1.0
+LONG_POLL_SECONDS = 25
+# Deltas kept for pages that fall behind; pages further behind are told to
+# reload and replace their network with a snapshot of the whole graph
+RETAINED_DELTAS = 256
+
+# Applies deltas from the feed to the page's vis.js DataSets. Updating the
+# DataSets in place leaves the positions of untouched nodes and the view as
+# they are; a page too far behind for the retained deltas replaces its
+# DataSets with a snapshot of the whole graph instead.
+LIVE_UPDATES_HTML = """
+<script>
+    (function () {
+        var revision = %(revision)d;
+        function removeEdge(pair) {
+            edges.remove(edges.getIds({filter: function (e) { return e.from === pair[0] && e.to === pair[1]; }}));
+        }
+        function apply(delta) {
+            delta.removed_edges.forEach(removeEdge);
+            nodes.remove(delta.removed_nodes);
+            nodes.update(delta.nodes);
+            delta.edges.forEach(function (edge) { removeEdge([edge.from, edge.to]); });
+            edges.add(delta.edges);
+        }
+        function resync() {
+            return fetch(%(snapshot)s)
+                .then(function (response) { return response.json(); })
+                .then(function (snapshot) {
+                    if (typeof nodes !== "undefined") {
+                        edges.clear();
+                        nodes.clear();
+                        nodes.add(snapshot.nodes);
+                        edges.add(snapshot.edges);
+                    }
+                    revision = snapshot.revision;
+                });
+        }
+        function poll() {
+            fetch(%(deltas)s + "&since=" + revision)
+                .then(function (response) { return response.json(); })
+                .then(function (feed) {
+                    if (feed.reload) {
+                        return resync();
+                    }
+                    if (typeof nodes !== "undefined") {
+                        feed.deltas.forEach(apply);
+                    }
+                    revision = feed.revision;
+                })
+                .then(function () { setTimeout(poll, 0); })
+                .catch(function () { setTimeout(poll, 5000); });
+        }
+        poll();
+    })();
+</script>
+"""
+
+
+def patch_graph(G, diff):
+    """Applies a `ModelDiff` to the graph of its old model in place.
+
+    Returns the delta for the live networks: the vis.js nodes and edges to
+    add or update and the node ids and (source, target) pairs to remove.
+    """
+    for name in diff.removed:
+        G.remove_node(name)
+    for source, target in diff.removed_edges:
+        if G.has_edge(source, target):
+            G.remove_edge(source, target)
+
+    changed_nodes = [*diff.added, *diff.restyled]
+    for name in changed_nodes:
+        G.add_node(name, **node_attributes(name, diff.new_entities[name]))
+    labels = {(source, target): (label, direction) for source, target, label, direction in diff.new_edges}
+    changed_edges = [*diff.added_edges, *diff.relabelled_edges]
+    for source, target in changed_edges:
+        G.add_edge(source, target, **edge_attributes(*labels[(source, target)]))
+
+    return {
+        "nodes": [{"id": name, **G.nodes[name]} for name in changed_nodes],
+        "removed_nodes": list(diff.removed),
+        "edges": [{"width": 1, **G.edges[e], "from": e[0], "to": e[1]} for e in changed_edges],
+        "removed_edges": [list(e) for e in diff.removed_edges],
+    }
+
+
+class ModelWatcher:
+    """Watches the model source and patches the published version when it is saved.
+
+    Every change is diffed against the last good model, applied to a copy of
+    the cached graph of `version` that then replaces it, and kept as a
+    numbered delta, so open pages can patch their live networks instead of
+    being re-rendered. A save that does not parse leaves the last good
+    model in place.
+
+    Sessions render the new model, with a fresh layout, on their next rerun;
+    pages that are not rerun keep theirs.
+    """
+
+    def __init__(self, history, version=MODEL_VERSION, path=MODEL_SOURCE, interval=POLL_INTERVAL):
+        self.history = history
+        self.version = version
+        self.path = path
+        self.interval = interval
+        self.revision = 0
+        self._condition = threading.Condition()
+        self._deltas = collections.deque(maxlen=RETAINED_DELTAS)
+        self._stop = threading.Event()
+        self._thread = None
+        # Shares the one read of the model with the prewarm, whichever starts first
+        self._stamp = source_stamp(path)
+        published = history.publish_source(version, path)
+        self._model = (published.entities, published.edges)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="model-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def check(self):
+        """Reloads the model if its source changed; returns the delta applied, if any."""
+        stamp = source_stamp(self.path)
+        if stamp is None or stamp == self._stamp:
+            return None
+        self._stamp = stamp
+        try:
+            model = load_model(self.path)
+        except Exception as e:
+            logger.warning("Keeping the current model, %s does not load: %s", self.path, e)
+            return None
+
+        diff = ModelDiff(self._model, model)
+        self._model = model
+        if not diff.changed:
+            return None
+        # The cached graph is shared with sessions still rendering it, so patch a copy
+        graph = nx.DiGraph(self.history.graph(self.version))
+        delta = patch_graph(graph, diff)
+        self.history.publish(self.version, *model, graph=nx.freeze(graph))
+
+        with self._condition:
+            self.revision += 1
+            delta["revision"] = self.revision
+            self._deltas.append(delta)
+            self._condition.notify_all()
+        logger.info("Model %s revision %d: %s", self.version, self.revision,
+                    ", ".join(f"{count} {kind}" for kind, count in diff.counts().items()))
+        return delta
+
+    def deltas(self, since, timeout=0):
+        """Returns the deltas after revision `since`, waiting up to `timeout` seconds for one."""
+        with self._condition:
+            if timeout:
+                self._condition.wait_for(lambda: self.revision != since, timeout)
+            oldest = self._deltas[0]["revision"] if self._deltas else self.revision + 1
+            if since > self.revision or since + 1 < oldest:
+                return {"revision": self.revision, "reload": True}
+            return {"revision": self.revision, "deltas": [d for d in self._deltas if d["revision"] > since]}
+
+    def snapshot(self):
+        """The whole watched graph as vis.js nodes and edges, for pages too far behind for the deltas."""
+        with self._condition:
+            revision = self.revision
+            G = self.history.graph(self.version)
+        return {
+            "revision": revision,
+            "nodes": [{"id": name, **attributes} for name, attributes in G.nodes(data=True)],
+            "edges": [{"width": 1, **attributes, "from": u, "to": v} for u, v, attributes in G.edges(data=True)],
+        }
+
+    def live(self, html):
+        """Adds the delta poller to a page rendered from the watched version."""
+        script = LIVE_UPDATES_HTML % {
+            "revision": self.revision,
+            "deltas": json.dumps(client_url("/deltas")),
+            "snapshot": json.dumps(client_url("/snapshot")),
+        }
+        return html.replace("</body>", f"{script}</body>")
+
+
+_watcher = None
+_watcher_lock = threading.Lock()
+
+
+def _since(query):
+    try:
+        return int(query.get("since", 0))
+    except ValueError:
+        raise ValueError("since must be a revision number") from None
+
+
+def shared_watcher():
+    """Returns the process-wide model watcher, serving /deltas?since=<revision> and /snapshot from the side server.
+
+    Returns None when the side server is off (MODEL_SERVER_PORT is not set).
+    """
+    global _watcher
+    if shared_server() is None:
+        return None
+    with _watcher_lock:
+        if _watcher is None:
+            watcher = ModelWatcher(shared_history())
+            add_route("/deltas", lambda query: watcher.deltas(_since(query), LONG_POLL_SECONDS))
+            add_route("/snapshot", lambda query: watcher.snapshot())
+            _watcher = watcher.start()
+        return _watcher
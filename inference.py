@@ -0,0 +1,223 @@
+import argparse
+import collections
+import concurrent.futures
+import csv
+import math
+import os
+import re
+import shutil
+import tempfile
+import zlib
+
+from db import DATABASE_PATH, Database
+
+# One exchange per matching log line; groups must not span lines. The date
+# group is optional and only used to measure how regular an exchange is.
+DEFAULT_PATTERN = (
+    r"^(?P<date>\d{4}-\d{2}-\d{2})?[^\n]*?\b(?:src|source|from)=(?P<source>[^\s,;]+)"
+    r"[^\n]*?\b(?:dst|dest|destination|to)=(?P<target>[^\s,;]+)"
+)
+
+READ_BYTES = 8 << 20
+# Distinct (source, target, day) counts a worker holds before spilling them to disk
+MAX_KEYS_IN_MEMORY = 1_000_000
+SPILL_PARTITIONS = 64
+
+# Exchanges at which volume alone gives ~63% confidence
+CONFIDENCE_EXCHANGES = 10
+MIN_EXCHANGES = 3
+MIN_CONFIDENCE = 0.5
+
+
+def _ranges(paths, workers):
+    """Splits the log files into about `workers` byte ranges each, aligned to lines by the readers."""
+    for path in paths:
+        size = os.path.getsize(path)
+        step = max(size // workers + 1, READ_BYTES)
+        for start in range(0, size, step):
+            yield path, start, min(start + step, size)
+
+
+def _blocks(path, start, end):
+    """Yields whole lines of a file, in blocks, starting in [start, end)."""
+    with open(path, "rb") as f:
+        if start:
+            f.seek(start - 1)
+            f.readline()
+        position = f.tell()
+        while position < end:
+            block = f.read(min(READ_BYTES, end - position))
+            if not block:
+                break
+            if not block.endswith(b"\n"):
+                block += f.readline()
+            position = f.tell()
+            yield block
+
+
+def _spill(counts, spill_dir, name):
+    """Appends counts to hash-partitioned files, so one partition of every worker fits in memory."""
+    partitions = collections.defaultdict(list)
+    for (source, target, day), count in counts.items():
+        line = b"%s\t%s\t%s\t%d\n" % (source, target, day, count)
+        partitions[zlib.crc32(source + b"\t" + target) % SPILL_PARTITIONS].append(line)
+    for partition, lines in partitions.items():
+        with open(os.path.join(spill_dir, f"{partition}-{name}.tsv"), "ab") as f:
+            f.writelines(lines)
+    counts.clear()
+
+
+def _count_range(path, start, end, pattern, aliases, spill_dir, max_keys):
+    """Counts the exchanges of one byte range, spilling whenever the counts outgrow `max_keys`."""
+    regex = re.compile(pattern.encode("utf-8"), re.MULTILINE)
+    name = f"{os.getpid()}-{zlib.crc32(path.encode('utf-8'))}-{start}"
+    has_date = "date" in regex.groupindex
+    counts = collections.Counter()
+    matched = 0
+    for block in _blocks(path, start, end):
+        for match in regex.finditer(block):
+            source, target = match.group("source", "target")
+            source, target = aliases.get(source, source), aliases.get(target, target)
+            if source == target:
+                continue
+            day = (match.group("date") or b"") if has_date else b""
+            counts[source, target, day] += 1
+            matched += 1
+        if len(counts) > max_keys:
+            _spill(counts, spill_dir, name)
+    _spill(counts, spill_dir, name)
+    return matched
+
+
+def _merge_partition(paths):
+    """Sums one partition's spilled counts into (source, target, exchanges, days) and the days seen.
+
+    Exchanges without a date count towards the exchanges but not the days.
+    """
+    pairs = {}
+    days = collections.defaultdict(set)
+    for path in paths:
+        with open(path, "rb") as f:
+            for line in f:
+                source, target, day, count = line.rstrip(b"\n").split(b"\t")
+                # Logs are not always UTF-8; one bad byte should not end the run
+                pair = (source.decode("utf-8", errors="replace"), target.decode("utf-8", errors="replace"))
+                pairs[pair] = pairs.get(pair, 0) + int(count)
+                if day:
+                    days[pair].add(day)
+    seen = set().union(*days.values())
+    return [(*pair, exchanges, len(days[pair])) for pair, exchanges in pairs.items()], seen
+
+
+def confidence(exchanges, days, total_days):
+    """Scores an observed pair: saturating in its volume, scaled by the share of days it was seen on.
+
+    Without dated exchanges (`total_days` of 0) only the volume counts.
+    """
+    volume = 1 - math.exp(-exchanges / CONFIDENCE_EXCHANGES)
+    regularity = days / total_days if total_days else 1
+    return round(volume * (0.5 + 0.5 * regularity), 3)
+
+
+def infer_dependencies(
+    paths,
+    pattern=DEFAULT_PATTERN,
+    aliases=None,
+    systems=None,
+    workers=None,
+    max_keys=MAX_KEYS_IN_MEMORY,
+    min_exchanges=MIN_EXCHANGES,
+    min_confidence=MIN_CONFIDENCE,
+):
+    """Infers system dependencies from data-exchange logs in a single pass.
+
+    Every log line matching `pattern` is one exchange from its source to its
+    target system, so the target is taken to depend on the source. Byte
+    ranges of the logs are counted on `workers` processes; each keeps at
+    most `max_keys` counts in memory and spills the rest to partitioned
+    files, which are then merged a partition at a time. `aliases` maps raw
+    identifiers (hosts, interface names) to System IDs and, when `systems`
+    is given, pairs with an unknown end are dropped. Returns the inferred
+    edges, strongest first, and a summary of the run.
+    """
+    workers = workers or os.cpu_count() or 1
+    encoded = {key.encode("utf-8"): value.encode("utf-8") for key, value in (aliases or {}).items()}
+    spill_dir = tempfile.mkdtemp(prefix="inference-")
+    try:
+        with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+            jobs = [
+                pool.submit(_count_range, path, start, end, pattern, encoded, spill_dir, max_keys)
+                for path, start, end in _ranges(paths, workers)
+            ]
+            exchanges = sum(job.result() for job in jobs)
+            partitions = collections.defaultdict(list)
+            for name in os.listdir(spill_dir):
+                partitions[name.split("-", 1)[0]].append(os.path.join(spill_dir, name))
+            merged = list(pool.map(_merge_partition, partitions.values()))
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+    total_days = len(set().union(*(seen for _, seen in merged)))
+    inferred = []
+    unknown = 0
+    for source, target, count, days in (pair for pairs, _ in merged for pair in pairs):
+        if systems is not None and (source not in systems or target not in systems):
+            unknown += 1
+            continue
+        score = confidence(count, days, total_days)
+        if count < min_exchanges or score < min_confidence:
+            continue
+        inferred.append({
+            "upstream": source,
+            "dependent": target,
+            "exchanges": count,
+            "days": days,
+            # Exchanges per day, unknown when the logs carry no dates
+            "frequency": round(count / total_days, 3) if total_days else None,
+            "confidence": score,
+        })
+    inferred.sort(key=lambda edge: (-edge["confidence"], -edge["exchanges"], edge["upstream"], edge["dependent"]))
+    summary = {
+        "exchanges": exchanges,
+        "pairs": sum(len(pairs) for pairs, _ in merged),
+        "unknown_pairs": unknown,
+        "days": total_days,
+        "inferred": len(inferred),
+    }
+    return inferred, summary
+
+
+def read_aliases(path):
+    """Reads a two-column CSV of log identifier, System ID."""
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        return {row[0].strip(): row[1].strip() for row in csv.reader(f) if len(row) >= 2 and row[0].strip()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Infer system dependencies from data-exchange logs")
+    parser.add_argument("logs", nargs="+", help="Interface/transfer log files")
+    parser.add_argument("--pattern", default=DEFAULT_PATTERN, help="Regex with source, target and optional date groups")
+    parser.add_argument("--aliases", help="CSV mapping log identifiers to System IDs")
+    parser.add_argument("--workers", type=int, help="Processes to count with (default: every core)")
+    parser.add_argument("--max-keys", type=int, default=MAX_KEYS_IN_MEMORY, help="Counts per worker before spilling")
+    parser.add_argument("--min-confidence", type=float, default=MIN_CONFIDENCE)
+    parser.add_argument("--database", default=DATABASE_PATH, help="SQLite database to write the dependencies to")
+    parser.add_argument("--dry-run", action="store_true", help="Print the inferred dependencies without saving them")
+    args = parser.parse_args()
+
+    database = Database(args.database)
+    systems = {row["System ID"] for row in database.query('SELECT "System ID" FROM systems')}
+    inferred, summary = infer_dependencies(
+        args.logs,
+        args.pattern,
+        read_aliases(args.aliases) if args.aliases else None,
+        systems or None,
+        args.workers,
+        args.max_keys,
+        min_confidence=args.min_confidence,
+    )
+    for edge in inferred if args.dry_run else inferred[:20]:
+        print(f"{edge['upstream']} -> {edge['dependent']}: {edge['exchanges']} exchanges, confidence {edge['confidence']}")
+    if not args.dry_run:
+        database.save_inferred_dependencies(inferred)
+    print(", ".join(f"{value} {key.replace('_', ' ')}" for key, value in summary.items()))
@@ -0,0 +1,257 @@
+import argparse
+import csv
+import os
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from model import INSTANCE_MODEL_SOURCE, load_model, model_fields
+
+# Low-cardinality fields whose repeated values are interned into a shared dictionary
+CATEGORICAL_FIELDS = {
+    "System Status",
+    "Agency Name",
+    "Ministry Family Name",
+    "Ministry Family",
+    "Agency Operational Status",
+    "Security Classification",
+    "Sensitivity Classification",
+    "Designated CII",
+    "System Criticality",
+    "RML Alignment",
+    "Dependency Status",
+    "Dependency Type",
+    "MHA Approval",
+    "CSA Approval",
+    "SNDGO Approval",
+    "Economy",
+    "Public Health and Safety",
+    "National Security",
+    "Social Preparedness",
+    "Public Service",
+}
+
+NUMERIC_FIELDS = {
+    "Service Availability",
+    "RTO",
+    "RPO",
+    "Total Dependencies",
+    "Downstream Impact",
+    "Direct Dependencies Count",
+    "Data Exchange Frequency",
+}
+
+CHUNK_BYTES = 16 << 20
+EXCEL_CHUNK_ROWS = 50_000
+
+
+def field_type(field):
+    """Arrow type a model field is stored as."""
+    if field in CATEGORICAL_FIELDS:
+        return pa.dictionary(pa.int32(), pa.string())
+    if field in NUMERIC_FIELDS:
+        return pa.float64()
+    return pa.string()
+
+
+def field_category(field):
+    """Kind of value a model field holds, as shown to users."""
+    if field in CATEGORICAL_FIELDS:
+        return "Category"
+    if field in NUMERIC_FIELDS:
+        return "Number"
+    return "Text"
+
+
+def validate_columns(columns, fields):
+    """Raises if any column of an export is not a field of the data model."""
+    unknown = [column for column in columns if column not in fields]
+    if unknown:
+        raise ValueError(f"Columns not in the data model: {', '.join(unknown)}")
+    if len(set(columns)) != len(columns):
+        raise ValueError("Export has duplicate column names")
+
+
+class Interner:
+    """Running dictionaries of categorical values, shared by every chunk of an ingest."""
+
+    def __init__(self):
+        self.dictionaries = {}
+        self.codes = {}
+
+    def encode(self, field, values):
+        """Dictionary-encodes a string array against the field's running dictionary."""
+        dictionary = self.dictionaries.setdefault(field, [])
+        codes = self.codes.setdefault(field, {})
+        for value in pc.unique(values.drop_null()).to_pylist():
+            if value not in codes:
+                codes[value] = len(dictionary)
+                dictionary.append(value)
+        dictionary_array = pa.array(dictionary, pa.string())
+        indices = pc.index_in(values, value_set=dictionary_array).cast(pa.int32())
+        return pa.DictionaryArray.from_arrays(indices, dictionary_array)
+
+
+def _csv_batches(path, block_size):
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        columns = next(csv.reader(f), [])
+    yield columns
+    reader = pa_csv.open_csv(
+        path,
+        read_options=pa_csv.ReadOptions(block_size=block_size),
+        # Read everything as text so typing is decided by the model, not by inference
+        convert_options=pa_csv.ConvertOptions(
+            column_types={column: pa.string() for column in columns},
+            strings_can_be_null=True,
+        ),
+    )
+    yield from reader
+
+
+def _excel_batches(path, chunk_rows):
+    try:
+        import openpyxl
+    except ImportError as e:
+        raise ImportError("Excel ingestion requires openpyxl (pip install openpyxl)") from e
+
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        columns = [str(c) for c in next(rows, ())]
+        yield columns
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == chunk_rows:
+                yield _rows_to_batch(columns, chunk)
+                chunk = []
+        if chunk:
+            yield _rows_to_batch(columns, chunk)
+    finally:
+        workbook.close()
+
+
+def _rows_to_batch(columns, rows):
+    values = [
+        pa.array([None if row[i] in (None, "") else str(row[i]) for row in rows], pa.string())
+        for i in range(len(columns))
+    ]
+    return pa.RecordBatch.from_arrays(values, names=columns)
+
+
+def read_batches(path, chunk_bytes=CHUNK_BYTES, chunk_rows=EXCEL_CHUNK_ROWS):
+    """Streams an export as record batches of strings; the first item yielded is the column list."""
+    if os.path.splitext(path)[1].lower() in (".xlsx", ".xlsm"):
+        return _excel_batches(path, chunk_rows)
+    return _csv_batches(path, chunk_bytes)
+
+
+def convert_batch(batch, interner, row_offset=0):
+    """Types one chunk of an export according to the model fields."""
+    arrays = []
+    for name, values in zip(batch.schema.names, batch.columns):
+        values = pc.utf8_trim_whitespace(values)
+        values = pc.if_else(pc.equal(values, ""), pa.scalar(None, pa.string()), values)
+        if name in CATEGORICAL_FIELDS:
+            arrays.append(interner.encode(name, values))
+        elif name in NUMERIC_FIELDS:
+            try:
+                arrays.append(pc.cast(pc.replace_substring(values, "%", ""), pa.float64()))
+            except pa.ArrowInvalid as e:
+                raise ValueError(f"Non-numeric value in '{name}' within rows {row_offset + 1}-{row_offset + len(batch)}: {e}") from e
+        else:
+            arrays.append(values)
+
+    if "System ID" in batch.schema.names:
+        missing = arrays[batch.schema.names.index("System ID")].null_count
+        if missing:
+            raise ValueError(f"{missing} rows without a System ID within rows {row_offset + 1}-{row_offset + len(batch)}")
+    return pa.RecordBatch.from_arrays(arrays, names=batch.schema.names)
+
+
+def ingest(path, sink, model_source=INSTANCE_MODEL_SOURCE, chunk_bytes=CHUNK_BYTES):
+    """Streams a CSV/Excel inventory export chunk by chunk into `sink`.
+
+    Each chunk is validated against the model's field list, has its
+    categorical values interned into running dictionaries and is handed to
+    `sink.write(batch)` before the next chunk is read, so memory stays bounded
+    by the chunk size whatever the size of the export. Returns the number of
+    rows ingested.
+    """
+    entities, edges = load_model(model_source)
+    batches = read_batches(path, chunk_bytes)
+    columns = next(batches)
+    validate_columns(columns, set(model_fields(entities, edges)))
+
+    interner = Interner()
+    rows = 0
+    for batch in batches:
+        sink.write(convert_batch(batch, interner, rows))
+        rows += len(batch)
+    return rows
+
+
+class ParquetSink:
+    """Writes ingested chunks as row groups of a single Parquet file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.writer = None
+
+    def write(self, batch):
+        if self.writer is None:
+            self.schema = pa.schema([(name, field_type(name)) for name in batch.schema.names])
+            self.writer = pq.ParquetWriter(self.path, self.schema)
+        self.writer.write_table(pa.Table.from_batches([batch]).cast(self.schema))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def ingest_to_parquet(path, out_path, model_source=INSTANCE_MODEL_SOURCE, chunk_bytes=CHUNK_BYTES):
+    """Ingests an export into a Parquet file, returning the number of rows written."""
+    with ParquetSink(out_path) as sink:
+        return ingest(path, sink, model_source, chunk_bytes)
+
+
+def ingest_to_database(path, database, table="systems", model_source=INSTANCE_MODEL_SOURCE, chunk_bytes=CHUNK_BYTES):
+    """Upserts an export into an instance table of a `db.Database`, returning the number of rows.
+
+    A derived-field scheduler running in this process waits for the whole
+    export before recomputing; one in another process (the app) sees the
+    import through `Database.revisions`.
+    """
+    # derived imports this module for its field types
+    from derived import deferred_derived_fields
+
+    with deferred_derived_fields(database):
+        return ingest(path, database.sink(table), model_source, chunk_bytes)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream a system inventory export into Parquet or the SQLite store")
+    parser.add_argument("export", help="CSV or Excel export with model field names as headers")
+    parser.add_argument("output", nargs="?", help="Parquet file to write")
+    parser.add_argument("--database", help="SQLite store to upsert the records into instead (see db.py)")
+    parser.add_argument("--table", default="systems", help="Instance table the export holds, with --database")
+    parser.add_argument("--chunk-mb", type=int, default=CHUNK_BYTES >> 20, help="CSV chunk size in MB")
+    args = parser.parse_args()
+    if args.database:
+        from db import Database
+
+        rows = ingest_to_database(args.export, Database(args.database), args.table, chunk_bytes=args.chunk_mb << 20)
+        print(f"Ingested {rows} rows into the {args.table} table of {args.database}")
+    elif args.output:
+        rows = ingest_to_parquet(args.export, args.output, chunk_bytes=args.chunk_mb << 20)
+        print(f"Ingested {rows} rows into {args.output}")
+    else:
+        parser.error("give a Parquet file to write or --database")
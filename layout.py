@@ -0,0 +1,82 @@
+import math
+
+import networkx as nx
+
+# Spacing of the precomputed layouts, matching nodeSpacing/levelSeparation of the hierarchical options
+NODE_SPACING = 200
+LEVEL_SEPARATION = 200
+# Larger graphs get the radial tree as their free layout instead of a force-directed one
+FORCE_LAYOUT_MAX_NODES = 500
+
+
+def _forest(G):
+    """Returns the children of every node in a breadth-first spanning forest of G, its roots and depths.
+
+    Trees grow from the nodes without parents in node order; nodes only
+    reachable through a cycle start trees of their own.
+    """
+    children = {node: [] for node in G}
+    depths = {}
+    roots = []
+    for start in [n for n in G if G.in_degree(n) == 0] + list(G):
+        if start in depths:
+            continue
+        roots.append(start)
+        depths[start] = 0
+        level = [start]
+        while level:
+            following = []
+            for node in level:
+                for child in G.successors(node):
+                    if child not in depths:
+                        depths[child] = depths[node] + 1
+                        children[node].append(child)
+                        following.append(child)
+            level = following
+    return children, roots, depths
+
+
+def hierarchical_positions(G):
+    """Lays G out top-down as a tidy tree: leaves side by side, parents centred over their children."""
+    children, roots, depths = _forest(G)
+    x = {}
+    slot = 0
+    for root in roots:
+        stack = [(root, False)]
+        while stack:
+            node, visited = stack.pop()
+            if not children[node]:
+                x[node] = slot * NODE_SPACING
+                slot += 1
+            elif visited:
+                x[node] = (x[children[node][0]] + x[children[node][-1]]) / 2
+            else:
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(children[node]))
+        slot += 1
+    return {node: (x[node], depths[node] * LEVEL_SEPARATION) for node in G}
+
+
+def radial_positions(G):
+    """Wraps the tidy tree around its roots: depth becomes the radius and tree order the angle."""
+    tree = hierarchical_positions(G)
+    width = max((x for x, _ in tree.values()), default=0) + NODE_SPACING
+    return {
+        node: (y * math.cos(2 * math.pi * x / width), y * math.sin(2 * math.pi * x / width))
+        for node, (x, y) in tree.items()
+    }
+
+
+def free_positions(G):
+    """Force-directed layout seeded from the radial tree, so the result is the same on every build."""
+    radial = radial_positions(G)
+    if len(G) > FORCE_LAYOUT_MAX_NODES or len(G) < 3:
+        return radial
+    scale = NODE_SPACING * math.sqrt(len(G))
+    spring = nx.spring_layout(nx.Graph(G), pos={n: (x / scale, y / scale) for n, (x, y) in radial.items()}, seed=0)
+    return {node: (float(x) * scale, float(y) * scale) for node, (x, y) in spring.items()}
+
+
+def positions(G, hierarchical):
+    """Returns precomputed `{node: (x, y)}` pixel positions for one layout mode."""
+    return hierarchical_positions(G) if hierarchical else free_positions(G)
@@ -0,0 +1,199 @@
+import argparse
+import concurrent.futures
+import json
+import os
+import resource
+import subprocess
+import time
+
+import numpy as np
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1.element_tree import Block
+
+from model import APP_SCRIPT, ROOT
+from prewarm import shared_prewarm
+
+RESULTS_ROOT = os.path.join(ROOT, "loadtest-results")
+PERCENTILES = (50, 90, 99)
+
+# The flow every simulated viewer goes through: (step, toggle to flip, value)
+FLOW = (
+    ("open", None, None),
+    ("login", None, None),
+    ("hierarchical", "Enable Hierarchical Layout", True),
+    ("free", "Enable Hierarchical Layout", False),
+    ("compare", "Highlight Changes in Extended Model", True),
+    ("compare off", "Highlight Changes in Extended Model", False),
+    ("static", "Static Image (no JavaScript)", True),
+)
+
+
+def resident_bytes():
+    """Current resident set size of this process, or its peak where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _payload_bytes(at):
+    """Serialised size of every element the run sent to the browser."""
+    return sum(
+        len(node.proto.SerializeToString())
+        for block in (at.main, at.sidebar)
+        for node in block
+        if not isinstance(node, Block) and getattr(node, "proto", None) is not None
+    )
+
+
+class Session:
+    """One simulated viewer, stepped through `FLOW` one rerun at a time."""
+
+    def __init__(self, password, app=APP_SCRIPT, timeout=120):
+        self.password = password
+        self.app = AppTest.from_file(app, default_timeout=timeout)
+        self.steps = []
+
+    def step(self, index):
+        step, toggle, value = FLOW[index]
+        at = self.app
+        if step == "login":
+            at.text_input(key="password").set_value(self.password)
+        elif toggle is not None:
+            next(t for t in at.toggle if t.label == toggle).set_value(value)
+        started = time.perf_counter()
+        cpu_started = time.process_time()
+        at.run()
+        self.steps.append({
+            "step": step,
+            "seconds": time.perf_counter() - started,
+            "cpu_seconds": time.process_time() - cpu_started,
+            "payload_bytes": _payload_bytes(at),
+            "errors": [str(e.value) for e in at.exception] + [e.value for e in at.error],
+        })
+
+
+def run_sessions(count, password, app=APP_SCRIPT):
+    """Opens `count` sessions and advances them through `FLOW` in lockstep.
+
+    Every session stays open until all have finished, so the memory they
+    hold is resident at the same time, as with concurrent viewers. Streamlit's
+    AppTest runs one script at a time per process, so reruns are interleaved
+    rather than simultaneous. A warm-up session runs first so imports and
+    process-wide caches are not counted against the viewers; the app's own
+    prewarm is waited for and its stage timings reported.
+    """
+    warm_up = Session(password, app)
+    for index in range(len(FLOW)):
+        warm_up.step(index)
+    prewarm = shared_prewarm()
+    prewarm.wait(timeout=600)
+    baseline = resident_bytes()
+    sessions = [Session(password, app) for _ in range(count)]
+    for index in range(len(FLOW)):
+        for session in sessions:
+            session.step(index)
+    return {
+        "resident_growth_bytes": max(resident_bytes() - baseline, 0),
+        "prewarm": prewarm.status(),
+        "sessions": [s.steps for s in sessions],
+    }
+
+
+def _percentiles(values):
+    values = np.asarray(values, dtype=float)
+    if not len(values):
+        return {}
+    return {f"p{p}": round(float(np.percentile(values, p)) * 1000, 2) for p in PERCENTILES}
+
+
+def _revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_test(sessions, processes, password, app=APP_SCRIPT):
+    """Runs `sessions` simulated viewers spread over `processes` replicas and summarises them.
+
+    Memory per session is the growth in each replica's resident memory with
+    all of its sessions open, divided by its number of sessions; CPU time
+    and latency are measured per rerun.
+    """
+    counts = [sessions // processes + (i < sessions % processes) for i in range(processes)]
+    counts = [c for c in counts if c]
+    started = time.perf_counter()
+    if len(counts) == 1:
+        replicas = [run_sessions(counts[0], password, app)]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(len(counts)) as pool:
+            replicas = list(pool.map(run_sessions, counts, [password] * len(counts), [app] * len(counts)))
+    elapsed = time.perf_counter() - started
+
+    per_session = [steps for replica in replicas for steps in replica["sessions"]]
+    steps = [step for session in per_session for step in session]
+    summary = {
+        "sessions": sessions,
+        "processes": len(counts),
+        "wall_seconds": round(elapsed, 3),
+        "memory_per_session_bytes": int(sum(r["resident_growth_bytes"] for r in replicas) / sessions),
+        "cpu_seconds_per_session": round(sum(s["cpu_seconds"] for s in steps) / sessions, 4),
+        "latency_ms": _percentiles([s["seconds"] for s in steps]),
+        "steps": {
+            name: {
+                "latency_ms": _percentiles([s["seconds"] for s in steps if s["step"] == name]),
+                "cpu_ms": round(float(np.mean([s["cpu_seconds"] for s in steps if s["step"] == name])) * 1000, 2),
+                "payload_bytes": int(np.mean([s["payload_bytes"] for s in steps if s["step"] == name])),
+            }
+            for name, *_ in FLOW
+        },
+        "errors": sorted({e for s in steps for e in s["errors"]}),
+        "prewarm": replicas[0]["prewarm"],
+    }
+    return {
+        "revision": _revision(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "summary": summary,
+        "sessions": per_session,
+    }
+
+
+def compare(baseline, current):
+    """Returns lines comparing the headline figures of two saved results."""
+    lines = []
+    for label, key in (("memory/session", "memory_per_session_bytes"), ("cpu/session", "cpu_seconds_per_session")):
+        old, new = baseline["summary"][key], current["summary"][key]
+        lines.append(f"{label}: {old} -> {new} ({(new - old) / old * 100 if old else 0:+.1f}%)")
+    for p, old in baseline["summary"]["latency_ms"].items():
+        new = current["summary"]["latency_ms"][p]
+        lines.append(f"latency {p}: {old} -> {new} ms ({(new - old) / old * 100 if old else 0:+.1f}%)")
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drive simulated viewers through the app and report their cost")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--processes", type=int, default=1, help="Replicas to spread the sessions over")
+    parser.add_argument("--password", default=os.environ.get("APP_PASSWORD"), help="App password (default: $APP_PASSWORD)")
+    parser.add_argument("--label", default="", help="Added to the results file name")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    args = parser.parse_args()
+    if not args.password:
+        parser.error("pass --password or set APP_PASSWORD")
+
+    results = load_test(args.sessions, args.processes, args.password)
+    os.makedirs(RESULTS_ROOT, exist_ok=True)
+    name = "-".join(filter(None, [time.strftime("%Y%m%d-%H%M%S"), results["revision"], args.label]))
+    path = os.path.join(RESULTS_ROOT, f"{name}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    print(json.dumps(results["summary"], indent=2))
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            print("\n".join(compare(json.load(f), results)))
+    print(f"Saved {path}")
@@ -1,9 +1,24 @@
+import os
+
 import streamlit as st
-from pyvis.network import Network
-import networkx as nx
 import streamlit.components.v1 as components
-import tempfile
-import os
+
+from api import shared_api
+from approvals import APPROVERS, shared_approval_rollups
+from cycles import shared_condensed_view
+from db import DATABASE_PATH, shared_database
+from derived import shared_derived_fields
+from directory import shared_holder_directory
+from filters import shared_instance_view
+from history import shared_history
+from hot_reload import shared_watcher
+from model import MODEL_VERSION
+from partitions import shared_agency_views
+from prebuild import prebuilt_html
+from prewarm import shared_prewarm
+from tooltips import shared_tooltips
+from view_state import ViewState
+from webgl import view_payload, webgl_graph
 
 def check_password():
     """Returns `True` if the user had the correct password."""
@@ -30,527 +45,193 @@ def check_password():
     else:
         return True
 
+# Warm the shared caches in the background from the first run in this process
+# (or from server start, with python prewarm.py)
+shared_prewarm()
+
 if check_password():
     st.set_page_config(page_title="Interactive Interdependency Graph", layout="wide")
-    st.title("⚙️ Entity Relationship Diagram : System Management and Agency Management Data Model (V2.2)")
+    title = st.empty()
     
     # Add the view toggle
     view_type = st.toggle("Enable Hierarchical Layout", False)
-
-    # Define standardised settings
-    NODE_SETTINGS = {
-        "module": {
-            "size": 50,
-            "shape": "dot"
-        },
-        "submodule": {
-            "size": 35,
-            "shape": "dot"
-        },
-        "subgroup": {
-            "size": 25,
-            "shape": "dot"
-        },
-        "field": {
-            "size": 15,
-            "shape": "dot"
-        }
-    }
-
-    COLOR_SCHEMES = {
-        "system_management": {
-            "module": "#1B5E20",      # Darkest green
-            "submodule": "#2E7D32",   # Dark green
-            "subgroup": "#388E3C",    # Medium green
-            "field": "#43A047"        # Light green
-        },
-        "agency_management": {
-            "module": "#1A237E",      # Darkest blue
-            "submodule": "#283593",   # Dark blue
-            "subgroup": "#303F9F",    # Medium blue
-            "field": "#3949AB"        # Light blue
-        }
-    }
-
-    # Complete entities dictionary with all nodes
-    entities = {
-        # Root node
-        "DGP 2.0": {
-            "color": "#1A237E",  # Dark blue color
-            "size": 60,  # Larger than module size
-            "shape": NODE_SETTINGS["module"]["shape"],
-            "title": "DGP 2.0 Root"
-        },
-    
-        # System Management Module and related nodes
-        "System Management": {
-            "color": COLOR_SCHEMES["system_management"]["module"],
-            "size": NODE_SETTINGS["module"]["size"],
-            "shape": NODE_SETTINGS["module"]["shape"],
-            "title": "System Management Module"
-        },
-        "System Identity & Classification": {
-            "color": COLOR_SCHEMES["system_management"]["submodule"],
-            "size": NODE_SETTINGS["submodule"]["size"],
-            "shape": NODE_SETTINGS["submodule"]["shape"],
-            "title": "System Identity & Classification Sub-Module"
-        },
-        "Criticality & Risk": {
-            "color": COLOR_SCHEMES["system_management"]["submodule"],
-            "size": NODE_SETTINGS["submodule"]["size"],
-            "shape": NODE_SETTINGS["submodule"]["shape"],
-            "title": "Criticality & Risk Sub-Module"
-        },
-        "System Resilience": {
-            "color": COLOR_SCHEMES["system_management"]["submodule"],
-            "size": NODE_SETTINGS["submodule"]["size"],
-            "shape": NODE_SETTINGS["submodule"]["shape"],
-            "title": "System Resilience Sub-Module"
-        },
-        "Hosting and System Dependencies": {
-            "color": COLOR_SCHEMES["system_management"]["submodule"],
-            "size": NODE_SETTINGS["submodule"]["size"],
-            "shape": NODE_SETTINGS["submodule"]["shape"],
-            "title": "Hosting and System Dependencies Sub-Module"
-        },
-
-            # Agency Management Module and related nodes
-        "Agency Management": {
-            "color": COLOR_SCHEMES["agency_management"]["module"],
-            "size": NODE_SETTINGS["module"]["size"],
-            "shape": NODE_SETTINGS["module"]["shape"],
-            "title": "Agency Management Module"
-        },
-        "Agency": {
-            "color": COLOR_SCHEMES["agency_management"]["submodule"],
-            "size": NODE_SETTINGS["submodule"]["size"],
-            "shape": NODE_SETTINGS["submodule"]["shape"],
-            "title": "Agency Sub-Module"
-        },
-        "Key Appointment Holder": {
-            "color": COLOR_SCHEMES["agency_management"]["submodule"],
-            "size": NODE_SETTINGS["submodule"]["size"],
-            "shape": NODE_SETTINGS["submodule"]["shape"],
-            "title": "Key Appointment Holder Sub-Module"
-        },
-
-        # System Management Subgroups
-        "Basic Information": {
-            "color": COLOR_SCHEMES["system_management"]["subgroup"],
-            "size": NODE_SETTINGS["subgroup"]["size"],
-            "shape": NODE_SETTINGS["subgroup"]["shape"],
-            "title": "Basic Information Sub-Group"
-        },
-        "Organizational Context": {
-            "color": COLOR_SCHEMES["system_management"]["subgroup"],
-            "size": NODE_SETTINGS["subgroup"]["size"],
-            "shape": NODE_SETTINGS["subgroup"]["shape"],
-            "title": "Organizational Context Sub-Group"
-        },
-        "Classification": {
-            "color": COLOR_SCHEMES["system_management"]["subgroup"],
-            "size": NODE_SETTINGS["subgroup"]["size"],
-            "shape": NODE_SETTINGS["subgroup"]["shape"],
-            "title": "Classification Sub-Group"
-        },
-        "Impact Assessment": {
-            "color": COLOR_SCHEMES["system_management"]["subgroup"],
-            "size": NODE_SETTINGS["subgroup"]["size"],
-            "shape": NODE_SETTINGS["subgroup"]["shape"],
-            "title": "Impact Assessment Sub-Group"
-        },
-        "Risk Profile": {
-            "color": COLOR_SCHEMES["system_management"]["subgroup"],
-            "size": NODE_SETTINGS["subgroup"]["size"],
-            "shape": NODE_SETTINGS["subgroup"]["shape"],
-            "title": "Risk Profile Sub-Group"
-        },
-        "SCA/RML Approval": {
-            "color": COLOR_SCHEMES["system_management"]["subgroup"],
-            "size": NODE_SETTINGS["subgroup"]["size"],
-            "shape": NODE_SETTINGS["subgroup"]["shape"],
-            "title": "SCA/RML Approval Sub-Group"
-        },
-        "Availability & Recovery": {
-            "color": COLOR_SCHEMES["system_management"]["subgroup"],
-            "size": NODE_SETTINGS["subgroup"]["size"],
-            "shape": NODE_SETTINGS["subgroup"]["shape"],
-            "title": "Availability & Recovery Sub-Group"
-        },
-        "Dependencies Management": {
-            "color": COLOR_SCHEMES["system_management"]["subgroup"],
-            "size": NODE_SETTINGS["subgroup"]["size"],
-            "shape": NODE_SETTINGS["subgroup"]["shape"],
-            "title": "Dependencies Management Sub-Group"
-        },
-
-            # Fields for both modules
-        # Agency Management Fields
-        "Agency Name": {
-            "color": COLOR_SCHEMES["agency_management"]["field"],
-            "size": NODE_SETTINGS["field"]["size"],
-            "shape": NODE_SETTINGS["field"]["shape"],
-            "title": "Agency Name field"
-        },
-        "Agency Abbreviation (Short Form)": {
-            "color": COLOR_SCHEMES["agency_management"]["field"],
-            "size": NODE_SETTINGS["field"]["size"],
-            "shape": NODE_SETTINGS["field"]["shape"],
-            "title": "Agency Abbreviation field"
-        },
-        "Agency Operational Status": {
-            "color": COLOR_SCHEMES["agency_management"]["field"],
-            "size": NODE_SETTINGS["field"]["size"],
-            "shape": NODE_SETTINGS["field"]["shape"],
-            "title": "Agency Operational Status field"
-        },
-        "Ministry Family": {
-            "color": COLOR_SCHEMES["agency_management"]["field"],
-            "size": NODE_SETTINGS["field"]["size"],
-            "shape": NODE_SETTINGS["field"]["shape"],
-            "title": "Ministry Family field"
-        },
-        "Full Name": {
-            "color": COLOR_SCHEMES["agency_management"]["field"],
-            "size": NODE_SETTINGS["field"]["size"],
-            "shape": NODE_SETTINGS["field"]["shape"],
-            "title": "Full Name field"
-        },
-        "Designation": {
-            "color": COLOR_SCHEMES["agency_management"]["field"],
-            "size": NODE_SETTINGS["field"]["size"],
-            "shape": NODE_SETTINGS["field"]["shape"],
-            "title": "Designation field"
-        },
-        "Email": {
-            "color": COLOR_SCHEMES["agency_management"]["field"],
-            "size": NODE_SETTINGS["field"]["size"],
-            "shape": NODE_SETTINGS["field"]["shape"],
-            "title": "Email field"
-        },
-
-        # System Management Fields
-        "System ID": {
-            "color": COLOR_SCHEMES["system_management"]["field"],
-            "size": NODE_SETTINGS["field"]["size"],
-            "shape": NODE_SETTINGS["field"]["shape"],
-            "title": "System ID field"
-        },
-        "System Name": {
-            "color": COLOR_SCHEMES["system_management"]["field"],
-            "size": NODE_SETTINGS["field"]["size"],
-            "shape": NODE_SETTINGS["field"]["shape"],
-            "title": "System Name field"
-        },
-        "System Description": {
-            "color": COLOR_SCHEMES["system_management"]["field"],
-            "size": NODE_SETTINGS["field"]["size"],
-            "shape": NODE_SETTINGS["field"]["shape"],
-            "title": "System Description field"
-        },
-        "System Status": {
-            "color": COLOR_SCHEMES["system_management"]["field"],
-            "size": NODE_SETTINGS["field"]["size"],
-            "shape": NODE_SETTINGS["field"]["shape"],
-            "title": "System Status field"
-        },
-        "System Classification": {
-            "color": COLOR_SCHEMES["system_management"]["field"],
-            "size": NODE_SETTINGS["field"]["size"],
-            "shape": NODE_SETTINGS["field"]["shape"],
-            "title": "System Classification field"
-        },
-        "Impact Level": {
-            "color": COLOR_SCHEMES["system_management"]["field"],
-            "size": NODE_SETTINGS["field"]["size"],
-            "shape": NODE_SETTINGS["field"]["shape"],
-            "title": "Impact Level field"
-        },
-        "Risk Level": {
-            "color": COLOR_SCHEMES["system_management"]["field"],
-            "size": NODE_SETTINGS["field"]["size"],
-            "shape": NODE_SETTINGS["field"]["shape"],
-            "title": "Risk Level field"
-        },
-        "SCA Status": {
-            "color": COLOR_SCHEMES["system_management"]["field"],
-            "size": NODE_SETTINGS["field"]["size"],
-            "shape": NODE_SETTINGS["field"]["shape"],
-            "title": "SCA Status field"
-        },
-        "RML Status": {
-            "color": COLOR_SCHEMES["system_management"]["field"],
-            "size": NODE_SETTINGS["field"]["size"],
-            "shape": NODE_SETTINGS["field"]["shape"],
-            "title": "RML Status field"
-        },
-        "System Availability": {
-            "color": COLOR_SCHEMES["system_management"]["field"],
-            "size": NODE_SETTINGS["field"]["size"],
-            "shape": NODE_SETTINGS["field"]["shape"],
-            "title": "System Availability field"
-        },
-        "Recovery Time": {
-            "color": COLOR_SCHEMES["system_management"]["field"],
-            "size": NODE_SETTINGS["field"]["size"],
-            "shape": NODE_SETTINGS["field"]["shape"],
-            "title": "Recovery Time field"
-        },
-        "Dependencies": {
-            "color": COLOR_SCHEMES["system_management"]["field"],
-            "size": NODE_SETTINGS["field"]["size"],
-            "shape": NODE_SETTINGS["field"]["shape"],
-            "title": "Dependencies field"
-        }
-    }
-
-    # Complete edges list
-    edges = [
-        # Root node connections
-        ("DGP 2.0", "System Management", "", ""),
-        ("DGP 2.0", "Agency Management", "", ""),
-    
-        # System Management Module relationships
-        ("System Management", "System Identity & Classification", "", ""),
-        ("System Management", "Criticality & Risk", "", ""),
-        ("System Management", "System Resilience", "", ""),
-        ("System Management", "Hosting and System Dependencies", "", ""),
-
-        # System Identity & Classification relationships
-        ("System Identity & Classification", "Basic Information", "", ""),
-        ("System Identity & Classification", "Organizational Context", "", ""),
-        ("System Identity & Classification", "Classification", "", ""),
-
-        # Criticality & Risk relationships
-        ("Criticality & Risk", "Impact Assessment", "", ""),
-        ("Criticality & Risk", "Risk Profile", "", ""),
-        ("Criticality & Risk", "SCA/RML Approval", "", ""),
-
-        # System Resilience relationships
-        ("System Resilience", "Availability & Recovery", "", ""),
-
-        # Hosting and System Dependencies relationships
-        ("Hosting and System Dependencies", "Dependencies Management", "", ""),
-
-        # Agency Management Module relationships
-        ("Agency Management", "Agency", "", ""),
-        ("Agency Management", "Key Appointment Holder", "", ""),
-
-        # Field relationships for Basic Information
-        ("Basic Information", "System ID", "", ""),
-        ("Basic Information", "System Name", "", ""),
-        ("Basic Information", "System Description", "", ""),
-        ("Basic Information", "System Status", "", ""),
-
-        # Field relationships for Organizational Context
-        ("Organizational Context", "Agency Name", "", ""),
-
-        # Field relationships for Classification
-        ("Classification", "System Classification", "", ""),
-
-        # Field relationships for Impact Assessment
-        ("Impact Assessment", "Impact Level", "", ""),
-
-        # Field relationships for Risk Profile
-        ("Risk Profile", "Risk Level", "", ""),
-
-        # Field relationships for SCA/RML Approval
-        ("SCA/RML Approval", "SCA Status", "", ""),
-        ("SCA/RML Approval", "RML Status", "", ""),
-
-        # Field relationships for Availability & Recovery
-        ("Availability & Recovery", "System Availability", "", ""),
-        ("Availability & Recovery", "Recovery Time", "", ""),
-
-        # Field relationships for Dependencies Management
-        ("Dependencies Management", "Dependencies", "", ""),
-
-        # Field relationships for Agency
-        ("Agency", "Agency Name", "", ""),
-        ("Agency", "Agency Abbreviation (Short Form)", "", ""),
-        ("Agency", "Agency Operational Status", "", ""),
-        ("Agency", "Ministry Family", "", ""),
-
-        # Field relationships for Key Appointment Holder
-        ("Key Appointment Holder", "Full Name", "", ""),
-        ("Key Appointment Holder", "Designation", "", ""),
-        ("Key Appointment Holder", "Email", "", ""),
-
-        # Cross-module relationships
-        #("Agency Name", "Agency", "", ""),
-        #("Dependencies", "System ID", "", "")
-    ]
-
-    # Create NetworkX graph
-    G = nx.DiGraph()
-    for node, attributes in entities.items():
-        node_attrs = {
-            "color": attributes["color"],
-            "size": attributes["size"],
-            "shape": attributes["shape"],
-            "title": attributes["title"],
-            "label": node
-        }
-        G.add_node(node, **node_attrs)
-
-    # Add edges
-    for source, target, label, direction in edges:
-        G.add_edge(source, target, title=label, label=label, arrows=direction)
-
-    # Create PyVis network
-    net = Network(height="900px", width="100%", directed=True)
-    net.from_nx(G)
-
-    # Set hierarchical layout options based on toggle
-    if view_type:
-        net.set_options("""{
-            "layout": {
-                "hierarchical": {
-                    "enabled": true,
-                    "direction": "UD",
-                    "sortMethod": "directed",
-                    "nodeSpacing": 200,
-                    "levelSeparation": 200,
-                    "treeSpacing": 200,
-                    "blockShifting": false,
-                    "edgeMinimization": false,
-                    "parentCentralization": false,
-                    "shakeTowards": "roots"
-                }
-            },
-            "physics": {
-                "enabled": true,
-                "hierarchicalRepulsion": {
-                    "centralGravity": 0.5,
-                    "springLength": 150,
-                    "springConstant": 0.3,
-                    "nodeDistance": 200,
-                    "damping": 0.09,
-                    "avoidOverlap": 1
-                },
-                "stabilization": {
-                    "enabled": true,
-                    "iterations": 2000,
-                    "updateInterval": 100,
-                    "fit": true
-                }
-            },
-            "edges": {
-                "smooth": {
-                    "type": "cubicBezier",
-                    "forceDirection": "vertical",
-                    "roundness": 0.5
-                },
-                "color": {
-                    "inherit": false,
-                    "color": "#2E7D32",
-                    "opacity": 0.8
-                }
-            },
-            "nodes": {
-                "fixed": {
-                    "x": false,
-                    "y": true
-                },
-                "shape": "dot",
-                "size": 25,
-                "font": {
-                    "size": 14
-                }
-            },
-            "interaction": {
-                "dragNodes": true,
-                "dragView": true,
-                "zoomView": true
-            },
-            "groups": {
-                "useDefaultGroups": false
-            }
-        }""")
+    webgl_view = st.toggle("WebGL Renderer (large graphs)", False)
+    compare_view = st.toggle("Highlight Changes in Extended Model", False)
+    static_view = st.toggle("Static Image (no JavaScript)", False)
+
+    # The model (data_model.py) is published alongside the stored versions once per save,
+    # by the watcher when the side server runs; pick the one to show
+    history = shared_history()
+    watcher = shared_watcher()
+    if watcher is None:
+        history.publish_source(MODEL_VERSION)
+    tooltips = shared_tooltips()
+    shared_api()
+    versions = history.versions()
+    version = st.sidebar.selectbox("Model Version", versions, index=versions.index(MODEL_VERSION))
+    title.title(f"⚙️ Entity Relationship Diagram : System Management and Agency Management Data Model ({version})")
+
+    # The systems and their dependencies are offered once instance data has been loaded
+    diagram = "Data Model"
+    if os.path.exists(DATABASE_PATH) and shared_database().has_systems():
+        diagram = st.sidebar.radio("Diagram", ("Data Model", "Systems"))
+        # Derived fields are recomputed in the background as instance data changes, never during a rerun
+        if shared_derived_fields(shared_database()).busy():
+            st.sidebar.caption("Updating derived fields…")
+
+    # Sessions keep only what they are looking at; graphs and pages are shared
+    focus = None
+    collapse_cycles = False
+    partition = None
+    if diagram == "Data Model":
+        G = history.graph(version)
+        groups = [node for node in G if G.out_degree(node)]
+        focus = st.sidebar.selectbox("Focus", [None, *groups], format_func=lambda node: node or "Whole model")
+        filtered = history.filter_view(version)
     else:
-        net.set_options("""{
-            "layout": {
-                "hierarchical": {
-                    "enabled": false
-                }
-            },
-            "physics": {
-                "enabled": true,
-                "barnesHut": {
-                    "gravitationalConstant": -60000,
-                    "centralGravity": 0.1,
-                    "springLength": 200,
-                    "springConstant": 0.08,
-                    "damping": 0.12,
-                    "avoidOverlap": 1
-                }
-            },
-            "edges": {
-                "smooth": {
-                    "type": "curvedCW",
-                    "roundness": 0.2
-                },
-                "color": {
-                    "inherit": false,
-                    "color": "#2E7D32",
-                    "opacity": 0.8
-                }
-            }
-        }""")
+        filtered = shared_instance_view(shared_database())
+        collapse_cycles = st.sidebar.toggle("Collapse Dependency Cycles", False)
+        # One agency's or ministry family's systems, dependencies and holders, precomputed
+        agency_views = shared_agency_views(shared_database())
+        partition = st.sidebar.selectbox(
+            "Agency View",
+            [
+                None,
+                *((False, agency) for agency in agency_views.agencies),
+                *((True, family) for family in agency_views.ministry_families),
+            ],
+            format_func=lambda p: "Whole portfolio" if p is None else f"{p[1]} (Ministry Family)" if p[0] else p[1],
+        )
+        # Governance counters, read from rollups kept current as systems change
+        with st.sidebar.expander("SCA/RML Approvals"):
+            rollups = shared_approval_rollups(shared_database())
+            scope = st.selectbox(
+                "Agency", [None, *rollups.agencies()], format_func=lambda agency: agency or "Whole portfolio",
+                key="approvals agency",
+            )
+            st.dataframe(
+                [{"Stage": stage, "Systems": count} for stage, count in rollups.stages(scope).items()],
+                hide_index=True,
+            )
+            summary = rollups.summary(scope)
+            st.dataframe(
+                [
+                    {"Approver": approver, "Approved": summary.get(f"{approver}: Approved", 0),
+                     "Pending": summary.get(f"{approver}: Pending", 0)}
+                    for approver in APPROVERS
+                ],
+                hide_index=True,
+            )
+        # Exact by email, otherwise by the start of any word of a name or designation
+        with st.sidebar.expander("Key Appointment Holders"):
+            search = st.text_input("Name, designation or email", key="holder search").strip()
+            if search:
+                directory = shared_holder_directory(shared_database())
+                if "@" in search:
+                    holders = [h for h in [directory.by_email(search)] if h]
+                else:
+                    found = directory.search_name(search) + directory.search_designation(search)
+                    holders = list({h["Email"]: h for h in found}.values())
+                st.dataframe(
+                    [
+                        {
+                            "Full Name": holder.get("Full Name"),
+                            "Designation": holder.get("Designation"),
+                            "Email": holder["Email"],
+                            "Systems": ", ".join(directory.accountable_for(holder["Email"])["systems"]),
+                        }
+                        for holder in holders
+                    ],
+                    hide_index=True,
+                )
+
+    # Filters select nodes through masks precomputed once per graph
+    with st.sidebar.expander("Filters"):
+        selections = {
+            facet: st.multiselect(facet, filtered.index.values(facet), key=f"{diagram} {facet}")
+            for facet in filtered.index.facets
+        }
+    view = st.session_state["view"] = ViewState(version, view_type, focus, selections)
 
-    # Save and display the network
+    # Display the network
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.html') as tmp_file:
-            net.save_graph(tmp_file.name)
-            with open(tmp_file.name, 'r', encoding='utf-8') as f:
-                html_content = f.read()
-            
-            fullscreen_html = """
-            <button 
-                style="
-                    position: fixed;
-                    top: 20px;
-                    right: 20px;
-                    z-index: 10000;
-                    padding: 8px 16px;
-                    background-color: #4CAF50;
-                    color: white;
-                    border: none;
-                    border-radius: 4px;
-                    cursor: pointer;
-                    font-family: Arial, sans-serif;
-                    font-size: 14px;
-                "
-                onclick="toggleFullscreen()"
-            >
-                Full Screen
-            </button>
-            <script>
-                function toggleFullscreen() {
-                    let elem = document.documentElement;
-                    if (!document.fullscreenElement) {
-                        if (elem.requestFullscreen) {
-                            elem.requestFullscreen();
-                        } else if (elem.webkitRequestFullscreen) {
-                            elem.webkitRequestFullscreen();
-                        } else if (elem.msRequestFullscreen) {
-                            elem.msRequestFullscreen();
-                        }
-                    } else {
-                        if (document.exitFullscreen) {
-                            document.exitFullscreen();
-                        } else if (document.webkitExitFullscreen) {
-                            document.webkitExitFullscreen();
-                        } else if (document.msExitFullscreen) {
-                            document.msExitFullscreen();
-                        }
-                    }
-                }
-            </script>
-            """
-            
-            modified_html = html_content.replace('</body>', f'{fullscreen_html}</body>')
-            components.html(modified_html, height=900)
-            os.unlink(tmp_file.name)
+        # The portfolio as a DAG of its dependency cycles, each one collapsible node
+        if diagram == "Systems" and collapse_cycles:
+            condensed = shared_condensed_view(shared_database())
+            cycles = condensed.report()
+            st.caption(f"{len(cycles)} dependency cycles · double-click a cycle to open or close it · filters are not applied")
+            if cycles:
+                with st.expander("Dependency Cycles"):
+                    st.dataframe(
+                        [
+                            {
+                                "Cycle": cycle["cycle"],
+                                "Systems": len(cycle["systems"]),
+                                "Dependencies": cycle["dependencies"],
+                                "Example": " → ".join(cycle["example"]),
+                            }
+                            for cycle in cycles
+                        ],
+                        hide_index=True,
+                    )
+            if static_view:
+                st.image(condensed.svg(view.hierarchical))
+            else:
+                components.html(condensed.html(view.hierarchical), height=900)
+        # A precomputed agency or ministry family view, rendered once per layout
+        elif diagram == "Systems" and partition is not None:
+            family, name = partition
+            st.caption("Filters are not applied to agency views")
+            if static_view:
+                st.image(agency_views.svg(name, view.hierarchical, family))
+            else:
+                components.html(agency_views.html(name, view.hierarchical, family), height=900)
+        # Drawn on the GPU from typed arrays, in the layouts cached for the graph
+        elif webgl_view and not static_view and (diagram == "Systems" or not compare_view):
+            within = history.view_graph(view.version, view.focus) if view.focus is not None else None
+            webgl_graph(*view_payload(filtered, view.filters, view.hierarchical, within), height=900)
+        # The portfolio's systems, laid out once and drawn without physics
+        elif diagram == "Systems":
+            if static_view:
+                st.image(filtered.svg(view.filters, view.hierarchical))
+            else:
+                components.html(filtered.html(view.filters, view.hierarchical), height=900)
+        # Show the union with the extended model (test.py), coloured by change, built once per save of it
+        elif compare_view:
+            counts = history.diff(view.version)[0].counts()
+            st.caption(
+                f":green[{counts['added']} added] · :red[{counts['removed']} removed] · "
+                f":orange[{counts['moved']} moved] · :violet[{counts['restyled']} restyled]"
+            )
+            if static_view:
+                st.image(history.diff_svg(view.version, view.hierarchical))
+            else:
+                components.html(history.diff_html(view.version, view.hierarchical), height=900)
+        # Filtered nodes keep their places in the whole model's cached layout
+        elif view.filters:
+            within = history.view_graph(view.version, view.focus)
+            if static_view:
+                st.image(filtered.svg(view.filters, view.hierarchical, within))
+            else:
+                html = filtered.html(view.filters, view.hierarchical, within)
+                if tooltips is not None:
+                    html = tooltips.attach(html, view.version)
+                components.html(html, height=900)
+        # Drawn server-side, for printing and clients that cannot run the vis.js physics
+        elif static_view:
+            st.image(history.svg(view.version, view.hierarchical, view.focus))
+        else:
+            # Serve the prebuilt page (python prebuild.py) while it matches the model
+            html = None
+            if view.focus is None:
+                html = prebuilt_html(view.version, view.hierarchical, history.get(view.version).hash)
+            html = html or history.html(view.version, view.hierarchical, view.focus)
+            # Patch the open page when the model source is saved
+            if watcher is not None and view.version == MODEL_VERSION and view.focus is None:
+                html = watcher.live(html)
+            # Load rich tooltips on hover rather than embedding them
+            if tooltips is not None:
+                html = tooltips.attach(html, view.version)
+            components.html(html, height=900)
     except Exception as e:
         st.error(f"An error occurred while generating the graph: {str(e)}")
@@ -0,0 +1,109 @@
+import ast
+import hashlib
+import json
+import os
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Data model published by the Streamlit app, and the app itself
+MODEL_SOURCE = os.path.join(ROOT, "data_model.py")
+MODEL_VERSION = "V2.2"
+APP_SCRIPT = os.path.join(ROOT, "main.py")
+
+# Extended field set that system and agency instance data is recorded against
+INSTANCE_MODEL_SOURCE = os.path.join(ROOT, "test.py")
+
+MODULES = ("System Management", "Agency Management")
+
+# Names assigned in a model script, evaluated in order since later ones refer to earlier ones
+_MODEL_NAMES = ("NODE_SETTINGS", "COLOR_SCHEMES", "entities", "edges")
+
+
+def load_model(path=MODEL_SOURCE):
+    """Reads the `entities` dictionary and `edges` list from a model script without running it.
+
+    Model scripts (data_model.py, and test.py which defines the extended
+    model inline behind its password check) are not run: the literals are
+    picked out of the parsed source and evaluated with only the styling
+    dictionaries they refer to in scope.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return parse_model(f.read(), path)
+
+
+def source_stamp(path):
+    """Returns what changes when a file is saved (its modification time and size), or None if it is missing."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def parse_model(source, filename="<model>"):
+    """Evaluates the model literals of a script's source, see `load_model`."""
+    namespace = {}
+    for node in ast.walk(ast.parse(source, filename)):
+        if not isinstance(node, ast.Assign) or len(node.targets) != 1:
+            continue
+        target = node.targets[0]
+        if isinstance(target, ast.Name) and target.id in _MODEL_NAMES and target.id not in namespace:
+            expression = compile(ast.Expression(node.value), filename, "eval")
+            namespace[target.id] = eval(expression, {"__builtins__": {}}, namespace)
+
+    missing = [name for name in ("entities", "edges") if name not in namespace]
+    if missing:
+        raise ValueError(f"{filename} does not define {', '.join(missing)}")
+    return namespace["entities"], namespace["edges"]
+
+
+def model_hash(entities, edges):
+    """Returns the SHA-256 of a model's content, the same in every process and for any definition order."""
+    content = json.dumps([entities, sorted(map(list, edges))], sort_keys=True)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def children(edges):
+    """Maps every node to the nodes directly beneath it."""
+    tree = {}
+    for source, target, *_ in edges:
+        tree.setdefault(source, []).append(target)
+    return tree
+
+
+def field_modules(entities, edges):
+    """Maps every field (leaf) node to the modules it sits under."""
+    tree = children(edges)
+    fields = {}
+    for module in MODULES:
+        stack = list(tree.get(module, ()))
+        while stack:
+            node = stack.pop()
+            if node in tree:
+                stack.extend(tree[node])
+            elif node in entities:
+                fields.setdefault(node, set()).add(module)
+    return fields
+
+
+def model_fields(entities, edges, module=None):
+    """Returns the field names of the model in definition order, optionally only those under `module`."""
+    modules = field_modules(entities, edges)
+    return [
+        field for field in entities
+        if field in modules and (module is None or module in modules[field])
+    ]
+
+
+def fields_under(entities, edges, node):
+    """Returns the field names beneath any node of the model, in definition order."""
+    tree = children(edges)
+    found = set()
+    stack = list(tree.get(node, ()))
+    while stack:
+        child = stack.pop()
+        if child in tree:
+            stack.extend(tree[child])
+        else:
+            found.add(child)
+    return [field for field in entities if field in found]
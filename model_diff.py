@@ -0,0 +1,156 @@
+import argparse
+
+import networkx as nx
+
+from graph import build_graph
+from model import INSTANCE_MODEL_SOURCE, MODEL_SOURCE, load_model
+
+STYLE_ATTRIBUTES = ("color", "size", "shape", "title")
+
+CHANGE_COLORS = {
+    "added": "#00C853",
+    "removed": "#D50000",
+    "moved": "#FF6D00",
+    "restyled": "#AA00FF",
+    "unchanged": "#B0BEC5",
+}
+
+
+def fingerprint(entities, edges):
+    """Hashes every node's style and parents and every edge's label.
+
+    Returns `(nodes, edges)` where `nodes` maps a node name to
+    `(style hash, parents hash)` and `edges` maps `(source, target)` to the
+    hash of its label and arrows. Hashes are only comparable within one process.
+    """
+    parents = {}
+    edge_hashes = {}
+    for source, target, label, direction in edges:
+        parents.setdefault(target, []).append(source)
+        edge_hashes[(source, target)] = hash((label, direction))
+    node_hashes = {
+        name: (
+            hash(tuple(attributes.get(a) for a in STYLE_ATTRIBUTES)),
+            hash(frozenset(parents.get(name, ()))),
+        )
+        for name, attributes in entities.items()
+    }
+    return node_hashes, edge_hashes
+
+
+class ModelDiff:
+    """Added, removed, moved and restyled entities between two versions of the data model.
+
+    Nodes are matched by name and edges by (source, target); comparing their
+    hashes keeps the diff linear in the size of the two models.
+    """
+
+    def __init__(self, old, new):
+        self.old_entities, self.old_edges = old
+        self.new_entities, self.new_edges = new
+        old_nodes, old_edges = fingerprint(*old)
+        new_nodes, new_edges = fingerprint(*new)
+
+        self.added = [n for n in new_nodes if n not in old_nodes]
+        self.removed = [n for n in old_nodes if n not in new_nodes]
+        self.moved = {}
+        self.restyled = {}
+        old_parents = _parents(self.old_edges)
+        new_parents = _parents(self.new_edges)
+        for name, (style, parents) in new_nodes.items():
+            if name not in old_nodes:
+                continue
+            old_style, old_parent_hash = old_nodes[name]
+            if parents != old_parent_hash:
+                self.moved[name] = (old_parents.get(name, []), new_parents.get(name, []))
+            if style != old_style:
+                self.restyled[name] = [
+                    a for a in STYLE_ATTRIBUTES
+                    if self.old_entities[name].get(a) != self.new_entities[name].get(a)
+                ]
+
+        self.added_edges = [e for e in new_edges if e not in old_edges]
+        self.removed_edges = [e for e in old_edges if e not in new_edges]
+        self.relabelled_edges = [e for e, h in new_edges.items() if e in old_edges and old_edges[e] != h]
+
+        self._changes = dict.fromkeys(self.restyled, "restyled")
+        self._changes.update(dict.fromkeys(self.moved, "moved"))
+        self._changes.update(dict.fromkeys(self.removed, "removed"))
+        self._changes.update(dict.fromkeys(self.added, "added"))
+
+    @property
+    def changed(self):
+        return bool(
+            self.added or self.removed or self.moved or self.restyled
+            or self.added_edges or self.removed_edges or self.relabelled_edges
+        )
+
+    def node_change(self, name):
+        """Returns the change shown for a node of the union graph."""
+        return self._changes.get(name, "unchanged")
+
+    def counts(self):
+        return {
+            "added": len(self.added),
+            "removed": len(self.removed),
+            "moved": len(self.moved),
+            "restyled": len(self.restyled),
+            "edges added": len(self.added_edges),
+            "edges removed": len(self.removed_edges),
+        }
+
+    def summary(self):
+        """Returns a plain-text report of the changes, one per line."""
+        lines = [f"+ {n}" for n in self.added]
+        lines += [f"- {n}" for n in self.removed]
+        lines += [
+            f"~ {n}: moved from {', '.join(old) or '(root)'} to {', '.join(new) or '(root)'}"
+            for n, (old, new) in self.moved.items()
+        ]
+        lines += [f"* {n}: {', '.join(attrs)} changed" for n, attrs in self.restyled.items()]
+        return "\n".join(lines)
+
+
+def _parents(edges):
+    parents = {}
+    for source, target, *_ in edges:
+        parents.setdefault(target, []).append(source)
+    return parents
+
+
+def diff_graph(diff):
+    """Builds the union of both model versions with every node and edge coloured by its change."""
+    G = build_graph(diff.new_entities, diff.new_edges)
+    added_edges = set(diff.added_edges)
+    removed_edges = set(diff.removed_edges)
+    removed = build_graph(
+        {n: diff.old_entities[n] for n in diff.removed},
+        [e for e in diff.old_edges if (e[0], e[1]) in removed_edges],
+    )
+    G = nx.compose(G, removed)
+
+    for name, attributes in G.nodes(data=True):
+        change = diff.node_change(name)
+        attributes["color"] = CHANGE_COLORS[change]
+        if change == "moved":
+            old, new = diff.moved[name]
+            attributes["title"] = f"{attributes['title']}\nMoved from {', '.join(old) or '(root)'}"
+        elif change != "unchanged":
+            attributes["title"] = f"{attributes['title']}\n{change.title()}"
+    for source, target, attributes in G.edges(data=True):
+        if (source, target) in added_edges:
+            attributes["color"] = CHANGE_COLORS["added"]
+        elif (source, target) in removed_edges:
+            attributes["color"] = CHANGE_COLORS["removed"]
+            attributes["dashes"] = True
+    return G
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="List the changes between two data model scripts")
+    parser.add_argument("old", nargs="?", default=MODEL_SOURCE)
+    parser.add_argument("new", nargs="?", default=INSTANCE_MODEL_SOURCE)
+    args = parser.parse_args()
+    diff = ModelDiff(load_model(args.old), load_model(args.new))
+    print(diff.summary() or "No changes")
+    print(", ".join(f"{count} {kind}" for kind, count in diff.counts().items()))
@@ -0,0 +1,225 @@
+import threading
+
+import networkx as nx
+
+from db import INFERRED
+from graph import render_html
+from static_render import render_svg
+
+# Node colours, matching the field colours of the two modules in the model diagram
+SYSTEM_COLOR = "#43A047"
+EXTERNAL_SYSTEM_COLOR = "#9E9E9E"
+AGENCY_COLOR = "#283593"
+HOLDER_COLOR = "#3949AB"
+
+# Agency and holder nodes are prefixed so they cannot merge with a system of the same ID
+AGENCY_NODE = "agency:"
+HOLDER_NODE = "holder:"
+
+# Instance tables the views are built from
+VIEW_TABLES = ("systems", "dependencies", "key_appointment_holders", "agencies")
+
+
+def _system_attributes(record):
+    system_id = record["System ID"]
+    return {
+        "label": record.get("System Name") or system_id,
+        "title": f"{system_id}\n{record.get('System Status') or ''}".strip(),
+        "color": SYSTEM_COLOR,
+        "size": 15,
+        "kind": "system",
+    }
+
+
+def _external_attributes(system_id, owner):
+    return {
+        "label": system_id,
+        "title": f"{system_id}\n{owner or 'Unknown agency'}",
+        "color": EXTERNAL_SYSTEM_COLOR,
+        "size": 10,
+        "kind": "external",
+    }
+
+
+def portfolio_graph(systems, dependencies):
+    """Builds the frozen dependency graph of every system in the portfolio.
+
+    Dependencies inferred from data-exchange logs (see `inference.py`) are
+    dashed, with their confidence in the title.
+    """
+    graph = nx.DiGraph()
+    for record in systems:
+        graph.add_node(record["System ID"], **_system_attributes(record))
+    for record in dependencies:
+        for system_id in (record["Upstream System"], record["Dependent System"]):
+            if system_id not in graph:
+                graph.add_node(system_id, **_external_attributes(system_id, None))
+        if record.get("Dependency Type") == INFERRED:
+            graph.add_edge(
+                record["Upstream System"],
+                record["Dependent System"],
+                title=f"{INFERRED} (confidence {record.get('confidence') or 0:.0%})",
+                dashes=True,
+                kind="inferred",
+            )
+        else:
+            graph.add_edge(
+                record["Upstream System"],
+                record["Dependent System"],
+                title=record.get("Dependency Type") or "",
+                kind="dependency",
+            )
+    return nx.freeze(graph)
+
+
+class AgencyViews:
+    """Precomputed per-agency and per-ministry-family subgraphs of the instance data.
+
+    Every record is bucketed by agency in a single pass over each table and
+    the subgraphs are built once up front, so opening a view is a dictionary
+    lookup rather than a filter over the whole portfolio. Each agency view
+    holds the agency's systems, every dependency touching them (systems of
+    other agencies at the far end are marked external) and its key
+    appointment holders. Systems and holders without an agency belong to no
+    view. Views are frozen and safe to share between sessions, and their
+    pages are rendered once per layout.
+    """
+
+    def __init__(self, systems, dependencies, holders=(), agencies=()):
+        system_agency = {}
+        self._systems = {}
+        self._dependencies = {}
+        self._holders = {}
+        self._family_agencies = {}
+        self._lock = threading.Lock()
+        self._pages = {}
+
+        for record in agencies:
+            if record.get("Ministry Family") and record.get("Agency Name"):
+                self._family_agencies.setdefault(record["Ministry Family"], set()).add(record["Agency Name"])
+
+        for record in systems:
+            agency = record.get("Agency Name")
+            system_agency[record["System ID"]] = agency
+            if not agency:
+                continue
+            self._systems.setdefault(agency, []).append(record)
+            if record.get("Ministry Family Name"):
+                self._family_agencies.setdefault(record["Ministry Family Name"], set()).add(agency)
+
+        for record in dependencies:
+            owners = {
+                system_agency.get(record["Upstream System"]),
+                system_agency.get(record["Dependent System"]),
+            }
+            for agency in owners - {None, ""}:
+                self._dependencies.setdefault(agency, []).append(record)
+
+        for record in holders:
+            if record.get("Agency Name") and (record.get("Email") or record.get("Full Name")):
+                self._holders.setdefault(record["Agency Name"], []).append(record)
+
+        self._system_agency = system_agency
+        self._views = {agency: self._build(agency) for agency in set(self._systems) | set(self._holders)}
+        self._family_views = {
+            family: nx.freeze(nx.compose_all([self._views[a] for a in members if a in self._views] or [nx.DiGraph()]))
+            for family, members in self._family_agencies.items()
+        }
+
+    @classmethod
+    def from_database(cls, database):
+        """Builds the views from the instance tables of a `db.Database`."""
+        return cls(
+            database.query('SELECT "System ID", "System Name", "System Status", "Agency Name", "Ministry Family Name" FROM systems'),
+            database.query('SELECT * FROM dependencies'),
+            database.query('SELECT * FROM key_appointment_holders'),
+            database.query('SELECT "Agency Name", "Ministry Family" FROM agencies'),
+        )
+
+    def _build(self, agency):
+        graph = nx.DiGraph(agency=agency)
+        node = AGENCY_NODE + agency
+        graph.add_node(node, label=agency, title=f"{agency} Agency", color=AGENCY_COLOR, size=35, kind="agency")
+        for record in self._systems.get(agency, ()):
+            graph.add_node(record["System ID"], **_system_attributes(record))
+            graph.add_edge(node, record["System ID"])
+        for record in self._dependencies.get(agency, ()):
+            for system_id in (record["Upstream System"], record["Dependent System"]):
+                if system_id not in graph:
+                    graph.add_node(system_id, **_external_attributes(system_id, self._system_agency.get(system_id)))
+            graph.add_edge(
+                record["Upstream System"],
+                record["Dependent System"],
+                title=record.get("Dependency Type") or "",
+                kind="dependency",
+            )
+        for record in self._holders.get(agency, ()):
+            holder = HOLDER_NODE + (record.get("Email") or record.get("Full Name"))
+            graph.add_node(
+                holder,
+                label=record.get("Full Name") or record["Email"],
+                title=f"{record.get('Designation') or ''}\n{record.get('Email') or ''}".strip(),
+                color=HOLDER_COLOR,
+                size=12,
+                kind="holder",
+            )
+            graph.add_edge(holder, node)
+        return nx.freeze(graph)
+
+    @property
+    def agencies(self):
+        return sorted(self._views)
+
+    @property
+    def ministry_families(self):
+        return sorted(self._family_views)
+
+    def agency(self, name):
+        """Returns the precomputed subgraph of one agency."""
+        return self._views[name]
+
+    def ministry_family(self, name):
+        """Returns the precomputed subgraph of every agency in one ministry family."""
+        return self._family_views[name]
+
+    def _page(self, key, build):
+        with self._lock:
+            if key in self._pages:
+                return self._pages[key]
+        page = build()
+        with self._lock:
+            return self._pages.setdefault(key, page)
+
+    def _view(self, family, name):
+        return self.ministry_family(name) if family else self.agency(name)
+
+    def html(self, name, hierarchical, family=False):
+        """Returns the page of an agency's view, or of a ministry family's with `family`, in one layout."""
+        return self._page(
+            ("html", family, name, bool(hierarchical)),
+            lambda: render_html(self._view(family, name), hierarchical),
+        )
+
+    def svg(self, name, hierarchical, family=False):
+        return self._page(
+            ("svg", family, name, bool(hierarchical)),
+            lambda: render_svg(self._view(family, name), hierarchical),
+        )
+
+
+_views = {}
+_views_lock = threading.Lock()
+
+
+def shared_agency_views(database, refresh=False):
+    """Returns the process-wide views for a database, rebuilt once any table they hold has changed.
+
+    Changes are seen from every process through `Database.revisions`.
+    """
+    key = database.pool.path
+    with _views_lock:
+        # Read before the data, so a write landing during the build is picked up next time
+        revisions = database.revisions(*VIEW_TABLES)
+        if refresh or key not in _views or _views[key][0] != revisions:
+            _views[key] = (revisions, AgencyViews.from_database(database))
+        return _views[key][1]
@@ -0,0 +1,165 @@
+import argparse
+import collections
+import concurrent.futures
+import hashlib
+import html
+import json
+import os
+import re
+import time
+
+import networkx as nx
+
+from db import DATABASE_PATH, shared_database
+from export import networkx_source, write_json
+from graph import render_html
+from history import shared_history
+from layout import positions
+from model import MODEL_VERSION, MODULES, ROOT, load_model
+from partitions import AgencyViews
+
+SITE_ROOT = os.environ.get("DATA_MODEL_SITE", os.path.join(ROOT, "site"))
+MANIFEST = "manifest.json"
+
+# Layout modes, by the name used in artifact file names
+LAYOUTS = {"hierarchical": True, "free": False}
+
+
+def slug(name):
+    """Returns a file name for a view; dots are kept only between letters or digits, so no slug is "." or ".."."""
+    return re.sub(r"(?:[^A-Za-z0-9.]|(?<![A-Za-z0-9])\.|\.(?![A-Za-z0-9]))+", "-", name).strip("-").lower() or "view"
+
+
+def unique_slugs(names):
+    """Maps each name to its slug; names sharing a slug (e.g. "A&B" and "A B") each get a short hash of the name appended."""
+    slugs = {name: slug(name) for name in names}
+    counts = collections.Counter(slugs.values())
+    return {
+        name: f"{s}-{hashlib.sha1(name.encode('utf-8')).hexdigest()[:8]}" if counts[s] > 1 else s
+        for name, s in slugs.items()
+    }
+
+
+def views(history, agency_views=None):
+    """Yields `(path, title, graph, model hash, version)` for every view to prebuild.
+
+    Each model version gets its whole diagram, whose `version` is given, and
+    one view per module; agency and ministry family partitions of the
+    instance data have no model hash.
+    """
+    versions = unique_slugs(history.versions())
+    for version, version_slug in versions.items():
+        model = history.get(version)
+        G = history.graph(version)
+        yield f"{version_slug}/model", f"{version} data model", G, model.hash, version
+        for module in MODULES:
+            if module in G:
+                subgraph = G.subgraph([module, *nx.descendants(G, module)])
+                yield f"{version_slug}/{slug(module)}", f"{version} {module}", subgraph, model.hash, None
+    if agency_views is not None:
+        for agency, agency_slug in unique_slugs(agency_views.agencies).items():
+            yield f"agencies/{agency_slug}", agency, agency_views.agency(agency), None, None
+        for family, family_slug in unique_slugs(agency_views.ministry_families).items():
+            yield f"ministry-families/{family_slug}", family, agency_views.ministry_family(family), None, None
+
+
+def _build(root, path, G, layout):
+    """Lays out and writes one view in one layout; run in the worker processes."""
+    started = time.perf_counter()
+    hierarchical = LAYOUTS[layout]
+    placed = positions(G, hierarchical)
+    page = render_html(G, hierarchical, placed)
+
+    located = G.copy()
+    for node, (x, y) in placed.items():
+        located.nodes[node].update(x=x, y=y)
+    os.makedirs(os.path.join(root, path), exist_ok=True)
+    with open(os.path.join(root, path, f"{layout}.html"), "w", encoding="utf-8") as f:
+        f.write(page)
+    with open(os.path.join(root, path, f"{layout}.json"), "w", encoding="utf-8") as f:
+        write_json(networkx_source(located), f)
+    return path, layout, len(page), time.perf_counter() - started
+
+
+def _write_index(root, manifest):
+    rows = "\n".join(
+        f'<li>{html.escape(view["title"])}: '
+        + " · ".join(f'<a href="{path}/{layout}.html">{layout}</a>' for layout in view["layouts"])
+        + "</li>"
+        for path, view in manifest["views"].items()
+    )
+    with open(os.path.join(root, "index.html"), "w", encoding="utf-8") as f:
+        f.write(f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>Data Model Views</title></head>\n"
+                f"<body><h1>Data Model Views</h1>\n<ul>\n{rows}\n</ul></body></html>\n")
+
+
+def build_site(root=SITE_ROOT, history=None, agency_views=None, workers=None, log=print):
+    """Renders every view in both layouts into `root`, with a manifest and an index page.
+
+    Views are laid out and rendered in parallel worker processes; the pages
+    have their node positions baked in, so they need no vis.js layout or
+    physics and can be served as they are by the app or any static file server.
+    """
+    history = history or shared_history()
+    manifest = {"built": time.strftime("%Y-%m-%dT%H:%M:%S"), "models": {}, "views": {}}
+    started = time.perf_counter()
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        futures = []
+        for path, title, G, digest, version in views(history, agency_views):
+            if path in manifest["views"]:
+                raise ValueError(f"Views '{manifest['views'][path]['title']}' and '{title}' would both be written to {path}")
+            manifest["views"][path] = {"title": title, "hash": digest, "layouts": {}}
+            if version is not None:
+                manifest["models"][version] = path
+            # Frozen subgraph views are copied so they pickle as plain graphs
+            G = nx.DiGraph(G)
+            futures.extend(pool.submit(_build, root, path, G, layout) for layout in LAYOUTS)
+        for future in concurrent.futures.as_completed(futures):
+            path, layout, size, seconds = future.result()
+            manifest["views"][path]["layouts"][layout] = {"bytes": size, "seconds": round(seconds, 3)}
+            log(f"{path}/{layout}.html: {size} bytes in {seconds:.2f}s")
+
+    with open(os.path.join(root, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    _write_index(root, manifest)
+    log(f"Built {len(futures)} pages in {time.perf_counter() - started:.2f}s")
+    return manifest
+
+
+_manifest = (None, None)
+
+
+def prebuilt_html(version, hierarchical, digest, root=SITE_ROOT):
+    """Returns the prebuilt page of a model version's diagram, or None if it is missing or stale."""
+    global _manifest
+    path = os.path.join(root, MANIFEST)
+    try:
+        stamp = (path, os.stat(path).st_mtime_ns)
+    except OSError:
+        return None
+    if _manifest[0] != stamp:
+        with open(path, encoding="utf-8") as f:
+            _manifest = (stamp, json.load(f))
+
+    view = _manifest[1].get("models", {}).get(version)
+    layout = "hierarchical" if hierarchical else "free"
+    entry = _manifest[1]["views"].get(view)
+    if entry is None or entry["hash"] != digest or layout not in entry["layouts"]:
+        return None
+    with open(os.path.join(root, view, f"{layout}.html"), encoding="utf-8") as f:
+        return f.read()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prebuild every diagram view as static HTML and JSON")
+    parser.add_argument("--output", default=SITE_ROOT)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--no-agencies", action="store_true", help="Skip the agency partitions of the instance data")
+    args = parser.parse_args()
+
+    history = shared_history()
+    history.publish(MODEL_VERSION, *load_model())
+    agency_views = None
+    if not args.no_agencies and os.path.exists(DATABASE_PATH):
+        agency_views = AgencyViews.from_database(shared_database())
+    build_site(args.output, history, agency_views, args.workers)
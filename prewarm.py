@@ -0,0 +1,141 @@
+import logging
+import os
+import sys
+import threading
+import time
+
+from db import DATABASE_PATH, shared_database
+from filters import shared_instance_view
+from history import shared_history
+from model import APP_SCRIPT, MODEL_VERSION
+from server import add_route, shared_server
+from tooltips import shared_tooltips
+
+logger = logging.getLogger(__name__)
+
+
+class Prewarm:
+    """Builds the process-wide caches the first viewer would otherwise wait for.
+
+    Stages run one after another on a background thread and each is timed;
+    a stage that fails is logged and recorded, and the rest still run, since
+    every cache is also built on demand.
+    """
+
+    def __init__(self, history, database_path=DATABASE_PATH):
+        self.history = history
+        self.database_path = database_path
+        self.stages = []
+        self.started = None
+        self.finished = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _stages(self):
+        """Returns the (name, build) pairs to run, in order."""
+        history = self.history
+        view = lambda: history.filter_view(MODEL_VERSION)
+        stages = [
+            # Read once for the watcher too, which publishes the same version as it starts
+            ("model", lambda: history.publish_source(MODEL_VERSION)),
+            ("graph", lambda: history.graph(MODEL_VERSION)),
+            ("filter index", view),
+            ("free layout", lambda: view().positions(False)),
+            ("hierarchical layout", lambda: view().positions(True)),
+            ("default page", lambda: history.html(MODEL_VERSION, False)),
+        ]
+        tooltips = shared_tooltips()
+        if tooltips is not None:
+            root = lambda: next(iter(history.graph(MODEL_VERSION)))
+            stages.append(("tooltip index", lambda: tooltips.lookup(MODEL_VERSION, root())))
+        if os.path.exists(self.database_path) and shared_database(self.database_path).has_systems():
+            systems = lambda: shared_instance_view(shared_database(self.database_path))
+            stages += [
+                ("systems filter index", systems),
+                ("systems free layout", lambda: systems().positions(False)),
+                ("systems hierarchical layout", lambda: systems().positions(True)),
+            ]
+        return stages
+
+    def run(self):
+        self.started = time.time()
+        logger.info("Prewarming caches")
+        for name, build in self._stages():
+            started = time.perf_counter()
+            try:
+                build()
+                error = None
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            seconds = round(time.perf_counter() - started, 3)
+            with self._lock:
+                self.stages.append({"stage": name, "seconds": seconds, "error": error})
+            if error:
+                logger.warning("Prewarm %s failed after %.2fs: %s", name, seconds, error)
+            else:
+                logger.info("Prewarmed %s in %.2fs", name, seconds)
+        self.finished = time.time()
+        logger.info("Prewarm finished in %.2fs", self.finished - self.started)
+
+    def start(self):
+        """Starts the stages on a daemon thread, once."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.run, name="prewarm", daemon=True)
+                self._thread.start()
+        return self
+
+    def wait(self, timeout=None):
+        """Waits for the stages to finish; returns False on timeout or if they were never started."""
+        with self._lock:
+            thread = self._thread
+        if thread is None:
+            return False
+        thread.join(timeout)
+        return self.finished is not None
+
+    def status(self, query=None):
+        """Progress so far: the stages run, their timings and whether it has finished."""
+        with self._lock:
+            stages = list(self.stages)
+        end = self.finished or time.time()
+        return {
+            "running": self.started is not None and self.finished is None,
+            "finished": self.finished is not None,
+            "seconds": round(end - self.started, 3) if self.started else 0.0,
+            "stages": stages,
+        }
+
+
+_prewarm = None
+_prewarm_lock = threading.Lock()
+
+
+def shared_prewarm():
+    """Starts prewarming the first time it is called in a process and returns the process-wide Prewarm.
+
+    Its progress is served as /prewarm from the side server when MODEL_SERVER_PORT is set.
+    """
+    global _prewarm
+    with _prewarm_lock:
+        if _prewarm is None:
+            _prewarm = Prewarm(shared_history())
+            if shared_server() is not None:
+                add_route("/prewarm", _prewarm.status)
+            _prewarm.start()
+        return _prewarm
+
+
+if __name__ == "__main__":
+    # Starts the app with its caches warming from the moment the server process starts;
+    # arguments are passed on to `streamlit run`, e.g. python prewarm.py --server.port 8501
+    from streamlit.web import cli
+
+    # Run as a script this module is __main__; main.py imports it as prewarm, so start
+    # the one the app will find rather than a second copy with its own singleton
+    import prewarm
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    prewarm.shared_prewarm()
+    sys.argv = ["streamlit", "run", APP_SCRIPT, *sys.argv[1:]]
+    sys.exit(cli.main())
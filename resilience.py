@@ -0,0 +1,170 @@
+import networkx as nx
+import numpy as np
+
+RESILIENCE_FIELDS = ("Service Availability", "RTO", "RPO")
+
+
+def availability_fraction(values):
+    """Normalises availability given either as a fraction or as a percentage."""
+    values = np.asarray(values, dtype=np.float64)
+    values = np.where(values > 1, values / 100.0, values)
+    return np.where(np.isnan(values), 1.0, values)
+
+
+def _log_availability(values):
+    """Splits availabilities into their logs and whether they are zero, which has no log."""
+    fraction = availability_fraction(values)
+    zero = fraction <= 0
+    return np.log(np.where(zero, 1.0, fraction)), zero
+
+
+class ResiliencePropagation:
+    """Effective recovery objectives of every system, bounded by its upstream dependencies.
+
+    A system cannot be recovered before the systems it depends on, so its
+    effective RTO/RPO is the worst of its own and every upstream system's, and
+    its compound availability is the product of its own and every distinct
+    upstream system's availability. Circular dependencies are collapsed into
+    one strongly connected component whose members recover together.
+    Availabilities are multiplied as sums of logs, with systems at zero
+    counted apart, since any of them makes the product zero.
+
+    `systems` is a columnar table holding "System ID" and the System
+    Resilience fields; `dependencies` is an iterable of
+    ("Upstream System", "Dependent System") pairs.
+    """
+
+    def __init__(self, systems, dependencies):
+        self.system_ids = list(systems["System ID"])
+        self.index = {system_id: i for i, system_id in enumerate(self.system_ids)}
+        n = len(self.system_ids)
+
+        self.rto = np.asarray(systems.get("RTO", np.full(n, np.nan)), dtype=np.float64)
+        self.rpo = np.asarray(systems.get("RPO", np.full(n, np.nan)), dtype=np.float64)
+        self.log_availability, self.unavailable = _log_availability(
+            systems.get("Service Availability", np.full(n, np.nan))
+        )
+
+        graph = nx.DiGraph()
+        graph.add_nodes_from(range(n))
+        unknown = set()
+        for upstream, dependent in dependencies:
+            if upstream not in self.index or dependent not in self.index:
+                unknown.update(s for s in (upstream, dependent) if s not in self.index)
+                continue
+            graph.add_edge(self.index[upstream], self.index[dependent])
+        if unknown:
+            raise ValueError(f"Dependencies reference unknown systems: {', '.join(map(str, sorted(unknown)))}")
+
+        # Renumber components in topological order so that upstream components
+        # always have lower ids than the components depending on them
+        condensed = nx.condensation(graph)
+        order = {c: k for k, c in enumerate(nx.topological_sort(condensed))}
+        self.component = np.empty(n, dtype=np.int64)
+        for node, c in condensed.graph["mapping"].items():
+            self.component[node] = order[c]
+        k = len(order)
+        self.members = [[] for _ in range(k)]
+        for node in range(n):
+            self.members[self.component[node]].append(node)
+        self.predecessors = [np.empty(0, dtype=np.int64)] * k
+        for c in condensed.nodes:
+            preds = [order[p] for p in condensed.predecessors(c)]
+            self.predecessors[order[c]] = np.array(sorted(preds), dtype=np.int64)
+
+        # Packed bitset of every component's upstream components
+        self.ancestors = np.zeros((k, (k + 7) // 8), dtype=np.uint8)
+        for c in range(k):
+            for p in self.predecessors[c]:
+                self.ancestors[c] |= self.ancestors[p]
+                self.ancestors[c, p >> 3] |= 0x80 >> (p & 7)
+
+        self.component_rto = np.full(k, np.nan)
+        self.component_rpo = np.full(k, np.nan)
+        self.component_log_availability = np.zeros(k)
+        self.component_unavailable = np.zeros(k, dtype=np.int64)
+        for c in range(k):
+            self._aggregate_component(c)
+
+        self.effective_rto = np.full(k, np.nan)
+        self.effective_rpo = np.full(k, np.nan)
+        self.rto_bound_by = np.zeros(k, dtype=np.int64)
+        self._propagate(range(k))
+
+        # Compound availability sums log-availability over the distinct
+        # upstream components, so shared ancestors are only counted once
+        self.effective_log_availability = self.component_log_availability.copy()
+        self.effective_unavailable = self.component_unavailable.copy()
+        for start in range(0, k, 1024):
+            bits = np.unpackbits(self.ancestors[start:start + 1024], axis=1, count=k)
+            self.effective_log_availability[start:start + 1024] += bits @ self.component_log_availability
+            self.effective_unavailable[start:start + 1024] += bits @ self.component_unavailable
+
+    def _aggregate_component(self, c):
+        members = self.members[c]
+        self.component_rto[c] = np.fmax.reduce(self.rto[members])
+        self.component_rpo[c] = np.fmax.reduce(self.rpo[members])
+        self.component_log_availability[c] = self.log_availability[members].sum()
+        self.component_unavailable[c] = self.unavailable[members].sum()
+
+    def _propagate(self, components):
+        """Recomputes effective RTO/RPO for `components`, which must be in topological order."""
+        for c in components:
+            preds = self.predecessors[c]
+            members = self.members[c]
+            rto, rpo = self.component_rto[c], self.component_rpo[c]
+            bound_by = members[0] if np.isnan(rto) else members[int(np.nanargmax(self.rto[members]))]
+            if len(preds):
+                upstream_rto = self.effective_rto[preds]
+                if not np.all(np.isnan(upstream_rto)):
+                    worst = int(np.nanargmax(upstream_rto))
+                    if np.isnan(rto) or upstream_rto[worst] > rto:
+                        rto = upstream_rto[worst]
+                        bound_by = self.rto_bound_by[preds[worst]]
+                rpo = np.fmax(rpo, np.fmax.reduce(self.effective_rpo[preds]))
+            self.effective_rto[c] = rto
+            self.effective_rpo[c] = rpo
+            self.rto_bound_by[c] = bound_by
+
+    def _descendants(self, c):
+        """Returns `c` and every component downstream of it, in topological order."""
+        column = (self.ancestors[:, c >> 3] & (0x80 >> (c & 7))).astype(bool)
+        column[c] = True
+        return np.flatnonzero(column)
+
+    def update(self, system_id, values):
+        """Applies new System Resilience values for one system and recomputes only what depends on it.
+
+        Returns the ids of the systems whose effective values were recomputed.
+        """
+        i = self.index[system_id]
+        c = self.component[i]
+        if "RTO" in values:
+            self.rto[i] = values["RTO"]
+        if "RPO" in values:
+            self.rpo[i] = values["RPO"]
+        if "Service Availability" in values:
+            log, zero = _log_availability([values["Service Availability"]])
+            self.log_availability[i], self.unavailable[i] = log[0], zero[0]
+
+        previous = self.component_log_availability[c], self.component_unavailable[c]
+        self._aggregate_component(c)
+        affected = self._descendants(c)
+        self.effective_log_availability[affected] += self.component_log_availability[c] - previous[0]
+        self.effective_unavailable[affected] += self.component_unavailable[c] - previous[1]
+        self._propagate(affected)
+        return [self.system_ids[node] for a in affected for node in self.members[a]]
+
+    def results(self):
+        """Returns the effective resilience columns for every system, aligned with "System ID"."""
+        effective_rto = self.effective_rto[self.component]
+        return {
+            "System ID": self.system_ids,
+            "Effective RTO": effective_rto,
+            "Effective RPO": self.effective_rpo[self.component],
+            "Compound Availability": np.where(
+                self.effective_unavailable[self.component] > 0, 0.0, np.exp(self.effective_log_availability[self.component])
+            ),
+            "RTO Unachievable": effective_rto > self.rto,
+            "RTO Bound By": [self.system_ids[b] for b in self.rto_bound_by[self.component]],
+        }
@@ -0,0 +1,195 @@
+import datetime
+
+import numpy as np
+
+# Impact dimensions of the "Criticality & Risk" submodule
+IMPACT_DIMENSIONS = (
+    "Economy",
+    "Public Health and Safety",
+    "National Security",
+    "Social Preparedness",
+    "Public Service",
+)
+
+# Ordinal impact rating scale, lowest first
+IMPACT_RATINGS = ("None", "Low", "Medium", "High", "Very High")
+
+CRITICALITY_LABELS = ("Low", "Medium", "High", "Very High")
+
+ALIGNMENT_LABELS = ("Aligned", "Above Computed", "Below Computed", "Not Proposed")
+ALIGNED, ABOVE, BELOW, NOT_PROPOSED = range(len(ALIGNMENT_LABELS))
+
+# Code given to unrecognised labels when they are masked rather than raised
+INVALID_CODE = -2
+
+
+class ScoringMatrices:
+    """Scoring methodology used to derive System Criticality and Computed RML.
+
+    `rating_scores` is a (dimension x rating) matrix giving the points a rating
+    earns in each impact dimension. The summed points are banded into
+    `CRITICALITY_LABELS` by `criticality_thresholds`, and `rml_matrix`
+    (criticality band x highest single rating) gives the Computed RML, so one
+    severe dimension can escalate a system whose total score is low.
+    """
+
+    def __init__(self, rating_scores=None, criticality_thresholds=None, rml_matrix=None):
+        if rating_scores is None:
+            rating_scores = np.tile(np.arange(len(IMPACT_RATINGS)), (len(IMPACT_DIMENSIONS), 1))
+        if criticality_thresholds is None:
+            criticality_thresholds = (5, 10, 15)
+        if rml_matrix is None:
+            rml_matrix = (
+                (1, 1, 1, 2, 3),
+                (2, 2, 2, 2, 3),
+                (3, 3, 3, 3, 4),
+                (4, 4, 4, 4, 4),
+            )
+
+        self.rating_scores = np.asarray(rating_scores, dtype=np.float64)
+        self.criticality_thresholds = np.asarray(criticality_thresholds, dtype=np.float64)
+        self.rml_matrix = np.asarray(rml_matrix, dtype=np.int8)
+
+        if self.rating_scores.shape != (len(IMPACT_DIMENSIONS), len(IMPACT_RATINGS)):
+            raise ValueError(
+                f"rating_scores must be {len(IMPACT_DIMENSIONS)}x{len(IMPACT_RATINGS)}, "
+                f"got {self.rating_scores.shape}"
+            )
+        if self.criticality_thresholds.shape != (len(CRITICALITY_LABELS) - 1,):
+            raise ValueError(
+                f"criticality_thresholds needs {len(CRITICALITY_LABELS) - 1} values, "
+                f"got {self.criticality_thresholds.size}"
+            )
+        if np.any(np.diff(self.criticality_thresholds) <= 0):
+            raise ValueError("criticality_thresholds must be strictly increasing")
+        if self.rml_matrix.shape != (len(CRITICALITY_LABELS), len(IMPACT_RATINGS)):
+            raise ValueError(
+                f"rml_matrix must be {len(CRITICALITY_LABELS)}x{len(IMPACT_RATINGS)}, "
+                f"got {self.rml_matrix.shape}"
+            )
+
+    @classmethod
+    def from_weights(cls, weights, **kwargs):
+        """Builds the rating matrix by scaling the ordinal scale per dimension."""
+        weights = np.array([weights.get(dim, 1.0) for dim in IMPACT_DIMENSIONS], dtype=np.float64)
+        rating_scores = np.outer(weights, np.arange(len(IMPACT_RATINGS)))
+        return cls(rating_scores=rating_scores, **kwargs)
+
+
+def _encode(values, lookup, column, invalid=None):
+    """Maps a column of labels to integer codes, resolving each distinct label once.
+
+    Unrecognised labels raise ValueError, or get the code `invalid` if one is given.
+    """
+    values = np.asarray(values)
+    if values.dtype.kind in "iu":
+        return values.astype(np.int16)
+    if values.dtype.kind == "f":
+        # Codes read back as floats (SQLite, Parquet): whole numbers are codes, NaN is unset
+        uniques, inverse = np.unique(values, return_inverse=True)
+        labels = ["" if np.isnan(u) else int(u) if u.is_integer() else str(u) for u in uniques.tolist()]
+    else:
+        labels, inverse = np.unique(values.astype(object).astype(str), return_inverse=True)
+    codes = np.empty(len(labels), dtype=np.int16)
+    unknown = []
+    for i, label in enumerate(labels):
+        code = label if isinstance(label, int) else lookup(label)
+        if code is None:
+            unknown.append(label)
+            code = invalid
+        if code is not None:
+            codes[i] = code
+    if unknown and invalid is None:
+        raise ValueError(f"Unrecognised values in '{column}': {', '.join(unknown)}")
+    return codes[inverse]
+
+
+def _rating_code(label):
+    if label in ("", "None", "nan"):
+        return 0
+    if label in IMPACT_RATINGS:
+        return IMPACT_RATINGS.index(label)
+    if label.isdigit() and int(label) < len(IMPACT_RATINGS):
+        return int(label)
+    return None
+
+
+def _rml_code(label):
+    if label in ("", "None", "nan"):
+        return -1
+    label = label.upper().removeprefix("RML").strip()
+    if label.isdigit():
+        return int(label)
+    return None
+
+
+def encode_ratings(table, invalid=None):
+    """Returns an (n x dimension) int8 matrix of impact rating codes from a columnar table."""
+    ratings = np.column_stack(
+        [_encode(table[dim], _rating_code, dim, invalid) for dim in IMPACT_DIMENSIONS]
+    )
+    checked = ratings if invalid is None else ratings[ratings != invalid]
+    if checked.size and (checked.min() < 0 or checked.max() >= len(IMPACT_RATINGS)):
+        raise ValueError(f"Impact rating codes must be between 0 and {len(IMPACT_RATINGS) - 1}")
+    return ratings.astype(np.int8)
+
+
+def encode_rml(values, column="Computed RML", invalid=None):
+    """Returns the RML levels of a column of "RML 3" or "3" labels as integers, -1 where unset."""
+    return _encode(values, _rml_code, column, invalid)
+
+
+def rml_alignment(computed, proposed):
+    """Labels how each proposed RML level compares with the computed one; unset levels are -1."""
+    alignment = np.select(
+        [proposed < 0, proposed == computed, proposed > computed],
+        [NOT_PROPOSED, ALIGNED, ABOVE],
+        default=BELOW,
+    )
+    return np.asarray(ALIGNMENT_LABELS, dtype=object)[alignment]
+
+
+def compute_rml(table, scoring=None, as_of=None, errors="raise"):
+    """Computes the derived criticality and RML columns for every system in one pass.
+
+    `table` maps field names to equal-length columns and must hold the impact
+    dimensions; "Agency Proposed RML" is optional. Returns a dict of new
+    columns keyed by field name. An unrecognised rating or RML raises
+    ValueError, unless `errors` is "mask": then the systems holding one get
+    None in every column and True in an extra "Invalid" column.
+    """
+    if errors not in ("raise", "mask"):
+        raise ValueError(f"errors must be 'raise' or 'mask', got {errors!r}")
+    invalid = INVALID_CODE if errors == "mask" else None
+    scoring = scoring or ScoringMatrices()
+    ratings = encode_ratings(table, invalid)
+    n = ratings.shape[0]
+    masked = (ratings == INVALID_CODE).any(axis=1) if invalid is not None else np.zeros(n, dtype=bool)
+    ratings[masked] = 0
+
+    scores = scoring.rating_scores[np.arange(len(IMPACT_DIMENSIONS)), ratings].sum(axis=1)
+    band = np.searchsorted(scoring.criticality_thresholds, scores, side="right")
+    computed = scoring.rml_matrix[band, ratings.max(axis=1)]
+
+    if "Agency Proposed RML" in table:
+        proposed = encode_rml(table["Agency Proposed RML"], "Agency Proposed RML", invalid)
+        masked |= proposed == INVALID_CODE
+    else:
+        proposed = np.full(n, -1, dtype=np.int16)
+
+    as_of = np.datetime64(as_of or datetime.date.today(), "D")
+    results = {
+        "Criticality Score": scores,
+        "System Criticality": np.asarray(CRITICALITY_LABELS, dtype=object)[band],
+        "Computed RML": computed,
+        "Computed RML Date": np.full(n, as_of),
+        "RML Alignment": rml_alignment(computed, proposed),
+    }
+    if invalid is None:
+        return results
+    for field, column in results.items():
+        column = column.astype(object)
+        column[masked] = None
+        results[field] = column
+    results["Invalid"] = masked
+    return results
@@ -0,0 +1,156 @@
+import gzip
+import hmac
+import http.server
+import json
+import logging
+import os
+import secrets
+import threading
+import urllib.parse
+
+logger = logging.getLogger(__name__)
+
+# Port of the side server the embedded pages call back to; off unless it is set
+SERVER_PORT = os.environ.get("MODEL_SERVER_PORT")
+# Address of the side server as seen from viewers' browsers
+SERVER_URL = os.environ.get("MODEL_SERVER_URL") or f"http://localhost:{SERVER_PORT}"
+LOOPBACK_HOSTS = ("localhost", "127.0.0.1", "::1")
+# Interface it listens on: loopback while SERVER_URL is a loopback address, every
+# interface otherwise, since viewers' browsers elsewhere must reach it
+SERVER_HOST = os.environ.get("MODEL_SERVER_HOST") or (
+    "127.0.0.1" if urllib.parse.urlsplit(SERVER_URL).hostname in LOOPBACK_HOSTS else "0.0.0.0"
+)
+# Every request must carry this token, as ?token= or "Authorization: Bearer"; it is
+# only injected into pages served behind the app's password. Random per process unless set.
+# Pages send it as ?token=, so it appears in the access logs of any proxy in front of
+# the server: serve it over HTTPS, keep those logs private and rotate it by restarting.
+SERVER_TOKEN = os.environ.get("MODEL_SERVER_TOKEN") or secrets.token_urlsafe(32)
+
+# Smaller responses are sent uncompressed even to clients accepting gzip
+GZIP_MIN_BYTES = 1024
+
+_routes = {}
+
+
+def add_route(path, handler, etag=None):
+    """Serves GET `path` with `handler(query)`, which returns a JSON-serialisable value.
+
+    `query` maps each query parameter to its first value. Handlers raise
+    KeyError for something that does not exist and ValueError for a bad request.
+    `etag(query)`, when given, returns a strong validator of the response
+    without building it: requests whose If-None-Match carries it get a 304
+    and the handler is not called.
+    """
+    _routes[path] = (handler, etag)
+
+
+def client_url(path):
+    """The URL pages call `path` at, token included; further query parameters are appended with "&"."""
+    return f"{SERVER_URL}{path}?token={urllib.parse.quote(SERVER_TOKEN)}"
+
+
+def _authorised(token):
+    return hmac.compare_digest(token.encode("utf-8"), SERVER_TOKEN.encode("utf-8"))
+
+
+def _matching(if_none_match, tag):
+    """Returns the entity tag an If-None-Match header holds for `tag`, in whichever content encoding, or None.
+
+    The client has the representation it names, and would be sent the
+    same one again, so that is the validator a 304 repeats.
+    """
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip().removeprefix("W/").strip('"')
+        if candidate == "*":
+            return tag
+        if candidate in (tag, f"{tag}-gzip"):
+            return candidate
+    return None
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        if url.path not in _routes:
+            self.send_error(404)
+            return
+        handler, etag = _routes[url.path]
+        query = {name: values[0] for name, values in urllib.parse.parse_qs(url.query).items()}
+        token = query.pop("token", None) or self.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        if not _authorised(token):
+            self.send_error(401)
+            return
+        try:
+            tag = etag(query) if etag else None
+            matched = _matching(self.headers.get("If-None-Match", ""), tag) if tag is not None else None
+            if matched is not None:
+                self.send_response(304)
+                self.send_header("ETag", f'"{matched}"')
+                self._send_common_headers(tag)
+                self.end_headers()
+                return
+            value = handler(query)
+        except KeyError as e:
+            self.send_error(404, f"Not found: {e}")
+            return
+        except ValueError as e:
+            self.send_error(400, str(e))
+            return
+
+        body = json.dumps(value).encode("utf-8")
+        compressed = len(body) >= GZIP_MIN_BYTES and "gzip" in self.headers.get("Accept-Encoding", "")
+        if compressed:
+            body = gzip.compress(body, compresslevel=6)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if compressed:
+            self.send_header("Content-Encoding", "gzip")
+        if tag is not None:
+            # Each encoding of a response is a different representation for a strong validator
+            self.send_header("ETag", f'"{tag}-gzip"' if compressed else f'"{tag}"')
+        self._send_common_headers(tag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_common_headers(self, tag):
+        # Validated responses may be cached but are checked on every use
+        self.send_header("Cache-Control", "no-cache" if tag is not None else "no-store")
+        self.send_header("Vary", "Accept-Encoding")
+        # Pages are embedded by Streamlit, so they call from another origin
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Access-Control-Expose-Headers", "ETag")
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+
+def serve(port, background=True, host=SERVER_HOST):
+    """Serves the registered routes, from a background thread unless `background` is false."""
+    if host in LOOPBACK_HOSTS and urllib.parse.urlsplit(SERVER_URL).hostname not in LOOPBACK_HOSTS:
+        logger.warning(
+            "Listening on %s only, but pages call %s: viewers on other machines get no tooltips or live "
+            "updates unless a proxy on this machine forwards to port %d", host, SERVER_URL, port,
+        )
+    server = http.server.ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    if background:
+        threading.Thread(target=server.serve_forever, name="model-server", daemon=True).start()
+    else:
+        server.serve_forever()
+    return server
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def shared_server():
+    """Returns the process-wide side server, or None unless MODEL_SERVER_PORT is set."""
+    global _server
+    if not SERVER_PORT:
+        return None
+    with _server_lock:
+        if _server is None:
+            _server = serve(int(SERVER_PORT))
+        return _server
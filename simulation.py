@@ -0,0 +1,205 @@
+import concurrent.futures
+import os
+from multiprocessing import shared_memory
+
+import networkx as nx
+import numpy as np
+
+from resilience import availability_fraction
+
+LOW_RISK_COLOR = "#43A047"
+HIGH_RISK_COLOR = "#C62828"
+
+# Arrays attached from shared memory in each worker process
+_shared = {}
+_shared_blocks = []
+
+
+def _slots(targets):
+    """Ranks each entry among the entries sharing its target; `targets` must be sorted."""
+    starts = np.flatnonzero(np.r_[True, targets[1:] != targets[:-1]])
+    return np.arange(len(targets)) - np.repeat(starts, np.diff(np.r_[starts, len(targets)]))
+
+
+def _chunks(src, dst, key):
+    """Orders (src, dst) pairs by `key` and returns them with the bounds of each key run."""
+    order = np.argsort(key, kind="stable")
+    key = key[order]
+    bounds = np.flatnonzero(np.r_[True, key[1:] != key[:-1], True]) if len(key) else np.zeros(1, np.int64)
+    return src[order], dst[order], bounds
+
+
+def _outage_structure(systems, dependencies):
+    """Builds the integer-indexed arrays the sampler walks.
+
+    Systems in a circular dependency are collapsed into one component: if any
+    member is down, all of them are. Component dependency edges are split
+    into chunks by the level of their dependent component and the edge's rank
+    among that component's upstream edges, so every chunk has distinct
+    targets and can be applied as one vectorised row-wise maximum.
+    """
+    system_ids = list(systems["System ID"])
+    index = {system_id: i for i, system_id in enumerate(system_ids)}
+    n = len(system_ids)
+
+    graph = nx.DiGraph()
+    graph.add_nodes_from(range(n))
+    graph.add_edges_from(
+        (index[upstream], index[dependent])
+        for upstream, dependent in dependencies
+        if upstream in index and dependent in index
+    )
+    condensed = nx.condensation(graph)
+    order = {c: k for k, c in enumerate(nx.topological_sort(condensed))}
+    component = np.empty(n, dtype=np.int64)
+    for node, c in condensed.graph["mapping"].items():
+        component[node] = order[c]
+
+    level = np.zeros(len(order), dtype=np.int64)
+    edges = sorted((order[v], order[u]) for u, v in condensed.edges)
+    for v, u in edges:
+        level[v] = max(level[v], level[u] + 1)
+    edges = np.array(edges, dtype=np.int64).reshape(-1, 2)
+    edge_dst, edge_src = edges[:, 0], edges[:, 1]
+    slot = _slots(edge_dst)
+    edge_src, edge_dst, edge_bounds = _chunks(
+        edge_src, edge_dst, level[edge_dst] * (slot.max(initial=0) + 1) + slot
+    )
+
+    # The first member of each component seeds its row; the rest are folded in by rank
+    members = np.argsort(component, kind="stable")
+    member_slot = _slots(component[members])
+    first_members = members[member_slot == 0]
+    rest = member_slot > 0
+    member_src, member_dst, member_bounds = _chunks(
+        members[rest], component[members][rest], member_slot[rest]
+    )
+
+    rto = np.asarray(systems.get("RTO", np.full(n, np.nan)), dtype=np.float64)
+    availability = availability_fraction(systems.get("Service Availability", np.full(n, np.nan)))
+    return system_ids, {
+        "failure_probability": 1.0 - availability,
+        "mean_duration": np.where(np.isnan(rto), 1.0, rto),
+        "component": component,
+        "first_members": first_members,
+        "member_src": member_src,
+        "member_dst": member_dst,
+        "member_bounds": member_bounds,
+        "edge_src": edge_src,
+        "edge_dst": edge_dst,
+        "edge_bounds": edge_bounds,
+    }
+
+
+def _attach(layout):
+    """Process pool initializer mapping the parent's shared arrays into this worker."""
+    for name, (block_name, shape, dtype) in layout.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        _shared_blocks.append(block)
+        _shared[name] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+
+def _fold(target, source, src, dst, bounds):
+    """Raises each `target[dst]` row to at least `source[src]`, one chunk of distinct targets at a time."""
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        rows = dst[start:stop]
+        target[rows] = np.maximum(target[rows], source[src[start:stop]])
+
+
+def _sample_batch(seed, size, arrays=None):
+    """Samples `size` failure scenarios and returns per-system down counts and duration sums."""
+    a = arrays if arrays is not None else _shared
+    rng = np.random.default_rng(seed)
+    n = len(a["component"])
+
+    # Scenario arrays are system-major so each dependency level gathers contiguous rows
+    failed = rng.random((n, size)) < a["failure_probability"][:, None]
+    duration = np.zeros((n, size))
+    rows, cols = np.nonzero(failed)
+    duration[rows, cols] = rng.exponential(1.0, len(rows)) * a["mean_duration"][rows]
+    component_duration = duration[a["first_members"]]
+    _fold(component_duration, duration, a["member_src"], a["member_dst"], a["member_bounds"])
+    _fold(component_duration, component_duration, a["edge_src"], a["edge_dst"], a["edge_bounds"])
+
+    duration = component_duration[a["component"]]
+    down = duration > 0
+    return down.sum(axis=1), duration.sum(axis=1), (down & ~failed).sum(axis=1)
+
+
+def simulate_outages(systems, dependencies, scenarios=100_000, batch_size=256, workers=None, seed=0):
+    """Estimates per-system outage probability and duration by Monte Carlo sampling.
+
+    In each scenario every system fails independently with probability
+    1 - "Service Availability" for an exponentially distributed time with mean
+    "RTO" (1 hour when unset), and the outage spreads from "Upstream System"
+    to "Dependent System". Batches are sampled across a process pool that
+    reads the dependency arrays from shared memory; every batch draws from
+    its own child of `seed`, so results do not depend on the worker count.
+    """
+    system_ids, arrays = _outage_structure(systems, dependencies)
+    n = len(system_ids)
+    sizes = [batch_size] * (scenarios // batch_size)
+    if scenarios % batch_size:
+        sizes.append(scenarios % batch_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    workers = workers or os.cpu_count() or 1
+
+    down = np.zeros(n, dtype=np.int64)
+    total_duration = np.zeros(n)
+    induced = np.zeros(n, dtype=np.int64)
+
+    if workers == 1 or len(sizes) == 1:
+        results = (_sample_batch(s, size, arrays) for s, size in zip(seeds, sizes))
+        for batch_down, batch_duration, batch_induced in results:
+            down += batch_down
+            total_duration += batch_duration
+            induced += batch_induced
+    else:
+        blocks = []
+        try:
+            layout = {}
+            for name, array in arrays.items():
+                block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+                blocks.append(block)
+                np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+                layout[name] = (block.name, array.shape, array.dtype.str)
+            with concurrent.futures.ProcessPoolExecutor(
+                max_workers=workers, initializer=_attach, initargs=(layout,)
+            ) as pool:
+                for batch_down, batch_duration, batch_induced in pool.map(_sample_batch, seeds, sizes):
+                    down += batch_down
+                    total_duration += batch_duration
+                    induced += batch_induced
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+    expected_downtime = total_duration / max(scenarios, 1)
+    peak = expected_downtime.max() if n else 0.0
+    return {
+        "System ID": system_ids,
+        "Outage Probability": down / max(scenarios, 1),
+        "Induced Outage Probability": induced / max(scenarios, 1),
+        "Expected Outage Duration": np.divide(total_duration, down, out=np.zeros(n), where=down > 0),
+        "Risk Score": expected_downtime / peak if peak > 0 else np.zeros(n),
+    }
+
+
+def risk_color(score):
+    """Interpolates between the low and high risk colours for a score in [0, 1]."""
+    score = min(max(float(score), 0.0), 1.0)
+    low = [int(LOW_RISK_COLOR[i:i + 2], 16) for i in (1, 3, 5)]
+    high = [int(HIGH_RISK_COLOR[i:i + 2], 16) for i in (1, 3, 5)]
+    return "#" + "".join(f"{round(l + (h - l) * score):02X}" for l, h in zip(low, high))
+
+
+def apply_risk_colors(graph, results):
+    """Colours the system nodes of `graph` by their simulated risk score."""
+    for system_id, score, probability in zip(
+        results["System ID"], results["Risk Score"], results["Outage Probability"]
+    ):
+        if system_id in graph:
+            node = graph.nodes[system_id]
+            node["color"] = risk_color(score)
+            node["title"] = f"{node.get('title', system_id)}\nOutage probability: {probability:.2%}\nRisk score: {score:.2f}"
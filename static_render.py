@@ -0,0 +1,152 @@
+import argparse
+import json
+import math
+from xml.sax.saxutils import escape
+
+from graph import FREE_OPTIONS, HIERARCHICAL_OPTIONS
+from layout import positions as layout_positions
+
+try:
+    import cairosvg
+except ImportError:  # PNG output is optional
+    cairosvg = None
+
+FONT_SIZE = 14
+MARGIN = 80
+ARROW_SIZE = 10
+
+
+def _edge_style(hierarchical):
+    color = json.loads(HIERARCHICAL_OPTIONS if hierarchical else FREE_OPTIONS)["edges"]["color"]
+    return color["color"], color["opacity"]
+
+
+def _node_shape(shape, x, y, r, color):
+    fill = f'fill="{color}"'
+    if shape in ("box", "square"):
+        return f'<rect x="{x - r:.1f}" y="{y - r:.1f}" width="{2 * r:.1f}" height="{2 * r:.1f}" {fill}/>'
+    if shape == "diamond":
+        points = f"{x:.1f},{y - r:.1f} {x + r:.1f},{y:.1f} {x:.1f},{y + r:.1f} {x - r:.1f},{y:.1f}"
+        return f'<polygon points="{points}" {fill}/>'
+    if shape == "triangle":
+        points = f"{x:.1f},{y - r:.1f} {x + r:.1f},{y + r * 0.7:.1f} {x - r:.1f},{y + r * 0.7:.1f}"
+        return f'<polygon points="{points}" {fill}/>'
+    return f'<circle cx="{x:.1f}" cy="{y:.1f}" r="{r:.1f}" {fill}/>'
+
+
+def _edge_path(start, end, radius, hierarchical):
+    """Returns the SVG path of an edge, ending at the target's outline, and its label position.
+
+    Hierarchical edges are vertical cubic Béziers and free ones clockwise
+    curves, as vis.js draws them in the two layouts.
+    """
+    (x1, y1), (x2, y2) = start, end
+    if hierarchical:
+        middle = (y1 + y2) / 2
+        tangent = (0.0, 1.0 if y2 >= y1 else -1.0)
+        controls = f"C {x1:.1f},{middle:.1f} {x2:.1f},{middle:.1f}"
+        label = ((x1 + x2) / 2, middle)
+    else:
+        cx = (x1 + x2) / 2 + 0.2 * (y2 - y1)
+        cy = (y1 + y2) / 2 - 0.2 * (x2 - x1)
+        length = math.hypot(x2 - cx, y2 - cy) or 1.0
+        tangent = ((x2 - cx) / length, (y2 - cy) / length)
+        controls = f"Q {cx:.1f},{cy:.1f}"
+        label = ((x1 + 2 * cx + x2) / 4, (y1 + 2 * cy + y2) / 4)
+    x2 -= tangent[0] * radius
+    y2 -= tangent[1] * radius
+    return f"M {x1:.1f},{y1:.1f} {controls} {x2:.1f},{y2:.1f}", label
+
+
+def render_svg(G, hierarchical, positions=None):
+    """Draws a graph to a standalone SVG with the node styling of the interactive diagram.
+
+    Nodes are placed at `positions` (which may cover a larger graph G is
+    part of), or by `layout.positions` for the layout mode; titles become
+    native SVG tooltips, so the image needs no JavaScript to view.
+    """
+    placed = {n: positions[n] for n in G} if positions is not None else layout_positions(G, hierarchical)
+    if not placed:
+        return '<svg xmlns="http://www.w3.org/2000/svg" width="0" height="0"/>'
+    edge_color, edge_opacity = _edge_style(hierarchical)
+    sizes = {node: attributes.get("size", 10) for node, attributes in G.nodes(data=True)}
+    left = min(x - sizes[n] for n, (x, _) in placed.items()) - MARGIN
+    top = min(y - sizes[n] for n, (_, y) in placed.items()) - MARGIN
+    right = max(x + sizes[n] for n, (x, _) in placed.items()) + MARGIN
+    bottom = max(y + sizes[n] for n, (_, y) in placed.items()) + MARGIN + FONT_SIZE
+    width, height = right - left, bottom - top
+
+    markers = {}
+    edges = []
+    for source, target, attributes in G.edges(data=True):
+        path, (lx, ly) = _edge_path(placed[source], placed[target], sizes[target], hierarchical)
+        stroke = attributes.get("color") if isinstance(attributes.get("color"), str) else edge_color
+        extra = ' stroke-dasharray="6 4"' if attributes.get("dashes") else ""
+        if "to" in (attributes.get("arrows") or ""):
+            marker = markers.setdefault(stroke, f"arrow{len(markers)}")
+            extra += f' marker-end="url(#{marker})"'
+        edges.append(f'<path d="{path}" stroke="{stroke}"{extra}/>')
+        if attributes.get("label"):
+            edges.append(
+                f'<text x="{lx:.1f}" y="{ly:.1f}" fill="#333" stroke="none" text-anchor="middle">'
+                f"{escape(str(attributes['label']))}</text>"
+            )
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width:.0f}" height="{height:.0f}" '
+        f'viewBox="{left:.1f} {top:.1f} {width:.1f} {height:.1f}" font-family="Arial, sans-serif" '
+        f'font-size="{FONT_SIZE}">',
+        "<defs>",
+        *(
+            f'<marker id="{marker}" viewBox="0 0 10 10" refX="10" refY="5" markerWidth="{ARROW_SIZE}" '
+            f'markerHeight="{ARROW_SIZE}" markerUnits="userSpaceOnUse" orient="auto">'
+            f'<path d="M 0 0 L 10 5 L 0 10 z" fill="{color}" fill-opacity="{edge_opacity}"/></marker>'
+            for color, marker in markers.items()
+        ),
+        "</defs>",
+        f'<rect x="{left:.1f}" y="{top:.1f}" width="{width:.1f}" height="{height:.1f}" fill="white"/>',
+        f'<g fill="none" stroke-opacity="{edge_opacity}" stroke-width="1">',
+        *edges,
+    ]
+    parts.append("</g>")
+
+    for node, attributes in G.nodes(data=True):
+        x, y = placed[node]
+        r = sizes[node]
+        color = attributes.get("color") if isinstance(attributes.get("color"), str) else "#97C2FC"
+        label = attributes.get("label", node)
+        parts.append(f"<g><title>{escape(str(attributes.get('title') or label))}</title>")
+        parts.append(_node_shape(attributes.get("shape", "dot"), x, y, r, color))
+        parts.append(
+            f'<text x="{x:.1f}" y="{y + r + FONT_SIZE:.1f}" text-anchor="middle" fill="#343434">'
+            f"{escape(str(label))}</text></g>"
+        )
+    parts.append("</svg>")
+    return "\n".join(parts)
+
+
+def render_png(svg, scale=1.0):
+    """Rasterises an SVG from `render_svg`; needs the optional cairosvg package."""
+    if cairosvg is None:
+        raise RuntimeError("PNG rendering needs the cairosvg package (pip install cairosvg)")
+    return cairosvg.svg2png(bytestring=svg.encode("utf-8"), scale=scale)
+
+
+if __name__ == "__main__":
+    from history import shared_history
+    from model import MODEL_VERSION, load_model
+
+    parser = argparse.ArgumentParser(description="Render a model version to SVG or PNG without a browser")
+    parser.add_argument("output", help="Output file; a .png name renders PNG")
+    parser.add_argument("--version", default=MODEL_VERSION, help=f"Model version (default: {MODEL_VERSION}, from data_model.py)")
+    parser.add_argument("--hierarchical", action="store_true", help="Use the hierarchical layout")
+    args = parser.parse_args()
+
+    history = shared_history()
+    history.publish(MODEL_VERSION, *load_model())
+    if args.output.lower().endswith(".png"):
+        with open(args.output, "wb") as f:
+            f.write(history.png(args.version, args.hierarchical))
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(history.svg(args.version, args.hierarchical))
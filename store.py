@@ -0,0 +1,129 @@
+import os
+import uuid
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as pa_fs
+import pyarrow.parquet as pq
+
+from ingest import field_type, validate_columns
+from model import INSTANCE_MODEL_SOURCE, load_model, model_fields
+
+# Instance tables, the module whose fields they hold and the fields they are partitioned by
+TABLES = {
+    "systems": {
+        "module": "System Management",
+        "partitioning": ("Ministry Family Name", "Agency Name"),
+    },
+    "agencies": {
+        "module": "Agency Management",
+        "partitioning": ("Ministry Family", "Agency Name"),
+    },
+}
+
+
+class InstanceStore:
+    """Columnar Parquet store of system and agency records keyed to the model fields.
+
+    Each table is a hive-partitioned dataset under `root/<table>/`, one
+    directory level per partitioning field. Categorical fields are stored
+    dictionary-encoded and files are read through memory maps, so reading a
+    few columns across the portfolio touches only those column chunks.
+    """
+
+    def __init__(self, root, model_source=INSTANCE_MODEL_SOURCE):
+        self.root = root
+        self.filesystem = pa_fs.LocalFileSystem(use_mmap=True)
+        entities, edges = load_model(model_source)
+        self.schemas = {}
+        self.partitionings = {}
+        for table, spec in TABLES.items():
+            fields = model_fields(entities, edges, spec["module"])
+            for key in spec["partitioning"]:
+                if key not in fields:
+                    fields.append(key)
+            self.schemas[table] = pa.schema([(field, field_type(field)) for field in fields])
+            self.partitionings[table] = ds.partitioning(
+                pa.schema([(key, pa.string()) for key in spec["partitioning"]]), flavor="hive"
+            )
+
+    def path(self, table):
+        return os.path.join(self.root, table)
+
+    def _conform(self, table, data):
+        """Casts records to the table schema, filling fields the records do not carry with nulls."""
+        schema = self.schemas[table]
+        if isinstance(data, dict):
+            data = pa.table(data)
+        elif isinstance(data, pa.RecordBatch):
+            data = pa.Table.from_batches([data])
+        validate_columns(data.column_names, set(schema.names))
+
+        columns = []
+        for field in schema:
+            if field.name in data.column_names:
+                columns.append(data.column(field.name).cast(field.type))
+            else:
+                columns.append(pa.nulls(len(data), field.type))
+        return pa.Table.from_arrays(columns, schema=schema)
+
+    def write(self, table, data):
+        """Appends records (a pyarrow table/batch or a columnar dict) to `table`."""
+        ds.write_dataset(
+            self._conform(table, data),
+            self.path(table),
+            format="parquet",
+            partitioning=self.partitionings[table],
+            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+
+    def compact(self, table):
+        """Merges the files of each partition into one, e.g. after a chunked ingest.
+
+        Works one partition at a time, so memory is bounded by the largest
+        partition rather than the table.
+        """
+        for directory, _, files in os.walk(self.path(table)):
+            paths = sorted(os.path.join(directory, f) for f in files if f.endswith(".parquet"))
+            if len(paths) < 2:
+                continue
+            merged = ds.dataset(paths, format="parquet", filesystem=self.filesystem).to_table()
+            pq.write_table(merged, os.path.join(directory, f"part-{uuid.uuid4().hex}-0.parquet"))
+            for path in paths:
+                os.remove(path)
+
+    def dataset(self, table):
+        return ds.dataset(
+            self.path(table),
+            schema=self.schemas[table],
+            format="parquet",
+            partitioning=self.partitionings[table],
+            filesystem=self.filesystem,
+        )
+
+    def read(self, table, columns=None, filter=None):
+        """Reads only `columns` of `table`, pruning partitions with `filter` (a pyarrow expression)."""
+        if not os.path.isdir(self.path(table)):
+            schema = self.schemas[table]
+            if columns is not None:
+                schema = pa.schema([schema.field(c) for c in columns])
+            return schema.empty_table()
+        return self.dataset(table).to_table(columns=columns, filter=filter)
+
+    def column(self, table, field, filter=None):
+        """Reads a single field across every record of `table`."""
+        return self.read(table, [field], filter).column(field)
+
+    def sink(self, table):
+        """Returns a sink that `ingest.ingest` can stream export chunks into."""
+        return _StoreSink(self, table)
+
+
+class _StoreSink:
+    def __init__(self, store, table):
+        self.store = store
+        self.table = table
+
+    def write(self, batch):
+        self.store.write(self.table, batch)
@@ -0,0 +1,80 @@
+import gzip
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+import server
+from api import GraphAPI
+from history import ModelHistory
+from model import MODEL_VERSION
+
+
+@pytest.fixture(scope="module")
+def base_url():
+    history = ModelHistory()
+    history.publish_source(MODEL_VERSION)
+    GraphAPI(history).register()
+    httpd = server.serve(0, host="127.0.0.1")
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _get(url, **headers):
+    request = urllib.request.Request(url, headers=headers)
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, e.read()
+
+
+def _graph(base_url):
+    return f"{base_url}/graph?token={server.SERVER_TOKEN}"
+
+
+def test_requests_without_the_token_are_refused(base_url):
+    status, _, _ = _get(f"{base_url}/graph")
+    assert status == 401
+
+
+def test_a_repeat_with_if_none_match_gets_a_304(base_url):
+    status, headers, body = _get(_graph(base_url))
+    assert status == 200
+    tag = headers["ETag"]
+    assert json.loads(body)["nodes"]
+
+    status, headers, body = _get(_graph(base_url), **{"If-None-Match": tag})
+    assert status == 304
+    assert headers["ETag"] == tag
+    assert body == b""
+
+
+def test_a_different_request_does_not_match(base_url):
+    _, headers, _ = _get(_graph(base_url))
+    status, _, _ = _get(f"{base_url}/metrics?token={server.SERVER_TOKEN}", **{"If-None-Match": headers["ETag"]})
+    assert status == 200
+
+
+def test_gzip_clients_get_a_gzipped_body_and_their_own_validator(base_url):
+    _, plain_headers, plain = _get(_graph(base_url))
+    status, headers, body = _get(_graph(base_url), **{"Accept-Encoding": "gzip"})
+    assert status == 200
+    assert headers["Content-Encoding"] == "gzip"
+    assert len(plain) >= server.GZIP_MIN_BYTES
+    assert gzip.decompress(body) == plain
+    tag = headers["ETag"]
+    assert tag == plain_headers["ETag"][:-1] + '-gzip"'
+
+    status, headers, _ = _get(_graph(base_url), **{"Accept-Encoding": "gzip", "If-None-Match": tag})
+    assert status == 304
+    assert headers["ETag"] == tag
+
+
+def test_small_responses_are_not_compressed(base_url):
+    status, headers, body = _get(f"{base_url}/versions?token={server.SERVER_TOKEN}", **{"Accept-Encoding": "gzip"})
+    assert status == 200
+    assert "Content-Encoding" not in headers
+    assert json.loads(body)[0]["version"] == MODEL_VERSION
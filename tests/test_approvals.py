@@ -0,0 +1,35 @@
+from approvals import ApprovalRollups, shared_approval_rollups
+from db import Database
+
+
+def _system(system_id, agency, **fields):
+    return {"System ID": system_id, "Agency Name": agency, "Ministry Family Name": "MF", **fields}
+
+
+def test_changed_records_move_between_stages():
+    rollups = ApprovalRollups([_system("A", "X"), _system("B", "Y", **{"Agency Proposed RML": "RML 2"})])
+    assert rollups.stages()["Not Started"] == 1
+    assert rollups.stages(agency="Y")["Proposed"] == 1
+
+    rollups.upsert(_system("A", "Y", **{"Endorsed RML": "RML 3", "RML Endorsement Date": "2026-01-01"}))
+    assert rollups.stages(agency="Y") == {**dict.fromkeys(rollups.stages(), 0), "Proposed": 1, "Endorsed": 1}
+    assert rollups.agencies() == ["Y"]
+    assert rollups.count("Total", ministry_family="MF") == 2
+
+    rollups.remove("B")
+    assert rollups.count("Total") == 1
+
+
+def test_writes_from_another_process_are_synced(tmp_path):
+    database = Database(str(tmp_path / "approvals.db"))
+    database.upsert("systems", [_system("A", "X"), _system("B", "X")])
+    rollups = shared_approval_rollups(database)
+    assert rollups.stages(agency="X")["Not Started"] == 2
+
+    # A second Database on the same file stands in for the ingest CLI
+    other = Database(database.pool.path)
+    other.update_systems([{"System ID": "B", "Agency Proposed RML": "RML 1"}])
+    other.upsert("systems", [_system("C", "Z")])
+    rollups = shared_approval_rollups(database)
+    assert rollups.stages(agency="X")["Proposed"] == 1
+    assert rollups.count("Total", agency="Z") == 1
@@ -0,0 +1,53 @@
+import random
+
+import networkx as nx
+import numpy as np
+
+from cycles import DependencyCycles, adjacency, strongly_connected_components
+
+
+def _components(n, edges):
+    src, dst = zip(*edges) if edges else ((), ())
+    return strongly_connected_components(*adjacency(n, src, dst))
+
+
+def test_components_match_networkx():
+    rng = random.Random(7)
+    for _ in range(50):
+        n = rng.randint(1, 30)
+        edges = [(rng.randrange(n), rng.randrange(n)) for _ in range(rng.randint(0, 3 * n))]
+        label, count = _components(n, edges)
+
+        G = nx.DiGraph(edges)
+        G.add_nodes_from(range(n))
+        expected = {frozenset(c) for c in nx.strongly_connected_components(G)}
+        found = {frozenset(np.flatnonzero(label == c).tolist()) for c in range(count)}
+        assert found == expected
+
+
+def test_components_are_numbered_upstream_first():
+    rng = random.Random(11)
+    for _ in range(50):
+        n = rng.randint(1, 30)
+        edges = [(rng.randrange(n), rng.randrange(n)) for _ in range(rng.randint(0, 3 * n))]
+        label, _ = _components(n, edges)
+        assert all(label[u] <= label[v] for u, v in edges)
+
+
+def test_deep_chain_does_not_recurse():
+    n = 100_000
+    label, count = _components(n, [(i, i + 1) for i in range(n - 1)])
+    assert count == n
+    assert label.tolist() == list(range(n))
+
+
+def test_cycles_include_self_loops_only():
+    cycles = DependencyCycles(["A", "B", "C", "D", "E"], [("A", "B"), ("B", "A"), ("C", "C"), ("C", "D")])
+    members = sorted(sorted(cycles.system_ids[i] for i in cycles.members[c]) for c in cycles.cycles)
+    assert members == [["A", "B"], ["C"]]
+
+
+def test_systems_only_named_by_a_dependency_are_added():
+    cycles = DependencyCycles(["A"], [("A", "B")])
+    assert cycles.system_ids == ["A", "B"]
+    assert cycles.count == 2
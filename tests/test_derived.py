@@ -0,0 +1,141 @@
+import random
+import time
+
+import networkx as nx
+import numpy as np
+import pytest
+
+import derived
+from db import Database
+from derived import DerivedFields, reach_counts
+from rml import IMPACT_DIMENSIONS
+
+
+def _random_graph(seed, n, m):
+    rng = random.Random(seed)
+    edges = [(rng.randrange(n), rng.randrange(n)) for _ in range(m)]
+    src, dst = (np.array(side, dtype=np.int64) for side in zip(*edges))
+    G = nx.DiGraph(edges)
+    G.add_nodes_from(range(n))
+    return G, src, dst
+
+
+@pytest.mark.parametrize("bfs_targets", [derived.BFS_TARGETS, 0])
+def test_reach_counts_match_networkx(monkeypatch, bfs_targets):
+    # 0 sends every call down the bitset path
+    monkeypatch.setattr(derived, "BFS_TARGETS", bfs_targets)
+    for seed in range(20):
+        G, src, dst = _random_graph(seed, 60, 90)
+        targets = list(range(0, 60, 3))
+        expected = [len(nx.descendants(G, t)) for t in targets]
+        assert reach_counts(60, src, dst, targets).tolist() == expected
+
+
+def test_reach_counts_across_blocks(monkeypatch):
+    monkeypatch.setattr(derived, "BFS_TARGETS", 0)
+    # A block of 8 components at a time
+    monkeypatch.setattr(derived, "REACH_BLOCK_BYTES", 1)
+    G, src, dst = _random_graph(3, 40, 60)
+    assert reach_counts(40, src, dst, range(40)).tolist() == [len(nx.descendants(G, t)) for t in range(40)]
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = Database(str(tmp_path / "derived.db"))
+    database.upsert("systems", [
+        {"System ID": s, **{dimension: "Low" for dimension in IMPACT_DIMENSIONS}} for s in "ABCD"
+    ])
+    database.upsert("dependencies", [
+        {"Dependency ID": "AB", "Upstream System": "A", "Dependent System": "B"},
+        {"Dependency ID": "BC", "Upstream System": "B", "Dependent System": "C"},
+    ])
+    return database
+
+
+def test_a_field_marks_only_its_dependents(database):
+    scheduler = DerivedFields(database, workers=1)
+    database.update_systems([{"System ID": "B", "Economy": "High"}])
+    database.update_systems([{"System ID": "C", "Agency Proposed RML": "RML 2"}])
+    assert scheduler._dirty == {
+        "System Criticality": {"B"},
+        "Computed RML": {"B"},
+        "RML Alignment": {"C"},
+    }
+    assert not scheduler._dependencies
+
+
+def test_unrelated_fields_mark_nothing(database):
+    scheduler = DerivedFields(database, workers=1)
+    database.update_systems([{"System ID": "B", "System Name": "Billing"}])
+    assert not scheduler.busy()
+
+
+def test_a_new_dependency_marks_the_systems_it_can_change(database):
+    scheduler = DerivedFields(database, workers=1)
+    database.upsert("dependencies", [{"Dependency ID": "CD", "Upstream System": "C", "Dependent System": "D"}])
+    assert scheduler._dependencies
+
+    dirty = {}
+    edges = scheduler._edges
+    scheduler._evaluate(dirty, True)
+    assert scheduler._edges == edges | {("C", "D")}
+    assert dirty["Direct Dependencies Count"] == {"D"}
+    assert dirty["Total Dependencies"] == {"D"}
+    assert dirty["Downstream Impact"] == {"A", "B", "C"}
+
+
+def test_batches_update_values_and_their_dependents(database):
+    scheduler = DerivedFields(database, workers=1, delay=0).start()
+    try:
+        scheduler.mark_all()
+        assert scheduler.wait(10)
+        rows = {row["System ID"]: row for row in database.query("SELECT * FROM systems")}
+        assert rows["C"]["Total Dependencies"] == 2
+        assert rows["A"]["Downstream Impact"] == 2
+        assert rows["A"]["RML Alignment"] == "Not Proposed"
+
+        database.update_systems([{"System ID": "A", "Agency Proposed RML": "RML 4"}])
+        assert scheduler.wait(10)
+        assert database.records("systems", ["A"])[0]["RML Alignment"] == "Above Computed"
+    finally:
+        scheduler.stop()
+
+
+def test_an_unrecognised_rating_leaves_only_its_system_unset(database):
+    database.update_systems([{"System ID": "B", "Economy": "Severe"}])
+    scheduler = DerivedFields(database, workers=1, delay=0).start()
+    try:
+        scheduler.mark_all()
+        assert scheduler.wait(10)
+    finally:
+        scheduler.stop()
+    rows = {row["System ID"]: row for row in database.query("SELECT * FROM systems")}
+    assert rows["B"]["Computed RML"] is None
+    assert all(rows[s]["Computed RML"] is not None for s in "ACD")
+    assert any("B" in error for error in scheduler.status()["errors"])
+
+
+def test_writes_from_another_process_are_picked_up(database):
+    scheduler = DerivedFields(database, workers=1, delay=0, poll=0).start()
+    try:
+        assert scheduler.wait(10)
+        # A second Database on the same file stands in for the ingest CLI: no listener here hears it
+        other = Database(database.pool.path)
+        other.update_systems([{"System ID": "D", **{dimension: "Very High" for dimension in IMPACT_DIMENSIONS}}])
+        other.upsert("dependencies", [{"Dependency ID": "CD", "Upstream System": "C", "Dependent System": "D"}])
+        deadline = time.monotonic() + 10
+        while database.records("systems", ["D"])[0]["Total Dependencies"] != 3 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert scheduler.wait(10)
+        record = database.records("systems", ["D"])[0]
+        assert record["Total Dependencies"] == 3
+        assert record["System Criticality"] == "Very High"
+    finally:
+        scheduler.stop()
+
+
+def test_in_process_writes_do_not_mark_everything(database):
+    scheduler = DerivedFields(database, workers=1, poll=0)
+    database.update_systems([{"System ID": "B", "Economy": "High"}])
+    scheduler._poll()
+    assert scheduler._dirty["System Criticality"] == {"B"}
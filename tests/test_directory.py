@@ -0,0 +1,38 @@
+from db import Database
+from directory import HolderDirectory, shared_holder_directory
+
+
+def _holder(email, name, designation, agency):
+    return {"Email": email, "Full Name": name, "Designation": designation, "Agency Name": agency}
+
+
+def test_lookups_and_accountability():
+    directory = HolderDirectory(
+        [_holder("Alice@x.sg", "Alice Tan", "Chief Information Officer", "AG1"), _holder("bob@x.sg", "Bob Lim", "CISO", "AG2")],
+        [{"System ID": "S1", "Agency Name": "AG1"}, {"System ID": "S2", "Agency Name": "AG2"}],
+    )
+    assert directory.by_email("alice@X.sg")["Full Name"] == "Alice Tan"
+    assert [h["Email"] for h in directory.search_name("ta")] == ["Alice@x.sg"]
+    assert [h["Email"] for h in directory.search_designation("info")] == ["Alice@x.sg"]
+    assert directory.accountable_for("bob@x.sg") == {"agencies": ["AG2"], "systems": ["S2"]}
+
+    # A changed Agency Name moves the holder, and a renamed holder is only found by the new name
+    directory.upsert(_holder("alice@x.sg", "Alice Ng", "CIO", "AG2"))
+    assert directory.accountable_for("alice@x.sg") == {"agencies": ["AG2"], "systems": ["S2"]}
+    assert directory.search_name("tan") == []
+    assert directory.holders_of("AG1") == []
+
+
+def test_writes_from_another_process_are_synced(tmp_path):
+    database = Database(str(tmp_path / "directory.db"))
+    database.upsert("key_appointment_holders", [_holder("a@x.sg", "Alice Tan", "CIO", "AG1")])
+    database.upsert("systems", [{"System ID": "S1", "Agency Name": "AG1"}])
+    assert shared_holder_directory(database).accountable_for("a@x.sg")["systems"] == ["S1"]
+
+    # A second Database on the same file stands in for the ingest CLI
+    other = Database(database.pool.path)
+    other.upsert("key_appointment_holders", [_holder("b@x.sg", "Bob Lim", "CISO", "AG1")])
+    other.upsert("systems", [{"System ID": "S2", "Agency Name": "AG1"}])
+    directory = shared_holder_directory(database)
+    assert directory.by_email("b@x.sg")["Full Name"] == "Bob Lim"
+    assert directory.accountable_for("a@x.sg")["systems"] == ["S1", "S2"]
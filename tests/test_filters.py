@@ -0,0 +1,18 @@
+from filters import instance_index
+from partitions import portfolio_graph
+
+
+def test_external_systems_stay_beside_the_systems_they_connect_to():
+    systems = [
+        {"System ID": "S1", "System Status": "Active"},
+        {"System ID": "S2", "System Status": "Retired"},
+    ]
+    G = portfolio_graph(systems, [
+        {"Upstream System": "S1", "Dependent System": "EXT1"},
+        {"Upstream System": "EXT2", "Dependent System": "S2"},
+    ])
+    index = instance_index(systems, G)
+    assert index.values("System Status") == ["Active", "Retired"]
+    assert set(index.visible({})) == {"S1", "S2", "EXT1", "EXT2"}
+    assert set(index.visible({"System Status": ["Active"]})) == {"S1", "EXT1"}
+    assert set(index.visible({"System Status": ["Decommissioned"]})) == set()
@@ -0,0 +1,50 @@
+from db import Database
+from inference import infer_dependencies
+
+
+def _infer(tmp_path, content):
+    path = tmp_path / "exchanges.log"
+    path.write_bytes(content)
+    return infer_dependencies([str(path)], workers=1, min_exchanges=1, min_confidence=0)
+
+
+def test_undated_exchanges_count_towards_exchanges_but_not_days(tmp_path):
+    inferred, summary = _infer(tmp_path, b"2026-01-01 src=A dst=B\n2026-01-02 src=A dst=B\nsrc=A dst=B\nsrc=C dst=D\n")
+    edges = {(edge["upstream"], edge["dependent"]): edge for edge in inferred}
+    assert summary["days"] == 2
+    assert (edges["A", "B"]["exchanges"], edges["A", "B"]["days"]) == (3, 2)
+    assert edges["C", "D"]["days"] == 0
+
+
+def test_without_dates_the_frequency_is_unknown(tmp_path):
+    inferred, summary = _infer(tmp_path, b"src=A dst=B\nsrc=A dst=B\n")
+    assert summary["days"] == 0
+    assert inferred[0]["frequency"] is None
+    assert 0 < inferred[0]["confidence"] <= 1
+
+
+def test_lines_that_are_not_utf8_do_not_end_the_run(tmp_path):
+    inferred, summary = _infer(tmp_path, b"src=A\xff dst=B\nsrc=A dst=B\n")
+    assert summary["exchanges"] == 2
+    assert {edge["upstream"] for edge in inferred} == {"A�", "A"}
+
+
+def test_saving_notifies_and_bumps_systems(tmp_path):
+    database = Database(str(tmp_path / "inference.db"))
+    database.upsert("systems", [{"System ID": s} for s in "ABC"])
+    heard = []
+    database.subscribe(lambda table, keys, fields: heard.append((table, keys, fields)))
+    before = database.revisions("systems", "dependencies")
+
+    database.save_inferred_dependencies([
+        {"upstream": "A", "dependent": "B", "exchanges": 5, "days": 1, "frequency": None, "confidence": 0.5},
+    ])
+    assert database.records("systems", ["B"])[0]["Inferred Dependencies"] == "A"
+    assert [r - b for r, b in zip(database.revisions("systems", "dependencies"), before)] == [1, 1]
+    assert ("systems", ["B"], {"Inferred Dependencies"}) in heard
+
+    database.save_inferred_dependencies([
+        {"upstream": "A", "dependent": "C", "exchanges": 5, "days": 1, "frequency": 2.5, "confidence": 0.5},
+    ])
+    assert heard[-1] == ("systems", ["B", "C"], {"Inferred Dependencies"})
+    assert database.records("systems", ["B"])[0]["Inferred Dependencies"] is None
@@ -0,0 +1,45 @@
+from db import Database
+from partitions import AGENCY_NODE, HOLDER_NODE, AgencyViews, shared_agency_views
+
+
+def test_views_hold_the_agency_its_systems_dependencies_and_holders():
+    views = AgencyViews(
+        [
+            {"System ID": "S1", "Agency Name": "AG1", "Ministry Family Name": "MF"},
+            {"System ID": "S2", "Agency Name": "AG2", "Ministry Family Name": "MF"},
+        ],
+        [{"Upstream System": "S2", "Dependent System": "S1"}],
+        [{"Email": "a@x.sg", "Full Name": "Alice", "Agency Name": "AG1"}],
+    )
+    G = views.agency("AG1")
+    assert set(G) == {AGENCY_NODE + "AG1", "S1", "S2", HOLDER_NODE + "a@x.sg"}
+    assert G.nodes["S2"]["kind"] == "external"
+    assert set(views.ministry_family("MF")) >= {AGENCY_NODE + "AG1", AGENCY_NODE + "AG2"}
+
+
+def test_agencies_named_like_systems_stay_apart():
+    views = AgencyViews([{"System ID": "AG1", "Agency Name": "AG1"}], [])
+    G = views.agency("AG1")
+    assert G.nodes[AGENCY_NODE + "AG1"]["kind"] == "agency"
+    assert G.nodes["AG1"]["kind"] == "system"
+
+
+def test_records_without_an_agency_or_holder_belong_to_no_view():
+    views = AgencyViews(
+        [{"System ID": "S1", "Agency Name": None, "Ministry Family Name": "MF"}, {"System ID": "S2", "Agency Name": "AG1"}],
+        [],
+        [{"Email": None, "Full Name": None, "Agency Name": "AG1"}, {"Email": "b@x.sg", "Agency Name": None}],
+    )
+    assert views.agencies == ["AG1"]
+    assert views.ministry_families == []
+    assert set(views.agency("AG1")) == {AGENCY_NODE + "AG1", "S2"}
+
+
+def test_shared_views_are_rebuilt_after_a_write(tmp_path):
+    database = Database(str(tmp_path / "partitions.db"))
+    database.upsert("systems", [{"System ID": "S1", "Agency Name": "AG1"}])
+    views = shared_agency_views(database)
+    assert shared_agency_views(database) is views
+
+    Database(database.pool.path).upsert("systems", [{"System ID": "S2", "Agency Name": "AG2"}])
+    assert shared_agency_views(database).agencies == ["AG1", "AG2"]
@@ -0,0 +1,20 @@
+import pytest
+
+from prebuild import slug, unique_slugs
+
+
+@pytest.mark.parametrize("name", ["..", ".", "...", "../x", "x/../../etc", ".hidden"])
+def test_slugs_stay_inside_the_output_directory(name):
+    assert "/" not in slug(name)
+    assert slug(name).strip(".") == slug(name) != ""
+
+
+def test_versions_keep_their_dots():
+    assert slug("V2.2") == "v2.2"
+
+
+def test_names_sharing_a_slug_are_told_apart():
+    slugs = unique_slugs(["A&B", "A B", "C"])
+    assert slugs["C"] == "c"
+    assert len(set(slugs.values())) == 3
+    assert all(s.startswith("a-b-") for name, s in slugs.items() if name != "C")
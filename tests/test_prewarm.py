@@ -0,0 +1,19 @@
+from history import ModelHistory
+from model import MODEL_VERSION
+from prewarm import Prewarm
+
+
+def test_waiting_before_start_returns_false():
+    assert Prewarm(ModelHistory()).wait(0) is False
+
+
+def test_the_model_is_read_once_for_every_publisher(monkeypatch):
+    import history as history_module
+
+    reads = []
+    load_model = history_module.load_model
+    monkeypatch.setattr(history_module, "load_model", lambda *args: reads.append(args) or load_model(*args))
+    history = ModelHistory()
+    first = history.publish_source(MODEL_VERSION)
+    assert history.publish_source(MODEL_VERSION) is first
+    assert len(reads) == 1
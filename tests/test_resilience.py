@@ -0,0 +1,82 @@
+import random
+
+import numpy as np
+
+from resilience import ResiliencePropagation
+
+
+def _portfolio(seed, n=40, m=70):
+    rng = random.Random(seed)
+    system_ids = [f"S{i}" for i in range(n)]
+    systems = {
+        "System ID": system_ids,
+        "RTO": [rng.choice([np.nan, 1, 4, 8, 24, 72]) for _ in system_ids],
+        "RPO": [rng.choice([np.nan, 0.5, 1, 4, 24]) for _ in system_ids],
+        "Service Availability": [rng.choice([np.nan, 0.99, 99.9, 0.95, 0]) for _ in system_ids],
+    }
+    dependencies = [(rng.choice(system_ids), rng.choice(system_ids)) for _ in range(m)]
+    return systems, dependencies
+
+
+def _assert_same(actual, expected):
+    assert actual.keys() == expected.keys()
+    for field in expected:
+        if field in ("System ID", "RTO Bound By", "RTO Unachievable"):
+            assert list(actual[field]) == list(expected[field]), field
+        else:
+            np.testing.assert_allclose(actual[field], expected[field], err_msg=field)
+
+
+def test_effective_values_follow_the_worst_upstream():
+    systems = {"System ID": ["A", "B", "C"], "RTO": [24, 4, 8], "RPO": [1, 4, 2], "Service Availability": [0.9, 0.9, 1]}
+    results = ResiliencePropagation(systems, [("A", "B"), ("B", "C")]).results()
+    assert results["Effective RTO"].tolist() == [24, 24, 24]
+    assert results["Effective RPO"].tolist() == [1, 4, 4]
+    assert results["RTO Bound By"] == ["A", "A", "A"]
+    assert results["RTO Unachievable"].tolist() == [False, True, True]
+    np.testing.assert_allclose(results["Compound Availability"], [0.9, 0.81, 0.81])
+
+
+def test_shared_upstreams_count_once():
+    systems = {"System ID": ["A", "B", "C", "D"], "Service Availability": [0.5, 1, 1, 1]}
+    results = ResiliencePropagation(systems, [("A", "B"), ("A", "C"), ("B", "D"), ("C", "D")]).results()
+    np.testing.assert_allclose(results["Compound Availability"], [0.5, 0.5, 0.5, 0.5])
+
+
+def test_updates_match_a_full_rebuild():
+    for seed in range(10):
+        systems, dependencies = _portfolio(seed)
+        propagation = ResiliencePropagation(systems, dependencies)
+        rng = random.Random(seed)
+        for _ in range(15):
+            system_id = rng.choice(systems["System ID"])
+            values = {"RTO": rng.choice([1, 12, 96]), "Service Availability": rng.choice([0.9, 99.0, 0])}
+            if rng.random() < 0.5:
+                values["RPO"] = rng.choice([0.25, 48])
+            i = systems["System ID"].index(system_id)
+            for field, value in values.items():
+                systems[field][i] = value
+
+            propagation.update(system_id, values)
+            _assert_same(propagation.results(), ResiliencePropagation(systems, dependencies).results())
+
+
+def test_updates_report_the_systems_downstream():
+    systems = {"System ID": ["A", "B", "C", "D"], "RTO": [1, 1, 1, 1]}
+    propagation = ResiliencePropagation(systems, [("A", "B"), ("B", "C"), ("C", "B")])
+    assert sorted(propagation.update("B", {"RTO": 8})) == ["B", "C"]
+    assert sorted(propagation.update("A", {"RTO": 2})) == ["A", "B", "C"]
+
+
+def test_an_unavailable_system_makes_everything_downstream_unavailable():
+    systems = {"System ID": ["A", "B", "C"], "Service Availability": [0.0, 0.99, 0.9]}
+    propagation = ResiliencePropagation(systems, [("A", "B")])
+    np.testing.assert_allclose(propagation.results()["Compound Availability"], [0.0, 0.0, 0.9])
+
+    propagation.update("A", {"Service Availability": 0.5})
+    np.testing.assert_allclose(propagation.results()["Compound Availability"], [0.5, 0.495, 0.9])
+    propagation.update("C", {"Service Availability": 0})
+    propagation.update("B", {"Service Availability": 0})
+    np.testing.assert_allclose(propagation.results()["Compound Availability"], [0.5, 0.0, 0.0])
+    systems["Service Availability"] = [0.5, 0, 0]
+    _assert_same(propagation.results(), ResiliencePropagation(systems, [("A", "B")]).results())
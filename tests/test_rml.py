@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from rml import IMPACT_DIMENSIONS, compute_rml, encode_ratings, encode_rml
+
+
+def test_float_rml_levels_are_codes_and_nan_is_unset():
+    levels = np.array([3.0, np.nan, -1.0, 1.0])
+    assert encode_rml(levels).tolist() == [3, -1, -1, 1]
+
+
+def test_fractional_rml_levels_are_unrecognised():
+    with pytest.raises(ValueError, match="1.5"):
+        encode_rml(np.array([1.5, 2.0]))
+    assert encode_rml(np.array([1.5, 2.0]), invalid=-2).tolist() == [-2, 2]
+
+
+def test_float_ratings_match_their_labels():
+    labels = {dim: np.array(["Low", "None", "Very High"], dtype=object) for dim in IMPACT_DIMENSIONS}
+    floats = {dim: np.array([1.0, np.nan, 4.0]) for dim in IMPACT_DIMENSIONS}
+    assert (encode_ratings(floats) == encode_ratings(labels)).all()
+    assert compute_rml(floats).keys() == compute_rml(labels).keys()
+    for field, column in compute_rml(labels).items():
+        assert list(compute_rml(floats)[field]) == list(column), field
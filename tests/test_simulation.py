@@ -0,0 +1,55 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+import simulation
+from simulation import simulate_outages
+
+SYSTEMS = {
+    "System ID": ["A", "B", "C", "D", "E"],
+    "Service Availability": [0.9, 0.95, 0.99, 0.8, 0.97],
+    "RTO": [4, 8, np.nan, 2, 24],
+}
+# B and C depend on each other, so they go down together
+DEPENDENCIES = [("A", "B"), ("B", "C"), ("C", "B"), ("C", "D"), ("A", "E")]
+
+
+def _failing_batch(seed, size, arrays=None):
+    raise ValueError("batch failed")
+
+
+def test_results_do_not_depend_on_the_worker_count():
+    inline = simulate_outages(SYSTEMS, DEPENDENCIES, scenarios=2000, batch_size=300, workers=1, seed=7)
+    pooled = simulate_outages(SYSTEMS, DEPENDENCIES, scenarios=2000, batch_size=300, workers=2, seed=7)
+    assert inline["System ID"] == pooled["System ID"]
+    for field in ("Outage Probability", "Induced Outage Probability", "Expected Outage Duration", "Risk Score"):
+        np.testing.assert_array_equal(inline[field], pooled[field], err_msg=field)
+
+
+def test_outages_spread_downstream():
+    results = simulate_outages(SYSTEMS, DEPENDENCIES, scenarios=5000, workers=1)
+    probability = dict(zip(results["System ID"], results["Outage Probability"]))
+    assert probability["B"] == probability["C"]
+    assert probability["D"] >= probability["C"] >= probability["A"]
+    assert results["Induced Outage Probability"][0] == 0
+
+
+def test_shared_memory_is_unlinked_when_a_worker_raises(monkeypatch):
+    created = []
+
+    class Recording(shared_memory.SharedMemory):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            if kwargs.get("create"):
+                created.append(self.name)
+
+    monkeypatch.setattr(simulation.shared_memory, "SharedMemory", Recording)
+    monkeypatch.setattr(simulation, "_sample_batch", _failing_batch)
+    with pytest.raises(ValueError, match="batch failed"):
+        simulate_outages(SYSTEMS, DEPENDENCIES, scenarios=1000, batch_size=100, workers=2)
+
+    assert created
+    for name in created:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
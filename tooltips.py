@@ -0,0 +1,177 @@
+import collections
+import json
+import threading
+
+from db import shared_database
+from history import shared_history
+from ingest import CATEGORICAL_FIELDS, field_category
+from model import children, field_modules
+from server import add_route, client_url, shared_server
+
+# Tooltips kept in memory; the rest are read back from the SQLite index
+CACHED_TOOLTIPS = 256
+MAX_ALLOWED_VALUES = 25
+
+# Fetches a node's metadata the first time it is hovered and makes it the
+# node's tooltip; until then the short title embedded in the page is shown.
+TOOLTIPS_HTML = """
+<script>
+    (function () {
+        var requested = {};
+        function tooltip(name, metadata) {
+            var element = document.createElement("div");
+            element.style.maxWidth = "360px";
+            element.style.whiteSpace = "normal";
+            var heading = document.createElement("b");
+            heading.textContent = name;
+            element.appendChild(heading);
+            Object.keys(metadata).forEach(function (key) {
+                var row = document.createElement("div");
+                var label = document.createElement("b");
+                var value = metadata[key];
+                label.textContent = key + ": ";
+                row.appendChild(label);
+                row.appendChild(document.createTextNode(Array.isArray(value) ? value.join(", ") : value));
+                element.appendChild(row);
+            });
+            return element;
+        }
+        network.setOptions({interaction: {hover: true}});
+        network.on("hoverNode", function (event) {
+            var id = event.node;
+            if (requested[id]) {
+                return;
+            }
+            requested[id] = true;
+            fetch(%(url)s + "&version=" + encodeURIComponent(%(version)s) + "&node=" + encodeURIComponent(id))
+                .then(function (response) {
+                    if (!response.ok) {
+                        throw new Error(response.statusText);
+                    }
+                    return response.json();
+                })
+                .then(function (metadata) { nodes.update({id: id, title: tooltip(id, metadata)}); })
+                .catch(function () { delete requested[id]; });
+        });
+    })();
+</script>
+"""
+
+
+def node_metadata(entities, edges, tables=None, values=None):
+    """Returns the tooltip metadata of every node of a model.
+
+    `tables` maps instance tables to their fields (as `db.instance_tables`)
+    and `values` maps categorical fields to the values recorded for them.
+    """
+    parents = {}
+    for source, target, *_ in edges:
+        parents.setdefault(target, source)
+    tree = children(edges)
+    modules = field_modules(entities, edges)
+    columns = {}
+    for table, (fields, _) in (tables or {}).items():
+        for field in fields:
+            columns.setdefault(field, table)
+
+    metadata = {}
+    for name, attributes in entities.items():
+        lineage = [name]
+        while lineage[-1] in parents and len(lineage) <= len(parents):
+            lineage.append(parents[lineage[-1]])
+        entry = {"Description": attributes.get("title") or "", "Lineage": " › ".join(reversed(lineage))}
+        if name in tree:
+            entry["Contains"] = f"{len(tree[name])} items"
+        else:
+            entry["Module"] = ", ".join(sorted(modules.get(name, ()))) or "None"
+            entry["Data Type"] = field_category(name)
+            if name in columns:
+                entry["Stored In"] = f"{columns[name]}.{name}"
+            if (values or {}).get(name):
+                entry["Allowed Values"] = values[name]
+        metadata[name] = entry
+    return metadata
+
+
+class TooltipStore:
+    """Rich per-node tooltips served on demand instead of embedded in every page.
+
+    The metadata of a model version is indexed into the SQLite store the
+    first time one of its nodes is looked up, and again whenever the version
+    is republished with new content. Recently hovered nodes are answered
+    from a small in-memory LRU cache.
+    """
+
+    def __init__(self, history, database):
+        self.history = history
+        self.database = database
+        self._lock = threading.Lock()
+        self._indexed = {}
+        self._cache = collections.OrderedDict()
+
+    def _values(self):
+        values = {}
+        for table, (fields, _) in self.database.tables.items():
+            for field in fields:
+                if field in CATEGORICAL_FIELDS and field not in values:
+                    values[field] = self.database.distinct_values(table, field, MAX_ALLOWED_VALUES)
+        return values
+
+    def _index(self, version):
+        model = self.history.get(version)
+        with self._lock:
+            if self._indexed.get(version) is model:
+                return
+        metadata = node_metadata(model.entities, model.edges, self.database.tables, self._values())
+        self.database.save_metadata(version, metadata)
+        with self._lock:
+            self._indexed[version] = model
+            for key in [k for k in self._cache if k[0] == version]:
+                del self._cache[key]
+
+    def lookup(self, version, name):
+        """Returns the metadata of one node; raises KeyError for unknown versions and nodes."""
+        self._index(version)
+        key = (version, name)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        entry = self.database.node_metadata(version, name)
+        if entry is None:
+            raise KeyError(name)
+        with self._lock:
+            self._cache[key] = entry
+            while len(self._cache) > CACHED_TOOLTIPS:
+                self._cache.popitem(last=False)
+        return entry
+
+    def attach(self, html, version):
+        """Adds the on-hover tooltip loader to a page rendered from `version`."""
+        script = TOOLTIPS_HTML % {"url": json.dumps(client_url("/metadata")), "version": json.dumps(version)}
+        return html.replace("</body>", f"{script}</body>")
+
+
+_tooltips = None
+_tooltips_lock = threading.Lock()
+
+
+def _metadata(query):
+    if "version" not in query or "node" not in query:
+        raise ValueError("version and node are required")
+    return _tooltips.lookup(query["version"], query["node"])
+
+
+def shared_tooltips():
+    """Returns the process-wide tooltip store, serving /metadata?version=&node= from the side server.
+
+    Returns None when the side server is off (MODEL_SERVER_PORT is not set).
+    """
+    global _tooltips
+    if shared_server() is None:
+        return None
+    with _tooltips_lock:
+        if _tooltips is None:
+            _tooltips = TooltipStore(shared_history(), shared_database())
+            add_route("/metadata", _metadata)
+        return _tooltips
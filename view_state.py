@@ -0,0 +1,29 @@
+class ViewState:
+    """What one session is looking at: the only diagram state a session keeps.
+
+    The model, its graphs and the rendered pages are process-wide and shared
+    (see `history.ModelHistory`); a session holds this handful of names and
+    flags and asks the history for the graph or page they select.
+    """
+
+    __slots__ = ("version", "hierarchical", "focus", "filters")
+
+    def __init__(self, version, hierarchical=False, focus=None, filters=None):
+        self.version = version
+        self.hierarchical = bool(hierarchical)
+        self.focus = focus
+        # Facet -> selected values, as taken by `filters.FilterIndex.mask`
+        self.filters = {facet: tuple(values) for facet, values in (filters or {}).items() if values}
+
+    def __eq__(self, other):
+        return isinstance(other, ViewState) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return f"ViewState({self.version!r}, hierarchical={self.hierarchical}, focus={self.focus!r}, filters={self.filters!r})"
+
+    @property
+    def key(self):
+        return (self.version, self.hierarchical, self.focus, tuple(sorted(self.filters.items())))
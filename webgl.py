@@ -0,0 +1,75 @@
+import json
+import os
+
+import numpy as np
+import streamlit.components.v1 as components
+
+from graph import FREE_OPTIONS, HIERARCHICAL_OPTIONS
+
+# The component's page and renderer, served from this directory with no network access
+FRONTEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "webgl")
+DEFAULT_NODE_COLOR = "#97C2FC"
+DEFAULT_NODE_SIZE = 10
+
+_component = components.declare_component("webgl_graph", path=FRONTEND)
+
+
+def _rgba(color, opacity=1.0):
+    """Parses "#RRGGBB" into RGBA bytes, falling back to the default node colour."""
+    if not isinstance(color, str) or len(color) != 7 or not color.startswith("#"):
+        color = DEFAULT_NODE_COLOR
+    return [int(color[i:i + 2], 16) for i in (1, 3, 5)] + [round(opacity * 255)]
+
+
+def _palette(colors, opacity=1.0):
+    """Turns colour strings into RGBA rows, parsing each distinct colour once."""
+    codes = {}
+    indices = np.fromiter((codes.setdefault(color, len(codes)) for color in colors), dtype=np.int64)
+    rgba = np.array([_rgba(color, opacity) for color in codes], dtype=np.uint8).reshape(-1, 4)
+    return rgba[indices] if len(indices) else np.zeros((0, 4), dtype=np.uint8)
+
+
+def encode(G, positions, hierarchical):
+    """Packs a graph into the typed arrays the WebGL renderer draws from.
+
+    The payload is little-endian: node and edge counts (uint32), node x/y
+    (float32 pairs), node sizes (float32), node colours (RGBA bytes), edge
+    endpoints as node indices (uint32 pairs) and edge colours (RGBA bytes).
+    Node labels and titles go separately as JSON lists, for hover tooltips.
+    Returns `(payload, labels, titles)`.
+    """
+    nodes = list(G.nodes(data=True))
+    index = {node: i for i, (node, _) in enumerate(nodes)}
+    xy = np.array([positions[node] for node, _ in nodes], dtype="<f4").reshape(-1, 2)
+    sizes = np.fromiter((a.get("size") or DEFAULT_NODE_SIZE for _, a in nodes), dtype="<f4", count=len(nodes))
+    colors = _palette(a.get("color") for _, a in nodes)
+
+    color = json.loads(HIERARCHICAL_OPTIONS if hierarchical else FREE_OPTIONS)["edges"]["color"]
+    edges = list(G.edges(data="color", default=color["color"]))
+    ends = np.fromiter(
+        (index[node] for u, v, _ in edges for node in (u, v)), dtype="<u4", count=2 * len(edges)
+    ).reshape(-1, 2)
+    edge_colors = _palette((c for _, _, c in edges), color["opacity"])
+
+    header = np.array([len(nodes), len(edges)], dtype="<u4")
+    payload = b"".join(a.tobytes() for a in (header, xy, sizes, colors, ends, edge_colors))
+    labels = [str(a.get("label") or node) for node, a in nodes]
+    titles = [str(a.get("title") or "") for _, a in nodes]
+    return payload, labels, titles
+
+
+def view_payload(view, selections, hierarchical, within=None):
+    """Encodes what a `filters.FilteredView` shows for a selection, in its cached layout.
+
+    The whole graph's payload is kept on the view; filtered ones are
+    encoded from the subgraph on each call.
+    """
+    positions = view.positions(hierarchical)
+    if selections or within is not None:
+        return encode(view.subgraph(selections, within), positions, hierarchical)
+    return view.cached(("webgl", bool(hierarchical)), lambda: encode(view.graph, positions, hierarchical))
+
+
+def webgl_graph(payload, labels, titles, height=900, key=None):
+    """Draws a graph encoded by `encode` with the WebGL component; drag pans, the wheel zooms."""
+    return _component(payload=payload, labels=labels, titles=titles, height=height, key=key, default=None)
@@ -0,0 +1,377 @@
+// WebGL renderer for very large graphs, used as a Streamlit component.
+//
+// Streamlit sends the graph as one binary payload (see webgl.encode) with
+// positions already computed in Python, so the page only uploads typed
+// arrays to the GPU and redraws on pan and zoom; nothing is laid out here.
+(function () {
+    "use strict";
+
+    var NODE_VERTEX = [
+        "attribute vec2 position;",
+        "attribute float size;",
+        "attribute vec4 color;",
+        "uniform vec2 offset;",
+        "uniform float scale;",
+        "uniform vec2 viewport;",
+        "uniform float pixelRatio;",
+        "varying vec4 vColor;",
+        "void main() {",
+        "    vec2 screen = position * scale + offset;",
+        "    gl_Position = vec4((screen / viewport * 2.0 - 1.0) * vec2(1.0, -1.0), 0.0, 1.0);",
+        "    gl_PointSize = max(2.0 * size * scale, 3.0) * pixelRatio;",
+        "    vColor = color;",
+        "}"
+    ].join("\n");
+
+    var NODE_FRAGMENT = [
+        "precision mediump float;",
+        "varying vec4 vColor;",
+        "void main() {",
+        "    vec2 from_centre = gl_PointCoord * 2.0 - 1.0;",
+        "    float distance = dot(from_centre, from_centre);",
+        "    if (distance > 1.0) {",
+        "        discard;",
+        "    }",
+        "    gl_FragColor = vec4(vColor.rgb, vColor.a * (1.0 - smoothstep(0.8, 1.0, distance)));",
+        "}"
+    ].join("\n");
+
+    var EDGE_VERTEX = [
+        "attribute vec2 position;",
+        "attribute vec4 color;",
+        "uniform vec2 offset;",
+        "uniform float scale;",
+        "uniform vec2 viewport;",
+        "varying vec4 vColor;",
+        "void main() {",
+        "    vec2 screen = position * scale + offset;",
+        "    gl_Position = vec4((screen / viewport * 2.0 - 1.0) * vec2(1.0, -1.0), 0.0, 1.0);",
+        "    vColor = color;",
+        "}"
+    ].join("\n");
+
+    var EDGE_FRAGMENT = [
+        "precision mediump float;",
+        "varying vec4 vColor;",
+        "void main() {",
+        "    gl_FragColor = vColor;",
+        "}"
+    ].join("\n");
+
+    var canvas = document.getElementById("graph");
+    var tooltip = document.getElementById("tooltip");
+    var status = document.getElementById("status");
+    var gl = canvas.getContext("webgl", {antialias: true, premultipliedAlpha: false});
+
+    var graph = null;
+    var view = {scale: 1, x: 0, y: 0};
+    var width = 0;
+    var height = 0;
+    var frameRequested = false;
+
+    function send(type, data) {
+        window.parent.postMessage(Object.assign({isStreamlitMessage: true, type: type}, data || {}), "*");
+    }
+
+    function compile(vertexSource, fragmentSource) {
+        var program = gl.createProgram();
+        [[gl.VERTEX_SHADER, vertexSource], [gl.FRAGMENT_SHADER, fragmentSource]].forEach(function (stage) {
+            var shader = gl.createShader(stage[0]);
+            gl.shaderSource(shader, stage[1]);
+            gl.compileShader(shader);
+            if (!gl.getShaderParameter(shader, gl.COMPILE_STATUS)) {
+                throw new Error(gl.getShaderInfoLog(shader));
+            }
+            gl.attachShader(program, shader);
+        });
+        gl.linkProgram(program);
+        if (!gl.getProgramParameter(program, gl.LINK_STATUS)) {
+            throw new Error(gl.getProgramInfoLog(program));
+        }
+        return program;
+    }
+
+    function buffer(data) {
+        var id = gl.createBuffer();
+        gl.bindBuffer(gl.ARRAY_BUFFER, id);
+        gl.bufferData(gl.ARRAY_BUFFER, data, gl.STATIC_DRAW);
+        return id;
+    }
+
+    function attribute(program, name, id, size, type, normalized) {
+        var location = gl.getAttribLocation(program, name);
+        if (location < 0) {
+            return;
+        }
+        gl.bindBuffer(gl.ARRAY_BUFFER, id);
+        gl.enableVertexAttribArray(location);
+        gl.vertexAttribPointer(location, size, type, normalized, 0, 0);
+    }
+
+    // Splits the payload into typed arrays; it is copied first so every array is aligned
+    function decode(bytes) {
+        var data = new Uint8Array(bytes).slice().buffer;
+        var counts = new Uint32Array(data, 0, 2);
+        var n = counts[0];
+        var m = counts[1];
+        var offset = 8;
+        function take(Type, length, bytesPerItem) {
+            var array = new Type(data, offset, length);
+            offset += length * bytesPerItem;
+            return array;
+        }
+        var parsed = {n: n, m: m};
+        parsed.positions = take(Float32Array, 2 * n, 4);
+        parsed.sizes = take(Float32Array, n, 4);
+        parsed.colors = take(Uint8Array, 4 * n, 1);
+        parsed.ends = take(Uint32Array, 2 * m, 4);
+        parsed.edgeColors = take(Uint8Array, 4 * m, 1);
+        return parsed;
+    }
+
+    // Uniform grid over the node positions, for finding the node under the pointer
+    function index(parsed) {
+        var positions = parsed.positions;
+        var minX = Infinity, minY = Infinity, maxX = -Infinity, maxY = -Infinity, maxSize = 1;
+        for (var i = 0; i < parsed.n; i++) {
+            minX = Math.min(minX, positions[2 * i]);
+            maxX = Math.max(maxX, positions[2 * i]);
+            minY = Math.min(minY, positions[2 * i + 1]);
+            maxY = Math.max(maxY, positions[2 * i + 1]);
+            maxSize = Math.max(maxSize, parsed.sizes[i]);
+        }
+        var cell = Math.max(Math.max(maxX - minX, maxY - minY) / Math.sqrt(Math.max(parsed.n, 1)), 2 * maxSize);
+        var cells = new Map();
+        for (var j = 0; j < parsed.n; j++) {
+            var key = Math.floor(positions[2 * j] / cell) + "," + Math.floor(positions[2 * j + 1] / cell);
+            if (!cells.has(key)) {
+                cells.set(key, []);
+            }
+            cells.get(key).push(j);
+        }
+        return {
+            cell: cell,
+            cells: cells,
+            bounds: {minX: minX, minY: minY, maxX: maxX, maxY: maxY, margin: maxSize * 2}
+        };
+    }
+
+    function load(args) {
+        var parsed = decode(args.payload);
+        var edgePositions = new Float32Array(4 * parsed.m);
+        var edgeColors = new Uint8Array(8 * parsed.m);
+        for (var e = 0; e < parsed.m; e++) {
+            for (var end = 0; end < 2; end++) {
+                var node = parsed.ends[2 * e + end];
+                edgePositions[4 * e + 2 * end] = parsed.positions[2 * node];
+                edgePositions[4 * e + 2 * end + 1] = parsed.positions[2 * node + 1];
+                edgeColors.set(parsed.edgeColors.subarray(4 * e, 4 * e + 4), 8 * e + 4 * end);
+            }
+        }
+        if (graph) {
+            [graph.nodePositions, graph.nodeSizes, graph.nodeColors, graph.edgePositions, graph.edgeColors]
+                .forEach(function (id) { gl.deleteBuffer(id); });
+        }
+        graph = {
+            payload: args.payload,
+            labels: args.labels,
+            titles: args.titles,
+            n: parsed.n,
+            m: parsed.m,
+            positions: parsed.positions,
+            sizes: parsed.sizes,
+            grid: index(parsed),
+            nodePositions: buffer(parsed.positions),
+            nodeSizes: buffer(parsed.sizes),
+            nodeColors: buffer(parsed.colors),
+            edgePositions: buffer(edgePositions),
+            edgeColors: buffer(edgeColors)
+        };
+        status.textContent = parsed.n.toLocaleString() + " nodes · " + parsed.m.toLocaleString() + " edges";
+        fit();
+    }
+
+    function fit() {
+        var b = graph.grid.bounds;
+        if (!graph.n) {
+            return;
+        }
+        var spanX = b.maxX - b.minX + 2 * b.margin;
+        var spanY = b.maxY - b.minY + 2 * b.margin;
+        view.scale = 0.95 * Math.min(width / spanX, height / spanY);
+        view.x = width / 2 - (b.minX + b.maxX) / 2 * view.scale;
+        view.y = height / 2 - (b.minY + b.maxY) / 2 * view.scale;
+        redraw();
+    }
+
+    function resize() {
+        var ratio = window.devicePixelRatio || 1;
+        width = canvas.clientWidth;
+        height = canvas.clientHeight;
+        canvas.width = Math.round(width * ratio);
+        canvas.height = Math.round(height * ratio);
+        redraw();
+    }
+
+    function redraw() {
+        if (!frameRequested) {
+            frameRequested = true;
+            window.requestAnimationFrame(draw);
+        }
+    }
+
+    function uniforms(program) {
+        gl.uniform2f(gl.getUniformLocation(program, "offset"), view.x, view.y);
+        gl.uniform1f(gl.getUniformLocation(program, "scale"), view.scale);
+        gl.uniform2f(gl.getUniformLocation(program, "viewport"), width, height);
+    }
+
+    var nodeProgram = null;
+    var edgeProgram = null;
+
+    function draw() {
+        frameRequested = false;
+        gl.viewport(0, 0, canvas.width, canvas.height);
+        gl.clearColor(1, 1, 1, 1);
+        gl.clear(gl.COLOR_BUFFER_BIT);
+        if (!graph || !graph.n) {
+            return;
+        }
+        gl.enable(gl.BLEND);
+        gl.blendFunc(gl.SRC_ALPHA, gl.ONE_MINUS_SRC_ALPHA);
+
+        gl.useProgram(edgeProgram);
+        uniforms(edgeProgram);
+        attribute(edgeProgram, "position", graph.edgePositions, 2, gl.FLOAT, false);
+        attribute(edgeProgram, "color", graph.edgeColors, 4, gl.UNSIGNED_BYTE, true);
+        gl.drawArrays(gl.LINES, 0, 2 * graph.m);
+
+        gl.useProgram(nodeProgram);
+        uniforms(nodeProgram);
+        gl.uniform1f(gl.getUniformLocation(nodeProgram, "pixelRatio"), window.devicePixelRatio || 1);
+        attribute(nodeProgram, "position", graph.nodePositions, 2, gl.FLOAT, false);
+        attribute(nodeProgram, "size", graph.nodeSizes, 1, gl.FLOAT, false);
+        attribute(nodeProgram, "color", graph.nodeColors, 4, gl.UNSIGNED_BYTE, true);
+        gl.drawArrays(gl.POINTS, 0, graph.n);
+    }
+
+    // The node drawn under a point of the canvas, or -1
+    function nodeAt(x, y) {
+        var worldX = (x - view.x) / view.scale;
+        var worldY = (y - view.y) / view.scale;
+        var grid = graph.grid;
+        // Zoomed far out, nodes are drawn larger than their size, so look a few cells further
+        var reach = Math.min(Math.max(Math.ceil(1.5 / view.scale / grid.cell), 1), 4);
+        var cellX = Math.floor(worldX / grid.cell);
+        var cellY = Math.floor(worldY / grid.cell);
+        var best = -1;
+        var bestDistance = Infinity;
+        for (var dx = -reach; dx <= reach; dx++) {
+            for (var dy = -reach; dy <= reach; dy++) {
+                var members = grid.cells.get((cellX + dx) + "," + (cellY + dy)) || [];
+                for (var k = 0; k < members.length; k++) {
+                    var i = members[k];
+                    var radius = Math.max(graph.sizes[i], 1.5 / view.scale);
+                    var distanceX = graph.positions[2 * i] - worldX;
+                    var distanceY = graph.positions[2 * i + 1] - worldY;
+                    var distance = distanceX * distanceX + distanceY * distanceY;
+                    if (distance <= radius * radius && distance < bestDistance) {
+                        best = i;
+                        bestDistance = distance;
+                    }
+                }
+            }
+        }
+        return best;
+    }
+
+    var drag = null;
+    canvas.addEventListener("mousedown", function (event) {
+        drag = {x: event.clientX, y: event.clientY, viewX: view.x, viewY: view.y};
+        canvas.classList.add("dragging");
+    });
+    window.addEventListener("mouseup", function () {
+        drag = null;
+        canvas.classList.remove("dragging");
+    });
+    window.addEventListener("mousemove", function (event) {
+        if (!graph) {
+            return;
+        }
+        if (drag) {
+            view.x = drag.viewX + event.clientX - drag.x;
+            view.y = drag.viewY + event.clientY - drag.y;
+            tooltip.style.display = "none";
+            redraw();
+            return;
+        }
+        var rect = canvas.getBoundingClientRect();
+        var node = nodeAt(event.clientX - rect.left, event.clientY - rect.top);
+        if (node < 0) {
+            tooltip.style.display = "none";
+            return;
+        }
+        var label = graph.labels[node];
+        var title = graph.titles[node];
+        tooltip.textContent = title && title !== label ? label + "\n" + title : label;
+        tooltip.style.left = (event.clientX - rect.left + 12) + "px";
+        tooltip.style.top = (event.clientY - rect.top + 12) + "px";
+        tooltip.style.display = "block";
+    });
+    canvas.addEventListener("wheel", function (event) {
+        event.preventDefault();
+        var rect = canvas.getBoundingClientRect();
+        var x = event.clientX - rect.left;
+        var y = event.clientY - rect.top;
+        var factor = Math.exp(-event.deltaY * 0.0015);
+        view.x = x - (x - view.x) * factor;
+        view.y = y - (y - view.y) * factor;
+        view.scale *= factor;
+        redraw();
+    }, {passive: false});
+    canvas.addEventListener("dblclick", function () {
+        if (graph) {
+            fit();
+        }
+    });
+    window.addEventListener("resize", resize);
+
+    function samePayload(a, b) {
+        if (!a || a.length !== b.length) {
+            return false;
+        }
+        for (var i = 0; i < a.length; i++) {
+            if (a[i] !== b[i]) {
+                return false;
+            }
+        }
+        return true;
+    }
+
+    window.addEventListener("message", function (event) {
+        if (event.data.type !== "streamlit:render") {
+            return;
+        }
+        var args = event.data.args;
+        send("streamlit:setFrameHeight", {height: args.height});
+        if (!gl) {
+            return;
+        }
+        if (args.payload instanceof ArrayBuffer) {
+            args.payload = new Uint8Array(args.payload);
+        }
+        resize();
+        // Streamlit re-renders on every rerun; only new graphs are uploaded again
+        if (!graph || !samePayload(graph.payload, args.payload)) {
+            load(args);
+        }
+    });
+
+    if (!gl) {
+        status.textContent = "WebGL is not available in this browser.";
+    } else {
+        nodeProgram = compile(NODE_VERTEX, NODE_FRAGMENT);
+        edgeProgram = compile(EDGE_VERTEX, EDGE_FRAGMENT);
+    }
+    send("streamlit:componentReady", {apiVersion: 1});
+})();